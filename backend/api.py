@@ -1,25 +1,50 @@
 # backend/api.py
 import os
+import sys
+import threading
 import time
-import re
 import uuid
-import traceback
-from threading import Event
 from datetime import datetime, timezone
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, g
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
-from groq import Groq
 from dotenv import load_dotenv
 from werkzeug.exceptions import HTTPException
-from supabase import create_client, Client
 import secrets
 import string
 from datetime import timedelta
 
-# simple in-memory history store (newest first)
-history_store = []
+# modul pendamping di folder backend/ harus bisa di-import baik lewat
+# `python api.py` maupun `from backend.api import app` (wsgi.py / Vercel)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# worker audio_ingest (forkserver/spawn) meng-import ulang skrip utama sebagai
+# __mp_main__ bila server dijalankan lewat `python api.py`: di sana app cukup
+# didefinisikan, tanpa thread latar (warm-up, resume batch)
+MAIN_PROCESS = __name__ != "__mp_main__"
+
+import applog
+import auth_utils
+import history_db
+import history_export
+import http_clients
+import jobs
+import lazy
+import longform
+import metrics
+import prompt_registry
+import providers
+import sections
+import share_cache
+import shared_state
+import streaming
+import summary_cache
+import upstream
+import user_settings
+from auth_utils import require_auth
+from prompt_registry import PromptTooLong
+from upstream import UpstreamError
 
 def _now_iso():
     return datetime.utcnow().isoformat() + "Z"
@@ -29,134 +54,310 @@ def _now_iso():
 # Config & Init
 # =========================
 load_dotenv()
-GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "")
-MODEL = os.environ.get("GROQ_MODEL", "llama-3.3-70b-versatile")
 SUPABASE_URL = os.environ.get("SUPABASE_URL", "")
 SUPABASE_SERVICE_KEY = os.environ.get("SUPABASE_SERVICE_KEY", "")
 
-client = Groq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
+log = applog.get_logger("api")
 
-# Initialize Supabase client
-supabase: Client = None
-if SUPABASE_URL and SUPABASE_SERVICE_KEY and SUPABASE_SERVICE_KEY != "PASTE_YOUR_SERVICE_ROLE_KEY_HERE":
-    try:
-        supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
-        print("[SUPABASE] Client initialized successfully")
-    except Exception as e:
-        print(f"[SUPABASE] Failed to initialize client: {e}")
-        supabase = None
-else:
-    print("[SUPABASE] Not configured - share features will be disabled")
-
-app = Flask(__name__, static_folder="static", template_folder="templates")
-CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode="threading")
-
-stop_flags = {}  # {sid: Event}
-
-
-# =========================
-# Helpers
-# =========================
-def strip_think(text: str) -> str:
-    """Hapus blok <think>...</think> bila ada."""
-    return re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL | re.IGNORECASE).strip()
+# provider LLM berurutan (fallback 429/5xx + hedged stream), masing-masing
+# dengan rate limiter + circuit breaker + retry sendiri (providers.py, upstream.py)
+llm = providers.from_env()
+# identitas model untuk cache key: model provider utama
+MODEL = llm.primary.model if llm.configured else os.environ.get("GROQ_MODEL", providers.DEFAULT_MODEL)
 
-def build_prompt(text: str, mode: str = "patologi") -> str:
-    mode = (mode or "patologi").lower()
-    if mode == "dokter_hewan":
-        return f"""
-Anda adalah seorang dokter hewan berpengalaman.
-Langsung berikan ringkasan final saja, tanpa proses berpikir.
-Ikuti format:
+def _create_supabase():
+    # SDK supabase (postgrest, realtime, storage, ...) berat di-import: tunda sampai dipakai
+    from supabase import ClientOptions, create_client
+    return create_client(
+        SUPABASE_URL, SUPABASE_SERVICE_KEY,
+        options=ClientOptions(httpx_client=http_clients.httpx_client("supabase")),
+    )
 
-**Ringkasan Klinis Hewan**
 
-**Identitas Hewan:**
-- ...
+# Supabase client dibuat saat pertama dipakai; None = tidak dikonfigurasi
+supabase = None
+if SUPABASE_URL and SUPABASE_SERVICE_KEY and SUPABASE_SERVICE_KEY != "PASTE_YOUR_SERVICE_ROLE_KEY_HERE":
+    supabase = lazy.Lazy(_create_supabase, name="supabase")
+else:
+    log.warning("supabase not configured, share features disabled")
 
-**Alasan Kunjungan:**
-- ...
+# history /save & /api/history: Supabase bila dikonfigurasi, selain itu SQLite lokal (datadir.py)
+history_store = history_db.from_env(supabase)
 
-**Riwayat Medis:**
-- ...
+app = Flask(__name__, static_folder="static", template_folder="templates")
+CORS(app)
+# SOCKETIO_MESSAGE_QUEUE (atau STATE_STORE_URL redis://) -> emit lintas worker
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode="threading",
+                    message_queue=shared_state.message_queue_from_env())
 
-**Pemeriksaan Fisik:**
-- ...
+# state yang harus sama di semua worker (STATE_STORE_URL); default in-process
+state = shared_state.from_env()
+if state.shared and isinstance(history_store, history_db.SqliteHistoryStore):
+    log.warning("scale-out: history uses a local SQLite file; set HISTORY_BACKEND=supabase "
+                "when workers run on more than one host")
 
-**Pemeriksaan Penunjang:**
-- ...
+# satu generasi summarize_stream aktif per sesi; request baru menggantikan yang lama
+stream_sessions = streaming.SessionScheduler(bus=state if state.shared else None)
+STREAM_DEBOUNCE = streaming.debounce_from_env()
 
-**Diagnosis / Implikasi:**
-- ...
+# cache ringkasan bersama untuk /summarize dan summarize_stream
+summaries = summary_cache.from_env()
 
-**Rencana Penanganan:**
-- ...
+# template prompt per mode (prompts/*.txt), divalidasi & dihitung tokennya sekali
+prompts = prompt_registry.from_env()
 
-**Prognosis:**
-- ...
+# ringkasan bergulir per sesi socket (mode incremental)
+# {sid: {"mode": str, "covered": str, "summary": str}}
+session_summaries = shared_state.StoreMapping(state, "session_summary", ttl=6 * 3600)
 
-**Rekomendasi / Tindak Lanjut:**
-- ...
+# delta yang lebih panjang dari rasio ini terhadap teks yang sudah tercakup
+# diringkas ulang penuh (lebih murah daripada prompt incremental + ringkasan lama)
+INCREMENTAL_FULL_RATIO = float(os.environ.get("INCREMENTAL_FULL_RATIO", "1.0"))
 
-Aturan ketat:
-- Hanya ekstrak fakta yang ada pada teks sumber.
-- Pertahankan angka/satuan persis seperti tertulis.
-- Jangan menambah atau mengubah fakta yang tidak ada di teks.
+# audio mentah dari client -> VAD -> recognizer di process pool (AUDIO_RECOGNIZER);
+# numpy baru di-import saat audio_start pertama
+audio_ingest = lazy.module("audio_ingest")
+audio = lazy.Lazy(lambda: audio_ingest.from_env(), name="audio",
+                  warm=bool(os.environ.get("AUDIO_RECOGNIZER")))
 
-Teks sumber:
-{text}
+if MAIN_PROCESS and os.environ.get("LAZY_WARMUP", "0") == "1":
+    lazy.warm_up_in_background()
 
-Ringkasan:
-"""
-    else:
-        return f"""
-Anda adalah seorang dokter patologi berpengalaman.
-Langsung berikan ringkasan final saja, tanpa proses berpikir.
-Ikuti format:
 
-**Ringkasan Patologi Klinis**
+# =========================
+# Metrics (/metrics)
+# =========================
+HTTP_LATENCY = metrics.histogram(
+    "http_request_duration_seconds", "Latency request HTTP", ["route", "method", "status"])
+LLM_TTFT = metrics.histogram(
+    "llm_time_to_first_token_seconds", "Waktu sampai token pertama dari Groq", ["route"])
+LLM_GENERATION = metrics.histogram(
+    "llm_generation_seconds", "Total waktu generate ringkasan", ["route"])
+LLM_PROMPT_TOKENS = metrics.histogram(
+    "llm_prompt_tokens", "Prompt tokens (usage Groq)", ["route"], buckets=metrics.TOKEN_BUCKETS)
+LLM_COMPLETION_TOKENS = metrics.histogram(
+    "llm_completion_tokens", "Completion tokens (usage Groq)", ["route"], buckets=metrics.TOKEN_BUCKETS)
+UPSTREAM_RETRIES = metrics.counter(
+    "upstream_retries_total", "Retry ke Groq", ["route"])
+UPSTREAM_ERRORS = metrics.counter(
+    "upstream_errors_total", "Error upstream per kelas", ["route", "error_class"])
+CACHE_REQUESTS = metrics.counter(
+    "cache_requests_total", "Lookup cache (hit/miss)", ["cache", "route", "result"])
+SOCKET_SESSIONS = metrics.gauge(
+    "socket_active_sessions", "Sesi Socket.IO yang terhubung")
+STREAM_CANCELLED = metrics.counter(
+    "stream_cancelled_total", "Generasi summarize_stream yang dibatalkan", ["reason"])
+STREAM_DUPLICATES = metrics.counter(
+    "stream_duplicate_requests_total", "Request stream identik dengan yang sedang berjalan (diabaikan)")
+STREAM_DEBOUNCED = metrics.counter(
+    "stream_debounced_total", "Request stream yang digantikan sebelum sempat memanggil Groq")
+LLM_WASTED_TOKENS = metrics.counter(
+    "llm_wasted_tokens_total", "Perkiraan token Groq terbuang oleh generasi yang dibatalkan",
+    ["reason", "kind"])
+metrics.gauge("stream_in_flight", "Sesi dengan generasi summarize_stream aktif",
+              fn=lambda: len(stream_sessions))
+metrics.gauge("upstream_circuit_open", "1 jika circuit breaker semua provider LLM terbuka",
+              fn=lambda: 0 if any(p.guard.breaker.state != "open" for p in llm.providers) else 1)
+metrics.gauge("llm_provider_circuit_open", "1 jika circuit breaker provider terbuka", ["provider"],
+              fn=lambda: {(p.name,): 1 if p.guard.breaker.state == "open" else 0 for p in llm.providers})
+metrics.gauge("llm_provider_ttft_p95_seconds", "p95 TTFT terbaru per provider (dasar jeda hedge)",
+              ["provider"], fn=lambda: {(p.name,): p.ttft.percentile(0.95) or 0.0 for p in llm.providers})
+metrics.gauge("llm_provider_events", "Jumlah kejadian per provider sejak start", ["provider", "event"],
+              fn=lambda: {(p.name, k): v for p in llm.providers for k, v in p.counts.items()})
+metrics.gauge("http_pool_connections_in_use", "Koneksi keluar yang sedang dipakai", ["upstream"],
+              fn=lambda: {(k,): v["in_use"] for k, v in http_clients.pool_stats().items()})
+metrics.gauge("http_pool_utilization", "Rasio koneksi dipakai / kapasitas pool", ["upstream"],
+              fn=lambda: {(k,): v["utilization"] for k, v in http_clients.pool_stats().items()})
+metrics.gauge("summary_stream_frames_per_second", "Frame summary_stream per detik (jendela 10 dtk)",
+              fn=lambda: streaming.frame_stats.snapshot()["frames_per_sec"])
+metrics.gauge("log_records_dropped", "Record log yang dibuang karena antrian penuh",
+              fn=applog.dropped)
+metrics.gauge("summary_stream_bytes_per_frame", "Rata-rata byte per frame summary_stream",
+              fn=lambda: streaming.frame_stats.snapshot()["bytes_per_frame"])
+AUDIO_RECOGNITION = metrics.histogram(
+    "audio_recognition_seconds", "Waktu dari potongan audio sampai transkrip dikirim", ["type"])
+metrics.gauge("audio_sessions", "Sesi audio_start yang aktif",
+              fn=lambda: audio.stats()["sessions"] if audio.ready else 0)
+metrics.gauge("audio_recognizer_pending", "Job recognizer di process pool yang belum selesai",
+              fn=lambda: audio.stats()["pending"] if audio.ready else 0)
+metrics.gauge("audio_events", "Jumlah kejadian ingest audio sejak start", ["event"],
+              fn=lambda: {(k,): v for k, v in audio.counts.items()} if audio.ready else {})
+
+
+def record_cache(cache: str, route: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache, route=route, result="hit" if hit else "miss")
+
+
+def record_generation(route: str, started: float, first_token_at=None, usage=None):
+    """Catat TTFT, durasi total, dan token usage satu panggilan Groq."""
+    now = time.perf_counter()
+    LLM_GENERATION.observe(now - started, route=route)
+    if first_token_at is not None:
+        LLM_TTFT.observe(first_token_at - started, route=route)
+    if usage is not None:
+        if getattr(usage, "prompt_tokens", None) is not None:
+            LLM_PROMPT_TOKENS.observe(usage.prompt_tokens, route=route)
+        if getattr(usage, "completion_tokens", None) is not None:
+            LLM_COMPLETION_TOKENS.observe(usage.completion_tokens, route=route)
+
+
+def record_upstream_error(route: str, e: Exception):
+    error_class = e.error if isinstance(e, UpstreamError) else type(e).__name__
+    UPSTREAM_ERRORS.inc(route=route, error_class=error_class)
+
+
+@app.before_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    g.log_token = applog.bind(route=route, request_id=request.headers.get("X-Request-ID"))
+
+
+@app.after_request
+def _observe_latency(response):
+    started = g.get("request_started")
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_LATENCY.observe(time.perf_counter() - started,
+                             route=route, method=request.method, status=response.status_code)
+    if applog.request_id():
+        response.headers["X-Request-ID"] = applog.request_id()
+    return response
+
+
+@app.teardown_request
+def _unbind_log_context(exc=None):
+    token = g.pop("log_token", None)
+    if token is not None:
+        applog.unbind(token)
 
-**Jenis Pemeriksaan:**
-- ...
 
-**Jenis Spesimen:**
-- ...
+# =========================
+# Helpers
+# =========================
+def build_prompt(text: str, mode: str = "patologi") -> prompt_registry.Prompt:
+    """Prompt ringkasan dari template mode (prompts/<mode>.txt), membawa jumlah token."""
+    return prompts.summary(mode, text)
 
-**Hasil Pemeriksaan Makroskopik:**
-- ...
 
-**Hasil Pemeriksaan Mikroskopik:**
-- ...
+def build_incremental_prompt(prior_summary: str, delta: str, mode: str = "patologi") -> prompt_registry.Prompt:
+    """Prompt untuk memperbarui ringkasan lama dengan potongan transkrip baru saja."""
+    return prompts.incremental(mode, prior_summary, delta)
 
-**Diagnosis:**
-- ...
 
-**Rekomendasi / Tindak Lanjut:**
-- ...
+def build_chunk_prompt(chunk: str, mode: str, index: int, total: int) -> prompt_registry.Prompt:
+    """Prompt langkah map: ekstrak fakta dari satu bagian transkrip panjang."""
+    return prompts.chunk(mode, chunk, index + 1, total)
 
-Aturan ketat:
-- Hanya ekstrak fakta yang ada pada teks sumber.
-- Pertahankan angka/satuan persis seperti tertulis.
-- Jangan menambah atau mengubah fakta yang tidak ada di teks.
 
-Teks sumber:
-{text}
+def needs_longform(prompt: prompt_registry.Prompt, forced: bool = False) -> bool:
+    """Prompt terlalu panjang untuk satu panggilan -> pakai map-reduce."""
+    return forced or prompt.tokens > longform.THRESHOLD_TOKENS
 
-Ringkasan:
-"""
 
+def longform_prompt(text: str, mode: str, route: str, chunks=None):
+    """
+    Langkah map: ringkas chunk secara paralel (chunk yang sama diambil dari
+    cache), lalu return (prompt reduce berbasis template biasa, info).
+    """
+    chunks = chunks or longform.split_chunks(text)
+    total = len(chunks)
+    # batasi catatan per chunk supaya prompt reduce muat; terlalu banyak chunk -> PromptTooLong
+    note_tokens = prompts.note_budget(mode, total)
 
-def _parse_retry_after_seconds(message: str):
-    try:
-        m = re.search(r"in\s+(?:(\d+)m)?(\d+(?:\.\d+)?)s", message)
-        if not m:
-            return None
-        minutes = float(m.group(1)) if m.group(1) else 0.0
-        seconds = float(m.group(2))
-        return minutes * 60.0 + seconds
-    except Exception:
-        return None
+    def _summarize_chunk(index, chunk):
+        prompt = build_chunk_prompt(chunk, mode, index, total)
+        max_tokens = min(note_tokens, prompts.max_tokens(prompt))
+        started = time.perf_counter()
+        resp = llm.call(
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.2,
+            max_tokens=max_tokens,
+            on_retry=lambda attempt, delay, e: UPSTREAM_RETRIES.inc(route=route),
+        )
+        record_generation(f"{route}:map", started, usage=getattr(resp, "usage", None))
+        return streaming.strip_think((resp.choices[0].message.content or "").strip())
+
+    def _chunk_key(index, chunk):
+        # prompt map memuat "bagian {index} dari {total}" dan max_tokens = note_tokens
+        return summary_cache.make_key(f"chunk:{mode}:{index + 1}/{total}:{note_tokens}", MODEL, chunk)
+
+    t0 = time.perf_counter()
+    notes, cached = longform.map_chunks(chunks, _summarize_chunk, cache=summaries, key_fn=_chunk_key)
+    CACHE_REQUESTS.inc(cached, cache="chunk", route=route, result="hit")
+    CACHE_REQUESTS.inc(total - cached, cache="chunk", route=route, result="miss")
+    info = {"chunks": total, "chunks_cached": cached,
+            "map_ms": round((time.perf_counter() - t0) * 1000, 1)}
+    log.info("longform map done", **info)
+    return build_prompt(longform.join_notes(notes), mode), info
+
+
+def generate_summary(text: str, mode: str, route: str, long_input: bool = False, on_retry=None):
+    """
+    Ringkas `text` lewat Groq (map-reduce untuk input panjang), tanpa cache.
+    Return (summary, longform_info). Error upstream dan PromptTooLong
+    (prompt reduce masih melebihi konteks model) diteruskan ke pemanggil.
+    """
+    prompt = build_prompt(text, mode)
+    longform_info = None
+    started = time.perf_counter()
+    if needs_longform(prompt, long_input):
+        prompt, longform_info = longform_prompt(text, mode, route)
+    max_tokens = prompts.max_tokens(prompt)
+    resp = llm.call(
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.3,
+        max_tokens=max_tokens,
+        on_retry=on_retry,
+    )
+    record_generation(route, started, usage=getattr(resp, "usage", None))
+    return streaming.strip_think((resp.choices[0].message.content or "").strip()), longform_info
+
+
+def plan_stream_prompt(sid: str, text: str, mode: str, incremental: bool):
+    """
+    Tentukan prompt untuk summarize_stream.
+
+    Return (prompt, cached_summary). Jika transkrip tidak bertambah sejak
+    ringkasan terakhir sesi ini, prompt=None dan ringkasan lama dipakai ulang.
+    """
+    state = session_summaries.get(sid)
+    if not incremental or not state or state["mode"] != mode:
+        return build_prompt(text, mode), None
+
+    covered = state["covered"]
+    if not text.startswith(covered):
+        # transkrip diedit/diganti -> mulai ulang dari nol
+        return build_prompt(text, mode), None
+
+    delta = text[len(covered):].strip()
+    if not delta:
+        return None, state["summary"]
+    if len(delta) > len(covered) * INCREMENTAL_FULL_RATIO:
+        return build_prompt(text, mode), None
+    return build_incremental_prompt(state["summary"], delta, mode), None
+
+
+def replay_pieces(summary: str, size: int = 48):
+    """Pecah ringkasan dari cache jadi potongan untuk dikirim sebagai `token`."""
+    for i in range(0, len(summary), size):
+        yield summary[i:i + size]
+
+
+def replay_events(summary: str, tokens: bool = True):
+    """
+    Ringkasan jadi -> (nama_event, payload) seperti jalur live: `token`,
+    summary_section, lalu event final. tokens=False hanya mengirim section.
+    """
+    outline = sections.SectionParser()
+    for piece in replay_pieces(summary):
+        if tokens:
+            yield "summary_stream", {"token": piece}
+        for ev in outline.feed(piece):
+            yield "summary_section", ev
+    for ev in outline.flush():
+        yield "summary_section", ev
+    yield "summary_stream", final_event(summary)
 
 
 # =========================
@@ -169,6 +370,8 @@ def handle_exception(e):
     if isinstance(e, HTTPException):
         code = e.code or 500
         msg = e.description
+    if code >= 500:
+        log.exception("unhandled error", error=type(e).__name__)
     return jsonify({"error": msg}), code
 
 
@@ -198,38 +401,63 @@ def index_alias():
 
 @app.route("/history")
 def history_page():
-    return render_template("history.html", history=history_store)
+    entries, _ = history_store.list()
+    return render_template("history.html", history=entries)
 
 
 @app.route("/settings")
 def settings_page():
     return render_template("settings.html")
 
-# di bagian atas file api.py (global)
-current_summary_mode = "patologi"  # default
+# mode = file template di prompts/; menambah mode tidak perlu ubah kode
+DEFAULT_SUMMARY_MODE = prompts.default_mode
+SUMMARY_MODES = prompts.modes
+
+# setelan per user (mode ringkasan, dst.); cache in-process di depan store persisten
+settings = user_settings.from_env(
+    {"summary_mode": DEFAULT_SUMMARY_MODE},
+    supabase=supabase,
+    bus=state if state.shared else None,
+)
+
+
+def request_user_id():
+    """`sub` dari bearer token yang valid, None untuk pemanggil anonim."""
+    user = auth_utils.optional_user()
+    return user.get("sub") if user else None
+
+
+def resolve_mode(data: dict, user_id: str = None, sid: str = None) -> str:
+    """Mode dari payload; bila kosong, setelan user (HTTP) atau sesi socket (sid)."""
+    mode = data.get("mode")
+    if not mode:
+        prefs = settings.for_sid(sid) if sid else settings.get(user_id)
+        mode = prefs.get("summary_mode") or DEFAULT_SUMMARY_MODE
+    return mode.strip().lower()
 
 
 @app.route("/set_summary_mode", methods=["POST"])
+@require_auth
 def set_summary_mode():
-    """Set mode ringkasan global."""
-    global current_summary_mode
+    """Set mode ringkasan milik user yang login (tidak lagi global)."""
     try:
         data = request.get_json(force=True, silent=True) or {}
         mode = (data.get("mode") or "").strip().lower()
         # hanya izinkan mode yang memang ada prompt-nya
-        allowed = ["patologi", "dokter_hewan"]
+        allowed = SUMMARY_MODES
         if mode not in allowed:
             return jsonify({"error": "mode_invalid", "allowed": allowed}), 400
-        current_summary_mode = mode
-        print("[/set_summary_mode] set to", current_summary_mode)
-        return jsonify({"status": "ok", "mode": current_summary_mode})
+        settings.update(g.user["sub"], {"summary_mode": mode})
+        log.info("summary mode set", mode=mode)
+        return jsonify({"status": "ok", "mode": mode})
     except Exception as e:
-        print("ERROR /set_summary_mode:", e)
+        log.exception("set_summary_mode failed")
         return jsonify({"error": str(e)}), 500
 
 @app.route("/get_summary_mode", methods=["GET"])
 def get_summary_mode():
-    return jsonify({"mode": current_summary_mode})
+    """Mode user yang login; pemanggil anonim mendapat mode default."""
+    return jsonify({"mode": resolve_mode({}, request_user_id())})
 
 
 # =========================
@@ -239,6 +467,21 @@ def get_summary_mode():
 def test():
     return jsonify({"status": "connected", "message": "Backend is running"})
 
+
+@app.route("/api/warmup", methods=["GET", "POST"])
+def warmup():
+    """
+    Bangun client upstream yang masih lazy (Supabase, provider LLM, ...).
+    Untuk hook warm-up platform / cron, supaya request user pertama tidak
+    membayar inisialisasinya. Return waktu init per client (ms).
+    """
+    return jsonify({"clients": lazy.warm_up()})
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
+
 # ... (di bawah fungsi def test():)
 
 # =========================
@@ -246,25 +489,24 @@ def test():
 # =========================
 @app.route("/test_groq_http", methods=["GET"])
 def test_groq_http():
-    print("\n--- [DIAGNOSTIK] Memulai tes via HTTP ---")
     try:
-        if not client:
-            print("--- [DIAGNOSTIK] Client Groq tidak terinisialisasi.")
+        if not llm.configured:
+            log.warning("diagnostic: groq client not initialized")
             return jsonify({"error": "Groq client not initialized"}), 500
 
-        print("--- [DIAGNOSTIK] Menghubungi Groq via HTTP... ---")
-        chat_completion = client.chat.completions.create(
+        # langsung ke provider utama (tanpa fallback), supaya yang dites memang provider itu
+        chat_completion = llm.primary.create(
             messages=[{"role": "user", "content": "Hello world"}],
-            model=MODEL, # Menggunakan MODEL global yang sudah kita perbaiki
             temperature=0.5,
         )
         
         result = chat_completion.choices[0].message.content
-        print(f"--- [DIAGNOSTIK] Berhasil! Respons: {result} ---")
-        return jsonify({"status": "sukses", "response": result})
+        log.info("diagnostic: groq ok", response_len=len(result or ""))
+        return jsonify({"status": "sukses", "response": result,
+                        "provider": llm.primary.name, "model": llm.primary.model})
 
     except Exception as e:
-        print(f"--- [DIAGNOSTIK] GAGAL! Error: {type(e).__name__} - {e} ---")
+        log.error("diagnostic: groq failed", error=f"{type(e).__name__}: {e}")
         return jsonify({"error": f"{type(e).__name__}: {e}"}), 500
 
 
@@ -280,102 +522,199 @@ def summarize():
     try:
         data = request.get_json(force=True, silent=True) or {}
         text = (data.get("text") or "").strip()
-        mode = (data.get("mode") or current_summary_mode).strip().lower()
+        mode = resolve_mode(data, request_user_id())
         if not text:
             return jsonify({"error": "Teks kosong"}), 400
+        if mode not in prompts:
+            return jsonify({"error": "mode_invalid", "allowed": SUMMARY_MODES}), 400
 
-        if not client:
+        if not llm.configured:
             return jsonify({"error": "groq_api_key_missing", "message": "GROQ_API_KEY not configured"}), 500
 
-        prompt = build_prompt(text, mode)
-        print("[/summarize] text_len=", len(text), "mode=", mode)
-
-        max_retries = 3
-        base_sleep = 3.0
-        attempt = 0
-        while True:
-            try:
-                resp = client.chat.completions.create(
-                    messages=[{"role": "user", "content": prompt}],
-                    model=MODEL,
-                    temperature=0.3,
-                )
-                summary_raw = (resp.choices[0].message.content or "").strip()
-                summary = strip_think(summary_raw)
-                return jsonify({"summary": summary})
-            except Exception as e:
-                msg = f"{type(e).__name__}: {e}"
-                print("[/summarize] ERROR:", msg)
-                low = str(e).lower()
-                is_rate = "rate limit" in low or "rate_limit" in low
-                is_conn = any(k in low for k in ["connection", "timeout", "timed out", "temporarily"])
-                retry_after = _parse_retry_after_seconds(str(e)) or base_sleep
-                attempt += 1
-
-                if (is_rate or is_conn) and attempt <= max_retries:
-                    sleep_for = retry_after * (2 ** (attempt - 1))
-                    print(f"[/summarize] retry in {sleep_for:.1f}s (attempt {attempt}/{max_retries})")
-                    time.sleep(sleep_for)
-                    continue
+        cache_key = summary_cache.make_key(mode, MODEL, text)
+        cached = summaries.get(cache_key)
+        record_cache("summary", "/summarize", cached is not None)
+        if cached is not None:
+            log.info("summarize cache hit", text_len=len(text), mode=mode)
+            return jsonify({"summary": cached, "sections": sections.parse(cached), "cached": True})
 
-                if is_rate:
-                    return jsonify({"error": "rate_limit", "message": str(e), "retry_after": max(5, int(retry_after))}), 429
-                if is_conn:
-                    return jsonify({"error": "upstream_connection", "message": str(e)}), 502
-                return jsonify({"error": str(e)}), 500
+        log.info("summarize start", text_len=len(text), mode=mode)
+
+        def _on_retry(attempt, delay, e):
+            UPSTREAM_RETRIES.inc(route="/summarize")
+            log.warning("summarize retry", attempt=attempt, delay_s=round(delay, 2),
+                        error=f"{type(e).__name__}: {e}")
+
+        try:
+            summary, longform_info = generate_summary(
+                text, mode, "/summarize", long_input=bool(data.get("long_input")), on_retry=_on_retry)
+        except PromptTooLong as e:
+            log.warning("summarize input too long", prompt_tokens=e.prompt_tokens, limit=e.limit)
+            return jsonify(e.to_dict()), e.status
+        except UpstreamError as e:
+            record_upstream_error("/summarize", e)
+            log.warning("summarize upstream error", error=e.error, detail=str(e))
+            return jsonify(e.to_dict()), e.status
+        except Exception as e:
+            record_upstream_error("/summarize", e)
+            log.error("summarize failed", error=f"{type(e).__name__}: {e}")
+            return jsonify({"error": str(e)}), 500
+
+        summaries.put(cache_key, summary)
+        body = {"summary": summary, "sections": sections.parse(summary)}
+        if longform_info:
+            body["longform"] = longform_info
+        return jsonify(body)
 
     except Exception as e:
-        print("ERROR /summarize (outer):", f"{type(e).__name__}: {e}")
-        traceback.print_exc()
+        log.exception("summarize failed (outer)")
         return jsonify({"error": str(e)}), 500
 
 
+# ---------- BATCH summarize (job queue) ----------
+# sisakan token rate limiter ini untuk request interaktif (/summarize, stream)
+JOB_RESERVE_TOKENS = float(os.environ.get("JOB_RESERVE_TOKENS", "1"))
+
+
+def _batch_process(text: str, mode: str) -> str:
+    cache_key = summary_cache.make_key(mode, MODEL, text)
+    cached = summaries.get(cache_key)
+    record_cache("summary", "batch", cached is not None)
+    if cached is not None:
+        return cached
+    try:
+        summary, _ = generate_summary(text, mode, "batch",
+                                      on_retry=lambda *a: UPSTREAM_RETRIES.inc(route="batch"))
+    except Exception as e:
+        record_upstream_error("batch", e)
+        raise
+    summaries.put(cache_key, summary)
+    return summary
+
+
+def _batch_ready() -> bool:
+    return llm.ready(JOB_RESERVE_TOKENS)
+
+
+def _batch_retry_delay(e: Exception):
+    """Detik sebelum item dicoba lagi; None = error permanen."""
+    if isinstance(e, UpstreamError):
+        return max(1.0, e.retry_after or 0.0)
+    if upstream.classify_error(e):
+        return 5.0
+    return None
+
+
+job_queue = jobs.from_env()
+batch_workers = jobs.WorkerPool(job_queue, _batch_process, workers=jobs.workers_from_env(),
+                                ready=_batch_ready, retry_delay=_batch_retry_delay)
+
+
+def _resume_batches():
+    try:
+        if job_queue.pending():
+            batch_workers.start()
+    except Exception:
+        log.exception("batch resume failed")
+
+
+# lanjutkan batch yang terpotong restart; jobs.db dibuka di thread latar, bukan saat import
+if MAIN_PROCESS:
+    threading.Thread(target=_resume_batches, name="batch-resume", daemon=True).start()
+
+
+@app.route("/api/summarize/batch", methods=["POST"])
+@require_auth
+def summarize_batch():
+    """Antrikan banyak {text, mode}; hasil dipantau pemiliknya lewat GET /api/jobs/<id>."""
+    data = request.get_json(force=True, silent=True) or {}
+    items = data.get("items")
+    default_mode = resolve_mode(data, g.user["sub"])
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "items_required"}), 400
+    max_items = jobs.max_items_from_env()
+    if len(items) > max_items:
+        return jsonify({"error": "too_many_items", "max": max_items}), 400
+    if not llm.configured:
+        return jsonify({"error": "groq_api_key_missing", "message": "GROQ_API_KEY not configured"}), 500
+
+    prepared, invalid = [], []
+    for i, item in enumerate(items):
+        if isinstance(item, str):
+            item = {"text": item}
+        if not isinstance(item, dict):
+            invalid.append(i)
+            continue
+        text = (item.get("text") or "").strip()
+        mode = (item.get("mode") or default_mode).strip().lower()
+        if not text or mode not in SUMMARY_MODES:
+            invalid.append(i)
+            continue
+        prepared.append({"key": summary_cache.make_key(mode, MODEL, text), "mode": mode, "text": text})
+    if invalid:
+        return jsonify({"error": "invalid_items", "indexes": invalid[:50], "allowed_modes": SUMMARY_MODES}), 400
+
+    job = job_queue.enqueue(prepared, user_id=g.user["sub"])
+    batch_workers.notify()
+    log.info("batch enqueued", job_id=job["job_id"], total=job["total"],
+             unique=job["unique"], reused=job["reused"])
+    return jsonify(dict(job, status_url=f"/api/jobs/{job['job_id']}")), 202
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+@require_auth
+def get_job(job_id):
+    """Progress + hasil batch milik user. `?items=0` untuk ringkasan status saja."""
+    # job user lain dijawab 404, sama seperti id yang tidak ada
+    job = job_queue.get(job_id, include_items=request.args.get("items", "1") != "0",
+                        user_id=g.user["sub"])
+    if job is None:
+        return jsonify({"error": "job_not_found"}), 404
+    return jsonify(job)
+
+
 # ---------- SAVE (history) ----------
 @app.route("/save", methods=["POST"])
 def save_summary():
     try:
-        try:
-            print("\n[/save] === request headers ===")
-            for k, v in request.headers.items():
-                print(f"{k}: {v}")
-        except Exception:
-            print("[/save] failed to print headers")
-
-        try:
-            raw = request.get_data(as_text=True)
-            print("[/save] raw body (first 2000 chars):", raw[:2000])
-        except Exception as e:
-            print("[/save] could not read raw body:", e)
-
         payload = {}
         try:
             payload = request.get_json(force=True, silent=False) or {}
-            print("[/save] parsed JSON keys:", list(payload.keys()))
         except Exception as e:
-            print("[/save] get_json failed:", type(e).__name__, e)
+            log.warning("save invalid json", error=type(e).__name__,
+                        content_length=request.content_length)
             return jsonify({"error": "invalid_json", "message": str(e)}), 400
 
+        # dump header + body hanya bila diminta (X-Debug-Dump) dan diizinkan LOG_DEBUG_DUMPS;
+        # Authorization dan isi transkrip tetap di-redact
+        if applog.wants_dump(request.headers):
+            log.dump("save request", headers=dict(request.headers), payload=payload)
+
         text = (payload.get("text") or "").strip()
         meta = payload.get("meta") or {}
 
         if not text:
-            print("[/save] empty text -> 400")
+            log.info("save empty text")
             return jsonify({"error": "empty_text"}), 400
 
         entry = {
             "id": str(uuid.uuid4()),
+            # pemilik dari token, bukan dari body: /api/history memfilter dengan ini
+            "user_id": (auth_utils.optional_user() or {}).get("sub"),
             "text": text,
+            "summary_result": payload.get("summary_result"),
             "meta": meta,
             "created_at": _now_iso()
         }
+        # bentuk terstruktur diparse ulang dari teks yang disimpan (bisa sudah diedit user)
+        entry["sections"] = sections.parse(entry["summary_result"]) if entry["summary_result"] else None
 
-        history_store.insert(0, entry)  # newest first
-        print(f"[/save] saved entry id={entry['id']} len={len(text)} created_at={entry['created_at']}")
+        history_store.add(entry)
+        log.info("save ok", entry_id=entry["id"], text_len=len(text))
         return jsonify({"status": "ok", "entry": entry}), 200
 
     except Exception as e:
-        print("ERROR /save (exception):", type(e).__name__, e)
-        traceback.print_exc()
+        log.exception("save failed")
         return jsonify({"error": str(e)}), 500
 
 
@@ -383,10 +722,10 @@ def save_summary():
 def save_echo():
     try:
         raw = request.get_data(as_text=True)
-        print("[/save_echo] got raw:", raw[:2000])
+        log.info("save_echo", body_len=len(raw))
         return jsonify({"ok": True, "echo": raw[:2000]}), 200
     except Exception as e:
-        print("ERROR /save_echo:", e)
+        log.exception("save_echo failed")
         return jsonify({"error": str(e)}), 500
 
 
@@ -396,9 +735,115 @@ def generate_share_token(length=32):
     return ''.join(secrets.choice(alphabet) for _ in range(length))
 
 
+@app.route("/api/summary_cache/stats", methods=["GET"])
+def summary_cache_stats():
+    return jsonify(summaries.stats())
+
+
+@app.route("/api/stream/stats", methods=["GET"])
+def stream_stats():
+    """Statistik frame summary_stream (untuk tuning STREAM_FLUSH_MS/CHARS)."""
+    return jsonify(streaming.frame_stats.snapshot())
+
+
+@app.route("/api/prompts", methods=["GET"])
+def list_prompts():
+    """Mode ringkasan yang tersedia (dari registry template) + anggaran tokennya."""
+    return jsonify({"modes": prompts.describe(), "context_tokens": prompts.context_tokens})
+
+
+@app.route("/api/llm/providers", methods=["GET"])
+def llm_providers():
+    """Provider LLM berurutan: model, status breaker, TTFT p50/p95, fallback & hedge."""
+    return jsonify(llm.stats())
+
+
+@app.route("/api/audio/stats", methods=["GET"])
+def audio_stats():
+    """Ingest audio: sesi aktif, job recognizer tertunda, partial yang dilewati."""
+    return jsonify(audio.stats())
+
+
+@app.route("/api/settings/cache/stats", methods=["GET"])
+def settings_cache_stats():
+    return jsonify(settings.stats())
+
+
+@app.route("/api/share/cache/stats", methods=["GET"])
+def share_cache_stats():
+    return jsonify(shared_cache.stats())
+
+
+@app.route("/api/http/pool_stats", methods=["GET"])
+def http_pool_stats():
+    """Pemakaian pool koneksi keluar per upstream."""
+    return jsonify(http_clients.pool_stats())
+
+
 @app.route("/api/history", methods=["GET"])
+@require_auth
 def api_history():
-    return jsonify({"history": history_store})
+    """History user terbaru dulu, per halaman (`limit`, cursor `before`)."""
+    try:
+        entries, next_before = history_store.list(
+            limit=request.args.get("limit", history_db.DEFAULT_PAGE_SIZE),
+            before=request.args.get("before") or None,
+            user_id=g.user["sub"],
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"history": entries, "next_before": next_before})
+
+
+@app.route("/api/history/export", methods=["GET"])
+@require_auth
+def api_history_export():
+    """
+    Semua history user dalam rentang `from` (inklusif) / `to` sebagai NDJSON atau
+    CSV yang di-stream, terlama dulu; gzip bila client mengirim
+    Accept-Encoding: gzip (matikan dengan gzip=0).
+    """
+    fmt = (request.args.get("format") or "ndjson").lower()
+    if fmt not in history_export.FORMATS:
+        return jsonify({"error": "invalid_format", "formats": sorted(history_export.FORMATS)}), 400
+    try:
+        start = history_db.parse_bound(request.args.get("from"))
+        end = history_db.parse_bound(request.args.get("to"), end=True)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    user_id = g.user["sub"]
+    gzip = request.args.get("gzip") != "0" and "gzip" in request.headers.get("Accept-Encoding", "")
+
+    body = history_export.stream(
+        history_store.iter_range(start, end, user_id=user_id), fmt, gzip=gzip,
+        start=start, end=end, user_id=user_id,
+    )
+    name = f"history-{(request.args.get('from') or 'all')[:10]}-{(request.args.get('to') or 'now')[:10]}.{fmt}"
+    resp = Response(body, content_type=history_export.FORMATS[fmt])
+    resp.headers["Content-Disposition"] = f'attachment; filename="{name}"'
+    resp.headers["Cache-Control"] = "no-store"
+    resp.headers["X-Accel-Buffering"] = "no"  # proxy jangan menahan stream
+    resp.headers["Vary"] = "Accept-Encoding"
+    if gzip:
+        resp.headers["Content-Encoding"] = "gzip"
+    return resp
+
+
+@app.route("/api/history/search", methods=["GET"])
+@require_auth
+def api_history_search():
+    """Full-text search atas transkrip, ringkasan, dan meta milik user."""
+    q = (request.args.get("q") or "").strip()
+    if not q:
+        return jsonify({"error": "q_required"}), 400
+    t0 = time.perf_counter()
+    results = history_store.search(
+        q,
+        limit=request.args.get("limit", 20),
+        user_id=g.user["sub"],
+    )
+    took_ms = round((time.perf_counter() - t0) * 1000, 2)
+    return jsonify({"q": q, "results": results, "took_ms": took_ms})
 
 
 # ---------- SHARE functionality ----------
@@ -413,41 +858,15 @@ def test_share_endpoint():
 
 
 @app.route("/api/share/create", methods=["POST"])
+@require_auth
 def create_share_token():
     """Create a share token for a history item"""
     try:
         if not supabase:
             return jsonify({"error": "supabase_not_configured"}), 500
             
-        # Get authorization header
-        auth_header = request.headers.get('Authorization', '')
-        if not auth_header.startswith('Bearer '):
-            return jsonify({"error": "missing_auth_token"}), 401
-            
-        token = auth_header.split(' ')[1]
-        
-        # Verify token with Supabase using REST API
-        try:
-            import requests
-            headers = {
-                'Authorization': f'Bearer {token}',
-                'apikey': SUPABASE_SERVICE_KEY,
-                'Content-Type': 'application/json'
-            }
-            response = requests.get(f'{SUPABASE_URL}/auth/v1/user', headers=headers)
-            
-            if response.status_code != 200:
-                print(f"Token verification failed: {response.status_code}")
-                return jsonify({"error": "invalid_token"}), 401
-                
-            user_data = response.json()
-            if not user_data or 'id' not in user_data:
-                return jsonify({"error": "invalid_token"}), 401
-                
-            user_id = user_data['id']
-        except Exception as e:
-            print(f"Token verification error: {e}")
-            return jsonify({"error": "invalid_token"}), 401
+        # Token sudah diverifikasi lokal oleh @require_auth
+        user_id = g.user['sub']
         
         # Get request data
         data = request.get_json(force=True, silent=True) or {}
@@ -462,7 +881,7 @@ def create_share_token():
             if not history_response.data or len(history_response.data) == 0:
                 return jsonify({"error": "history_not_found"}), 404
         except Exception as e:
-            print(f"History verification error: {e}")
+            log.warning("share: history verification failed", error=str(e))
             return jsonify({"error": "history_not_found"}), 404
         
         # Generate unique token
@@ -494,15 +913,60 @@ def create_share_token():
             })
             
         except Exception as e:
-            print(f"Share token creation error: {e}")
+            log.error("share: token creation failed", error=str(e))
             return jsonify({"error": "failed_to_create_token"}), 500
             
     except Exception as e:
-        print(f"Create share token error: {e}")
-        traceback.print_exc()
+        record_upstream_error("/api/share/create", e)
+        log.exception("share: create failed")
         return jsonify({"error": str(e)}), 500
 
 
+def _persist_share_views(counts):
+    """Satu RPC atomik per batch flush: view_count += count untuk setiap token."""
+    tokens = list(counts)
+    supabase.rpc('increment_share_views', {
+        'p_tokens': tokens,
+        'p_counts': [counts[t] for t in tokens],
+    }).execute()
+
+
+shared_cache = share_cache.ShareCache(ttl=share_cache.ttl_from_env())
+share_views = share_cache.ViewCounter(_persist_share_views, interval=share_cache.flush_interval_from_env(),
+                                      background=share_cache.flush_background_from_env())
+
+
+def _load_share(token):
+    """Satu query join share_tokens + histories. Return (share_data, payload) atau (None, error_code)."""
+    # settled: tidak ada flush yang sedang berjalan, jadi view_count di DB + view
+    # pending = total yang benar saat forget() di bawah
+    with share_views.settled():
+        share_response = supabase.table('share_tokens').select(
+            '*, histories(id, created_at, original_text, summary_result, metadata)'
+        ).eq('token', token).eq('is_active', True).execute()
+        if share_response.data:
+            share_views.forget(token)
+
+    if not share_response.data or len(share_response.data) == 0:
+        return None, "share_not_found"
+
+    share_data = dict(share_response.data[0])
+    history_data = share_data.pop('histories', None)
+    if not history_data:
+        return None, "content_not_found"
+
+    payload = {
+        "id": history_data['id'],
+        "date": history_data['created_at'],
+        "duration": (history_data.get('metadata') or {}).get('duration', ''),
+        "transcript": history_data['original_text'],
+        "summary": history_data['summary_result'],
+        "shared_at": share_data['created_at'],
+    }
+    shared_cache.put(token, share_data, payload)
+    return share_data, payload
+
+
 @app.route("/api/share/<token>", methods=["GET"])
 def get_shared_content(token):
     """Get shared content by token (public access)"""
@@ -513,153 +977,433 @@ def get_shared_content(token):
     if not token:
         return jsonify({"error": "token_required"}), 400
     
-    share_data = None
-    
     try:
-        # --- A. Get and Validate Share Token ---
-        share_response = supabase.table('share_tokens').select('*').eq('token', token).eq('is_active', True).execute()
-        
-        if not share_response.data or len(share_response.data) == 0:
-            return jsonify({"error": "share_not_found"}), 404
-            
-        share_data = share_response.data[0]
+        # --- A. Resolve token (cache, atau satu query join saat miss) ---
+        cached = shared_cache.get(token)
+        record_cache("share", "/api/share/<token>", cached is not None)
+        if cached:
+            share_data, payload = cached
+        else:
+            share_data, payload = _load_share(token)
+            if share_data is None:
+                if payload == "content_not_found":
+                    return jsonify({"error": "content_not_found", "message": "History entry deleted"}), 404
+                return jsonify({"error": "share_not_found"}), 404
         
         # Check expiration
         if share_data.get('expires_at'):
-            # 1. Konversi expires_at menjadi timezone-aware
             expires_at = datetime.fromisoformat(share_data['expires_at'].replace('Z', '+00:00'))
-            
-            # 2. Bandingkan dengan waktu saat ini yang juga timezone-aware (UTC)
-            # Perubahan di sini ⬇️
             if datetime.now(timezone.utc) > expires_at: 
+                shared_cache.invalidate(token)
                 return jsonify({"error": "share_expired"}), 410
         
-        # Check view limit
+        # Check view limit (DB + view lokal yang belum di-flush)
         max_views = share_data.get('max_views')
-        view_count = share_data.get('view_count')
+        view_count = (share_data.get('view_count') or 0) + share_views.local_views(token)
         if max_views and max_views > 0 and view_count >= max_views:
             return jsonify({"error": "share_limit_reached"}), 410
             
-        # --- B. Get History Content ---
-        # NOTE: Sisa kode di sini harus dipastikan berada di luar blok try/except 
-        # validasi token agar share_data bisa diakses.
-        
-        history_response = supabase.table('histories').select('id, created_at, original_text, summary_result, metadata').eq('id', share_data['history_id']).execute()
-        
-        if not history_response.data or len(history_response.data) == 0:
-            return jsonify({"error": "content_not_found", "message": "History entry deleted"}), 404
-            
-        history_data = history_response.data[0]
-        
-        # --- C. Increment View Count (Update) ---
-        try:
-            # Menggunakan view_count yang DIBACA dari database untuk menghindari race condition ringan
-            supabase.table('share_tokens').update({
-                'view_count': view_count + 1
-            }).eq('token', token).execute()
-        except Exception as e:
-            print(f"Failed to increment view count: {e}")
+        # --- B. Catat view (di-flush batch oleh ViewCounter) ---
+        share_views.hit(token)
             
-        # --- D. Format dan Kembalikan Respon Sukses ---
-        response_data = {
-            "id": history_data['id'],
-            "date": history_data['created_at'],
-            "duration": (history_data.get('metadata') or {}).get('duration', ''),
-            "transcript": history_data['original_text'],
-            "summary": history_data['summary_result'],
-            "shared_at": share_data['created_at'],
-            "view_count": view_count + 1
-        }
-        
+        # --- C. Format dan Kembalikan Respon Sukses ---
+        response_data = dict(payload, view_count=view_count + 1)
         return jsonify(response_data), 200
             
     except Exception as e:
         # Menangkap semua exception yang tidak terduga (RLS, Koneksi DB, NameError, dll.)
-        print(f"FATAL: Get shared content error: {e}")
-        traceback.print_exc()
+        record_upstream_error("/api/share/<token>", e)
+        log.exception("share: get shared content failed")
+        return jsonify({"error": "internal_server_error", "message": str(e)}), 500
+
+
+@app.route("/api/share/<token>", methods=["DELETE"])
+@require_auth
+def revoke_share_token(token):
+    """Nonaktifkan share token milik user; halaman share langsung berhenti tersaji."""
+    if not supabase:
+        return jsonify({"error": "supabase_not_configured"}), 500
+    try:
+        response = supabase.table('share_tokens').update({'is_active': False}).eq(
+            'token', token).eq('created_by', g.user['sub']).execute()
+    except Exception as e:
+        record_upstream_error("/api/share/<token>", e)
+        log.exception("share: revoke failed")
         return jsonify({"error": "internal_server_error", "message": str(e)}), 500
+    if not response.data:
+        return jsonify({"error": "share_not_found"}), 404
+    shared_cache.invalidate(token)
+    return jsonify({"status": "success"})
 
 # ---------- STREAM summarize (SocketIO) ----------
-@socketio.on("summarize_stream")
-def handle_summarize_stream(data):
-    sid = request.sid
+# Logika di bawah dipakai bersama oleh handler threading (di file ini)
+# dan handler asyncio (asgi.py).
+def plan_stream(sid: str, data: dict):
+    """
+    Validasi payload summarize_stream dan tentukan langkah berikutnya.
+
+    Return (events, job): `events` = list (nama_event, payload) yang langsung
+    dikirim ke client; jika `job` tidak None, prompt di dalamnya perlu di-stream
+    dari Groq.
+    """
     text = (data.get("text") or "").strip()
-    mode = (data.get("mode") or current_summary_mode).strip().lower()
+    mode = resolve_mode(data, sid=sid)
     if not text:
-        emit("summary_stream", {"error": "Teks kosong"})
-        return
+        return [("summary_stream", {"error": "Teks kosong"})], None
+    if mode not in prompts:
+        return [("summary_stream", {"error": "mode_invalid", "allowed": SUMMARY_MODES})], None
+
+    if not llm.configured:
+        return [("summary_stream", {"error": "groq_api_key_missing"})], None
+
+    cache_key = summary_cache.make_key(mode, MODEL, text)
+    cached = summaries.get(cache_key)
+    record_cache("summary", "summarize_stream", cached is not None)
+    if cached is not None:
+        log.info("stream cache hit", text_len=len(text), mode=mode)
+        session_summaries[sid] = {"mode": mode, "covered": text, "summary": cached}
+        return list(replay_events(cached)), None
+
+    incremental = bool(data.get("incremental"))
+    prompt, reused = plan_stream_prompt(sid, text, mode, incremental)
+    if prompt is None:
+        # tidak ada transkrip baru sejak ringkasan terakhir: token sudah ada di client
+        return list(replay_events(reused, tokens=False)), None
+
+    job = {"text": text, "mode": mode, "prompt": prompt, "cache_key": cache_key}
+    if needs_longform(prompt, bool(data.get("long_input"))):
+        # prompt reduce dirakit oleh prepare_stream_job() (langkah map memanggil Groq)
+        job["prompt"] = None
+        job["chunks"] = longform.split_chunks(text)
+        events = [("summary_stream", {"progress": {"stage": "map", "chunks": len(job["chunks"])}})]
+    else:
+        job["max_tokens"] = prompts.max_tokens(prompt)
+        events = []
+    log.info("stream start", text_len=len(text), prompt_tokens=prompt.tokens,
+             mode=mode, incremental=incremental, chunks=len(job.get("chunks") or []))
+    return events, job
+
+
+def prepare_stream_job(job: dict):
+    """
+    Untuk input panjang: jalankan langkah map lalu isi job["prompt"] dengan
+    prompt reduce. Return event progress untuk client (atau None).
+    Blocking; asgi.py memanggilnya lewat asyncio.to_thread.
+    """
+    if job.get("prompt") is not None:
+        return None
+    job["prompt"], info = longform_prompt(job["text"], job["mode"], "summarize_stream", job["chunks"])
+    job["max_tokens"] = prompts.max_tokens(job["prompt"])
+    return {"progress": dict(info, stage="reduce")}
 
-    if not client:
-        emit("summary_stream", {"error": "groq_api_key_missing"})
-        return
 
-    prompt = build_prompt(text, mode)
-    print(f"[stream] start SID={sid} text_len={len(text)} mode={mode}")
+def stream_request_kwargs(job: dict) -> dict:
+    return {
+        "messages": [{"role": "user", "content": job["prompt"]}],
+        "temperature": 0.3,
+        "max_tokens": job["max_tokens"],
+        "stream": True,
+    }
 
-    stop_evt = Event()
-    stop_flags[sid] = stop_evt
 
+def chunk_text(chunk):
+    """Ambil potongan teks dari satu chunk stream Groq (None bila kosong)."""
     try:
-        response = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model=MODEL,
-            temperature=0.3,
-            stream=True
-        )
+        choice = chunk.choices[0]
+    except Exception:
+        return None
 
-        token_count = 0
-        collected = []
-        for chunk in response:
-            if stop_evt.is_set():
-                print(f"[stream] stopped by client SID={sid}")
-                break
+    delta = getattr(choice, "delta", None)
+    if delta and getattr(delta, "content", None):
+        return delta.content
+    message_obj = getattr(choice, "message", None)
+    if message_obj and getattr(message_obj, "content", None):
+        return message_obj.content
+    return None
 
-            try:
-                choice = chunk.choices[0]
-            except Exception:
-                continue
 
-            text_piece = None
-            delta = getattr(choice, "delta", None)
-            if delta and getattr(delta, "content", None):
-                text_piece = delta.content
-            if not text_piece:
-                message_obj = getattr(choice, "message", None)
-                if message_obj and getattr(message_obj, "content", None):
-                    text_piece = message_obj.content
+def chunk_usage(chunk):
+    """Usage token di chunk terakhir stream (Groq: chunk.x_groq.usage)."""
+    x_groq = getattr(chunk, "x_groq", None)
+    usage = getattr(x_groq, "usage", None) if x_groq is not None else None
+    return usage or getattr(chunk, "usage", None)
+
+
+def on_stream_retry(attempt, delay, e):
+    UPSTREAM_RETRIES.inc(route="summarize_stream")
+    log.warning("stream retry", attempt=attempt, delay_s=round(delay, 2),
+                error=f"{type(e).__name__}: {e}")
+
+
+def final_event(summary: str) -> dict:
+    """Event penutup summary_stream: teks final + bentuk terstruktur per section."""
+    return {"final": summary, "sections": sections.parse(summary), "end": True}
 
-            if text_piece:
-                token_count += len(text_piece)
-                collected.append(text_piece)
-                emit("summary_stream", {"token": text_piece})
 
-        final_raw = "".join(collected).strip()
-        final_fmt = strip_think(final_raw)
-        emit("summary_stream", {"final": final_fmt, "end": True})
-        print(f"[stream] end SID={sid} tokens={token_count}")
+def finish_stream(sid: str, job: dict, collected: list, stopped: bool) -> dict:
+    """
+    Rakit pesan final dan simpan ringkasan untuk sesi + cache. `collected`
+    sudah disaring ThinkFilter, jadi cukup digabung tanpa regex kedua.
+    """
+    final_fmt = "".join(collected).strip()
+    if not stopped and final_fmt:
+        session_summaries[sid] = {"mode": job["mode"], "covered": job["text"], "summary": final_fmt}
+        summaries.put(job["cache_key"], final_fmt)
+    return final_event(final_fmt)
+
+
+def stream_error_event(sid: str, e: Exception, provider=None) -> dict:
+    if isinstance(e, PromptTooLong):
+        log.warning("stream input too long", prompt_tokens=e.prompt_tokens, limit=e.limit)
+        return e.to_dict()
+    record_upstream_error("summarize_stream", e)
+    if isinstance(e, UpstreamError):
+        log.warning("stream upstream error", error=e.error, detail=str(e))
+        return e.to_dict()
+    log.error("stream failed", error=f"{type(e).__name__}: {e}")
+    if upstream.classify_error(e) and (provider or llm.primary):
+        # putus di tengah stream: tetap dihitung oleh circuit breaker provider-nya
+        (provider or llm.primary).guard.breaker.record_failure()
+    return {"error": str(e)}
+
+
+def bind_socket_event(sid: str, event: str, data=None):
+    """Konteks log untuk satu event socket; client boleh mengirim `request_id` sendiri."""
+    rid = data.get("request_id") if isinstance(data, dict) else None
+    return applog.bind(route=event, request_id=rid or applog.new_request_id(), sid=sid)
+
+
+def stream_key(sid: str, data: dict) -> str:
+    """Identitas request summarize_stream, untuk mendeteksi request duplikat."""
+    text = (data.get("text") or "").strip()
+    mode = resolve_mode(data, sid=sid)
+    return summary_cache.make_key(f"{mode}:{bool(data.get('incremental'))}", MODEL, text)
+
+
+def admit_stream(sid: str, data: dict):
+    """
+    Daftarkan generasi baru untuk sesi (membatalkan generasi lama).
+    Return None jika identik dengan generasi yang masih berjalan.
+    """
+    ticket = stream_sessions.begin(sid, stream_key(sid, data))
+    if ticket is None:
+        STREAM_DUPLICATES.inc()
+        log.info("stream duplicate ignored")
+    return ticket
+
+
+def delivers(ticket) -> bool:
+    """Masih boleh mengirim ke client? (generasi yang digantikan harus diam)"""
+    return ticket.reason not in ("superseded", "disconnect")
+
+
+def close_ticket(ticket, job=None, char_count=0, usage=None):
+    """Lepas tiket sesi dan catat token Groq yang terbuang bila generasi dibatalkan."""
+    stream_sessions.end(ticket)
+    if ticket.reason is None:
+        return
+    STREAM_CANCELLED.inc(reason=ticket.reason)
+    if job is None or not job.get("prompt") or ticket.reason == "stopped":
+        return
+    # stream yang diputus tidak membawa usage; perkirakan dari panjang teks
+    completion = getattr(usage, "completion_tokens", None) or char_count // longform.CHARS_PER_TOKEN
+    LLM_WASTED_TOKENS.inc(job["prompt"].tokens, reason=ticket.reason, kind="prompt")
+    LLM_WASTED_TOKENS.inc(completion, reason=ticket.reason, kind="completion")
+    log.info("stream cancelled", reason=ticket.reason, chars=char_count)
+
+
+@socketio.on("summarize_stream")
+def handle_summarize_stream(data):
+    sid = request.sid
+    data = data or {}
+    log_token = bind_socket_event(sid, "summarize_stream", data)
+    ticket = admit_stream(sid, data)
+    if ticket is None:
+        applog.unbind(log_token)
+        return
+
+    job = None
+    response = None
+    char_count = 0
+    usage = None
+    collected = []
+    try:
+        # debounce hanya saat sesi sedang mengetik cepat (masih ada generasi berjalan):
+        # request yang segera digantikan request berikutnya tidak dikerjakan
+        if STREAM_DEBOUNCE > 0 and ticket.replaces and ticket.wait(STREAM_DEBOUNCE):
+            if ticket.reason == "superseded":
+                STREAM_DEBOUNCED.inc()
+            return
+
+        events, job = plan_stream(sid, data)
+        for name, ev in events:
+            emit(name, ev)
+        if job is None:
+            return
+
+        started = time.perf_counter()
+        progress = prepare_stream_job(job)
+        if ticket.cancelled and not delivers(ticket):
+            return
+        if progress:
+            emit("summary_stream", progress)
+        # fallback / hedge sampai token pertama; tiket memutus koneksi saat dibatalkan
+        response = llm.stream(on_retry=on_stream_retry, ticket=ticket, **stream_request_kwargs(job))
+
+        first_token_at = None
+        coalescer = streaming.coalescer_from_env()
+        think = streaming.ThinkFilter()
+        outline = sections.SectionParser()
+        # paced: frame tetap dikirim saat window habis walau upstream sedang diam
+        for chunk in streaming.paced(response, coalescer):
+            if ticket.cancelled:
+                break
+            if chunk is streaming.FLUSH_DUE:
+                frame = coalescer.flush()
+                if frame:
+                    emit("summary_stream", {"token": frame})
+                    for ev in outline.feed(frame):
+                        emit("summary_section", ev)
+                continue
+
+            usage = chunk_usage(chunk) or usage
+            text_piece = chunk_text(chunk)
+            if text_piece:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                char_count += len(text_piece)
+                visible = think.feed(text_piece)
+                if not visible:
+                    continue
+                collected.append(visible)
+                frame = coalescer.push(visible)
+                if frame and not ticket.cancelled:
+                    emit("summary_stream", {"token": frame})
+                    for ev in outline.feed(frame):
+                        emit("summary_section", ev)
+
+        if not delivers(ticket):
+            return
+        if ticket.cancelled:
+            log.info("stream stopped by client")
+        else:
+            tail = think.flush()
+            if tail:
+                collected.append(tail)
+                coalescer.push(tail)
+        frame = coalescer.flush()
+        if frame:
+            emit("summary_stream", {"token": frame})
+            for ev in outline.feed(frame):
+                emit("summary_section", ev)
+        for ev in outline.flush():
+            emit("summary_section", ev)
+        emit("summary_stream", finish_stream(sid, job, collected, ticket.cancelled))
+        record_generation("summarize_stream", started, first_token_at, usage)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        log.info("stream end", chars=char_count, completion_tokens=completion_tokens,
+                 think_chars=think.suppressed, provider=response.provider.name, hedged=response.hedged)
 
     except Exception as e:
-        msg = f"{type(e).__name__}: {e}"
-        print(f"[stream] error SID={sid}: {msg}")
-        emit("summary_stream", {"error": str(e)})
+        if not ticket.cancelled:
+            emit("summary_stream", stream_error_event(sid, e, response and response.provider))
+        elif delivers(ticket):
+            # response ditutup saat client menekan stop: kirim hasil sejauh ini
+            emit("summary_stream", finish_stream(sid, job, collected, True))
     finally:
-        stop_flags.pop(sid, None)
+        if response is not None:
+            response.close()
+        close_ticket(ticket, job, char_count, usage)
+        applog.unbind(log_token)
 
 
 @socketio.on("stop_stream")
 def handle_stop_stream():
-    sid = request.sid
-    if sid in stop_flags:
-        stop_flags[sid].set()
+    stream_sessions.cancel(request.sid, "stopped")
     emit("stop_stream")
 
 
+# =========================
+# Ingest audio (audio_ingest.py)
+# =========================
+def audio_events(task: dict) -> list:
+    """Hasil recognizer satu task -> [(event, payload)] untuk sesi socket-nya."""
+    if task["type"] == "final" or not task["future"].exception():
+        AUDIO_RECOGNITION.observe(time.perf_counter() - task["submitted"], type=task["type"])
+    events = audio.complete(task)
+    for event, payload in events:
+        if event == "audio_error":
+            log.warning("audio recognizer failed", sid=task["sid"], segment=payload.get("segment"),
+                        error=payload.get("message"))
+    return events
+
+
+def deliver_audio(task: dict):
+    # dipanggil dari thread callback ProcessPoolExecutor
+    for event, payload in audio_events(task):
+        socketio.emit(event, payload, to=task["sid"])
+
+
+@socketio.on("audio_start")
+def handle_audio_start(data=None):
+    try:
+        emit("audio_ready", audio.start(request.sid, data if isinstance(data, dict) else {}))
+    except audio_ingest.AudioError as e:
+        emit("audio_error", e.to_dict())
+
+
+@socketio.on("audio_chunk")
+def handle_audio_chunk(data=None):
+    try:
+        tasks = audio.push(request.sid, data)
+    except audio_ingest.AudioError as e:
+        emit("audio_error", e.to_dict())
+        return
+    for task in tasks:
+        task["future"].add_done_callback(lambda _f, task=task: deliver_audio(task))
+
+
+@socketio.on("audio_stop")
+def handle_audio_stop():
+    tasks, events = audio.stop(request.sid)
+    for task in tasks:
+        task["future"].add_done_callback(lambda _f, task=task: deliver_audio(task))
+    for event, payload in events:
+        emit(event, payload)
+
+
+def attach_socket_user(sid: str, auth=None):
+    """
+    Tentukan user sesi socket sekali saat connect (client mengirim
+    `auth: {token}`) dan muat setelannya ke cache; event summarize_stream
+    berikutnya cukup membaca cache lewat sid.
+    """
+    token = auth.get("token") if isinstance(auth, dict) else None
+    user = auth_utils.verify_or_none(token)
+    settings.attach(sid, user.get("sub") if user else None)
+
+
+@socketio.on("connect")
+def on_connect(auth=None):
+    SOCKET_SESSIONS.inc()
+    attach_socket_user(request.sid, auth)
+
+
+def release_socket(sid: str):
+    """Bersihkan state sesi socket yang putus (bisa menyentuh Redis / store bersama)."""
+    stream_sessions.cancel(sid, "disconnect")
+    session_summaries.pop(sid, None)
+    if audio.ready:
+        audio.drop(sid)
+    settings.detach(sid)
+
+
 @socketio.on("disconnect")
-def on_disconnect():
+def on_disconnect(*args):
+    SOCKET_SESSIONS.dec()
     sid = request.sid
-    if sid in stop_flags:
-        stop_flags[sid].set()
-    print(f"[socket] disconnect SID={sid}")
+    release_socket(sid)
+    log.info("socket disconnect", sid=sid)
 
 
 # =========================
@@ -0,0 +1,273 @@
+# backend/applog.py
+"""
+Logging terstruktur (JSON per baris) yang tidak memblokir request.
+
+- Record masuk ke antrian terbatas; satu thread listener yang menulis ke
+  stderr. Bila antrian penuh record dibuang (dihitung di `dropped`),
+  bukan membuat request menunggu I/O.
+- Field sensitif (Authorization, cookie, token, transkrip/ringkasan) selalu
+  di-redact; teks "Bearer xxx" di pesan juga disamarkan.
+- Setiap request HTTP / event socket punya request_id (header X-Request-ID
+  atau field `request_id` di payload socket) yang ikut di semua log-nya.
+- Sampling per route untuk log INFO/DEBUG; WARNING ke atas selalu ditulis.
+  Keputusan sampling diambil sekali per request, jadi log satu request
+  tidak terpotong sebagian.
+
+Env:
+    LOG_LEVEL=INFO
+    LOG_FORMAT=json | text
+    LOG_SAMPLE_DEFAULT=1.0
+    LOG_SAMPLE_RATES=/save=0.1,summarize_stream=0.25
+    LOG_QUEUE_SIZE=10000
+    LOG_DEBUG_DUMPS=0      # 1 = izinkan dump per request lewat header X-Debug-Dump: 1
+
+    log = applog.get_logger("api")
+    log.info("summarize start", text_len=len(text), mode=mode)
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+
+REDACT_KEYS = {
+    "authorization", "cookie", "set-cookie", "x-api-key", "apikey", "token", "access_token",
+    "refresh_token", "password", "text", "transcript", "original_text", "summary",
+    "summary_result", "final", "prompt", "raw", "body",
+}
+_BEARER = re.compile(r"(Bearer\s+)[A-Za-z0-9\-_\.=]+", re.IGNORECASE)
+
+_context = contextvars.ContextVar("log_context", default={})
+
+
+# =========================
+# Redaction
+# =========================
+def _redacted(value) -> str:
+    try:
+        return f"[redacted len={len(value)}]"
+    except TypeError:
+        return "[redacted]"
+
+
+def redact(value, key: str = None):
+    """Salinan `value` dengan field sensitif diganti penanda panjangnya saja."""
+    if key is not None and key.lower() in REDACT_KEYS and value not in (None, ""):
+        return _redacted(value)
+    if isinstance(value, dict):
+        return {k: redact(v, str(k)) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    if isinstance(value, str):
+        return _BEARER.sub(r"\1[redacted]", value)
+    return value
+
+
+# =========================
+# Request context & sampling
+# =========================
+def _parse_rates(spec: str) -> dict:
+    rates = {}
+    for part in (spec or "").split(","):
+        route, sep, rate = part.strip().rpartition("=")
+        if sep and route:
+            try:
+                rates[route] = max(0.0, min(1.0, float(rate)))
+            except ValueError:
+                continue
+    return rates
+
+
+SAMPLE_DEFAULT = float(os.environ.get("LOG_SAMPLE_DEFAULT", "1.0"))
+SAMPLE_RATES = _parse_rates(os.environ.get("LOG_SAMPLE_RATES", ""))
+DEBUG_DUMPS = os.environ.get("LOG_DEBUG_DUMPS", "0") == "1"
+
+
+def sample_rate(route: str) -> float:
+    return SAMPLE_RATES.get(route, SAMPLE_DEFAULT)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def bind(route: str = None, request_id: str = None, **fields):
+    """
+    Pasang konteks log untuk request/event saat ini. Return token untuk unbind().
+    Field yang sudah ada (mis. sid) dipertahankan kecuali ditimpa.
+    """
+    ctx = dict(_context.get())
+    if route is not None:
+        ctx["route"] = route
+        ctx["sampled"] = random.random() < sample_rate(route)
+    ctx["request_id"] = request_id or ctx.get("request_id") or new_request_id()
+    ctx.update(fields)
+    return _context.set(ctx)
+
+
+def unbind(token):
+    try:
+        _context.reset(token)
+    except ValueError:
+        # token dari context lain (mis. after_request di thread berbeda)
+        _context.set({})
+
+
+def current() -> dict:
+    return _context.get()
+
+
+def request_id():
+    return _context.get().get("request_id")
+
+
+class _ContextFilter(logging.Filter):
+    def filter(self, record):
+        ctx = _context.get()
+        record.ctx = ctx
+        if record.levelno >= logging.WARNING or getattr(record, "force", False):
+            return True
+        return ctx.get("sampled", True)
+
+
+# =========================
+# Formatter & handler
+# =========================
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        ctx = getattr(record, "ctx", {})
+        doc = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": redact(record.getMessage()),
+        }
+        for k in ("request_id", "sid", "route"):
+            if ctx.get(k) is not None:
+                doc[k] = ctx[k]
+        fields = getattr(record, "fields", None)
+        if fields:
+            doc.update(redact(fields))
+        if record.exc_text:
+            doc["exc"] = redact(record.exc_text)
+        return json.dumps(doc, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        ctx = getattr(record, "ctx", {})
+        parts = [time.strftime("%H:%M:%S", time.localtime(record.created)),
+                 record.levelname, f"[{record.name}]", redact(record.getMessage())]
+        if ctx.get("request_id"):
+            parts.append(f"rid={ctx['request_id']}")
+        for k, v in redact(getattr(record, "fields", None) or {}).items():
+            parts.append(f"{k}={v}")
+        line = " ".join(str(p) for p in parts)
+        if record.exc_text:
+            line += "\n" + redact(record.exc_text)
+        return line
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler yang membuang record saat antrian penuh, bukan menunggu."""
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # format JSON dikerjakan thread listener; di sini cukup bekukan pesan
+        # dan traceback (exc_info tidak aman dibawa lintas thread)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_setup_lock = threading.Lock()
+_handler = None
+_listener = None
+
+
+def setup():
+    """Pasang handler antrian di logger "transcribe" (idempotent)."""
+    global _handler, _listener
+    with _setup_lock:
+        if _handler is not None:
+            return
+        q = queue.Queue(maxsize=int(os.environ.get("LOG_QUEUE_SIZE", "10000")))
+        _handler = DroppingQueueHandler(q)
+        _handler.addFilter(_ContextFilter())
+
+        out = logging.StreamHandler(sys.stderr)
+        fmt = os.environ.get("LOG_FORMAT", "json").lower()
+        out.setFormatter(TextFormatter() if fmt == "text" else JsonFormatter())
+        _listener = logging.handlers.QueueListener(q, out, respect_handler_level=False)
+        _listener.start()
+
+        root = logging.getLogger("transcribe")
+        root.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+        root.addHandler(_handler)
+        root.propagate = False
+
+        atexit.register(_listener.stop)
+
+
+def dropped() -> int:
+    return _handler.dropped if _handler is not None else 0
+
+
+class StructLogger:
+    """Pembungkus logging.Logger: `log.info("pesan", key=value, ...)`."""
+
+    def __init__(self, name: str):
+        self._logger = logging.getLogger(f"transcribe.{name}")
+
+    def _log(self, level, msg, exc_info=None, force=False, **fields):
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, msg, exc_info=exc_info, extra={"fields": fields, "force": force})
+
+    def debug(self, msg, **fields):
+        self._log(logging.DEBUG, msg, **fields)
+
+    def info(self, msg, **fields):
+        self._log(logging.INFO, msg, **fields)
+
+    def warning(self, msg, **fields):
+        self._log(logging.WARNING, msg, **fields)
+
+    def error(self, msg, **fields):
+        self._log(logging.ERROR, msg, **fields)
+
+    def exception(self, msg, **fields):
+        self._log(logging.ERROR, msg, exc_info=True, **fields)
+
+    def dump(self, msg, **fields):
+        """Dump debug opt-in: tidak ikut sampling, tetap di-redact."""
+        self._log(logging.INFO, msg, force=True, dump=True, **fields)
+
+
+def get_logger(name: str) -> StructLogger:
+    setup()
+    return StructLogger(name)
+
+
+def wants_dump(headers) -> bool:
+    """Dump debug hanya jika diizinkan server (LOG_DEBUG_DUMPS=1) dan diminta request."""
+    return DEBUG_DUMPS and headers.get("X-Debug-Dump", "") in ("1", "true")
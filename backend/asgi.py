@@ -0,0 +1,274 @@
+# backend/asgi.py
+"""
+Mode serving asyncio (ASGI) untuk summarizer streaming.
+
+Handler Socket.IO dan client Groq berjalan sebagai coroutine, jadi setiap
+summarize_stream yang aktif hanya memakan satu task asyncio (bukan satu
+thread OS). Route HTTP Flask tetap dilayani lewat adaptor WSGI->ASGI.
+
+Jalankan dengan:
+    uvicorn backend.asgi:app --host 0.0.0.0 --port 5001
+"""
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import socketio
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import api
+import applog
+import sections
+import shared_state
+import streaming
+
+# WsgiToAsgi bawaan menjalankan semua request WSGI di satu thread
+# (thread_sensitive=True): route HTTP Flask antre satu per satu, dan di bawah
+# beban executor-nya bisa rusak ("CurrentThreadExecutor already quit").
+# Route HTTP dijalankan di pool thread sendiri (ASGI_WSGI_THREADS).
+_wsgi_pool = ThreadPoolExecutor(max_workers=int(os.environ.get("ASGI_WSGI_THREADS", "64")),
+                                thread_name_prefix="wsgi")
+
+
+class ClientDisconnected(OSError):
+    pass
+
+
+class _PooledWsgiInstance(WsgiToAsgiInstance):
+    run_wsgi_app = sync_to_async(WsgiToAsgiInstance.__dict__["run_wsgi_app"].func,
+                                 thread_sensitive=False, executor=_wsgi_pool)
+
+    async def __call__(self, scope, receive, send):
+        # uvicorn diam-diam membuang body setelah client putus, jadi response
+        # streaming (mis. /api/history/export) akan terus membaca DB sampai
+        # habis. Setelah body request terbaca, tunggu http.disconnect; send
+        # berikutnya gagal dan iterator WSGI berhenti (generator ditutup).
+        disconnected = asyncio.Event()
+        watcher = None
+
+        async def watch():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        async def receive_body():
+            nonlocal watcher
+            message = await receive()
+            if not message.get("more_body") and watcher is None:
+                watcher = asyncio.ensure_future(watch())
+            return message
+
+        async def guarded_send(message):
+            if disconnected.is_set():
+                raise ClientDisconnected("client disconnected")
+            await send(message)
+
+        try:
+            await super().__call__(scope, receive_body, guarded_send)
+        except ClientDisconnected:
+            pass
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+
+
+class PooledWsgiToAsgi(WsgiToAsgi):
+    async def __call__(self, scope, receive, send):
+        await _PooledWsgiInstance(self.wsgi_application, self.duplicate_header_limit)(scope, receive, send)
+
+
+_mq = shared_state.message_queue_from_env()
+sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins="*",
+                           # channel sama dengan default Flask-SocketIO, jadi worker threading
+                           # dan ASGI bisa dicampur di belakang load balancer yang sama
+                           client_manager=socketio.AsyncRedisManager(_mq, channel="flask-socketio")
+                           if _mq else None)
+app = socketio.ASGIApp(sio, other_asgi_app=PooledWsgiToAsgi(api.app))
+
+log = applog.get_logger("asgi")
+
+
+@sio.on("summarize_stream")
+async def handle_summarize_stream(sid, data):
+    data = data or {}
+    # setiap handler berjalan di task sendiri, jadi konteks log tidak bocor antar sesi
+    api.bind_socket_event(sid, "summarize_stream", data)
+    # store sesi / cache / history / jobs memakai SQLite atau Redis (blocking):
+    # semuanya dijalankan di thread supaya satu disk / Redis yang lambat tidak
+    # menahan stream lain di event loop yang sama
+    ticket = await asyncio.to_thread(api.admit_stream, sid, data)
+    if ticket is None:
+        return
+
+    job = None
+    response = None
+    chunks = None
+    char_count = 0
+    usage = None
+    collected = []
+    try:
+        if api.STREAM_DEBOUNCE > 0 and ticket.replaces:
+            await asyncio.sleep(api.STREAM_DEBOUNCE)
+            if ticket.cancelled:
+                if ticket.reason == "superseded":
+                    api.STREAM_DEBOUNCED.inc()
+                return
+
+        events, job = await asyncio.to_thread(api.plan_stream, sid, data)
+        for name, ev in events:
+            await sio.emit(name, ev, to=sid)
+        if job is None:
+            return
+
+        # digantikan / dihentikan -> batalkan task ini; finally menutup koneksi upstream
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+        ticket.on_cancel(lambda: loop.call_soon_threadsafe(task.cancel))
+
+        started = time.perf_counter()
+        # langkah map (input panjang) memakai pool thread longform
+        progress = await asyncio.to_thread(api.prepare_stream_job, job)
+        if progress:
+            await sio.emit("summary_stream", progress, to=sid)
+        # fallback / hedge sampai token pertama (provider yang kalah dibatalkan)
+        response = await api.llm.astream(on_retry=api.on_stream_retry, **api.stream_request_kwargs(job))
+
+        first_token_at = None
+        coalescer = streaming.coalescer_from_env()
+        think = streaming.ThinkFilter()
+        outline = sections.SectionParser()
+        # apaced: frame tetap dikirim saat window habis walau upstream sedang diam
+        chunks = streaming.apaced(response, coalescer)
+        async for chunk in chunks:
+            if chunk is streaming.FLUSH_DUE:
+                frame = coalescer.flush()
+                if frame:
+                    await sio.emit("summary_stream", {"token": frame}, to=sid)
+                    for ev in outline.feed(frame):
+                        await sio.emit("summary_section", ev, to=sid)
+                continue
+            usage = api.chunk_usage(chunk) or usage
+            text_piece = api.chunk_text(chunk)
+            if text_piece:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                char_count += len(text_piece)
+                visible = think.feed(text_piece)
+                if not visible:
+                    continue
+                collected.append(visible)
+                frame = coalescer.push(visible)
+                if frame:
+                    await sio.emit("summary_stream", {"token": frame}, to=sid)
+                    for ev in outline.feed(frame):
+                        await sio.emit("summary_section", ev, to=sid)
+
+        tail = think.flush()
+        if tail:
+            collected.append(tail)
+            coalescer.push(tail)
+        frame = coalescer.flush()
+        if frame:
+            await sio.emit("summary_stream", {"token": frame}, to=sid)
+            for ev in outline.feed(frame):
+                await sio.emit("summary_section", ev, to=sid)
+        for ev in outline.flush():
+            await sio.emit("summary_section", ev, to=sid)
+
+        final = await asyncio.to_thread(api.finish_stream, sid, job, collected, False)
+        await sio.emit("summary_stream", final, to=sid)
+        api.record_generation("summarize_stream", started, first_token_at, usage)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        log.info("stream end", chars=char_count, completion_tokens=completion_tokens,
+                 think_chars=think.suppressed, provider=response.provider.name, hedged=response.hedged)
+
+    except asyncio.CancelledError:
+        if not ticket.cancelled:
+            raise  # server shutdown, bukan pembatalan dari scheduler
+        if api.delivers(ticket):
+            log.info("stream stopped by client")
+            final = await asyncio.to_thread(api.finish_stream, sid, job, collected, True)
+            await sio.emit("summary_stream", final, to=sid)
+    except Exception as e:
+        if not ticket.cancelled:
+            await sio.emit("summary_stream", api.stream_error_event(sid, e, response and response.provider),
+                           to=sid)
+    finally:
+        if chunks is not None:
+            await chunks.aclose()
+        if response is not None:
+            # tutup koneksi upstream segera (mis. saat dihentikan / digantikan)
+            await response.aclose()
+        # shield: tiket tetap dilepas walau task dibatalkan lagi selama menunggu
+        await asyncio.shield(asyncio.to_thread(api.close_ticket, ticket, job, char_count, usage))
+
+
+@sio.on("stop_stream")
+async def handle_stop_stream(sid):
+    await asyncio.to_thread(api.stream_sessions.cancel, sid, "stopped")
+    await sio.emit("stop_stream", to=sid)
+
+
+async def deliver_audio(task: dict):
+    await asyncio.wrap_future(task["future"])
+    for event, payload in api.audio_events(task):
+        await sio.emit(event, payload, to=task["sid"])
+
+
+def _spawn_delivery(tasks: list):
+    for task in tasks:
+        asyncio.ensure_future(deliver_audio(task))
+
+
+@sio.on("audio_start")
+async def handle_audio_start(sid, data=None):
+    try:
+        # start() pertama membuat process pool recognizer (blocking): jangan di event loop
+        ready = await asyncio.to_thread(api.audio.start, sid, data if isinstance(data, dict) else {})
+    except api.audio_ingest.AudioError as e:
+        await sio.emit("audio_error", e.to_dict(), to=sid)
+        return
+    await sio.emit("audio_ready", ready, to=sid)
+
+
+@sio.on("audio_chunk")
+async def handle_audio_chunk(sid, data=None):
+    # decode + VAD cukup murah (vectorized) untuk dijalankan langsung di event loop;
+    # recognizer berjalan di process pool
+    try:
+        _spawn_delivery(api.audio.push(sid, data))
+    except api.audio_ingest.AudioError as e:
+        await sio.emit("audio_error", e.to_dict(), to=sid)
+
+
+@sio.on("audio_stop")
+async def handle_audio_stop(sid):
+    tasks, events = api.audio.stop(sid)
+    _spawn_delivery(tasks)
+    for event, payload in events:
+        await sio.emit(event, payload, to=sid)
+
+
+@sio.on("connect")
+async def on_connect(sid, environ, auth=None):
+    api.SOCKET_SESSIONS.inc()
+    # verifikasi token bisa mengambil JWKS / setelan dari store: jangan di event loop
+    await asyncio.to_thread(api.attach_socket_user, sid, auth)
+
+
+@sio.on("disconnect")
+async def on_disconnect(sid, *args):
+    api.SOCKET_SESSIONS.dec()
+    await asyncio.to_thread(api.release_socket, sid)
+    log.info("socket disconnect", sid=sid)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="127.0.0.1", port=int(os.environ.get("PORT", 5001)))
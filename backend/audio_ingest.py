@@ -0,0 +1,578 @@
+# backend/audio_ingest.py
+"""
+Ingest audio di server lewat Socket.IO, supaya transkripsi tidak bergantung
+pada speech recognition browser (Chrome saja).
+
+Per sesi socket: decoder (PCM / Opus) -> RingBuffer berukuran tetap ->
+EnergyVAD (energi per frame dihitung vectorized dengan NumPy) yang memotong
+ucapan -> recognizer di process pool (CPU). Selama ucapan berlangsung
+transkrip `partial` dikirim berkala; saat ucapan selesai dikirim `final`.
+
+Protokol (handler di api.py dan asgi.py):
+
+    audio_start {"codec": "pcm16" | "f32" | "opus", "sample_rate": 16000, "language": "id"}
+        -> audio_ready {"codec", "sample_rate", "frame_ms", "max_utterance_s"}
+        -> audio_error {"error": ...}
+    audio_chunk <bytes> | {"seq": 0, "data": <bytes>}
+        PCM mono little-endian (pcm16 = int16, f32 = float32 [-1, 1]) atau satu
+        paket Opus per chunk. Kirim setelah audio_ready. `seq` dianjurkan: di
+        mode threading event bisa diproses tidak berurutan, jadi chunk
+        diurutkan ulang berdasarkan seq.
+        -> transcript {"type": "partial" | "final", "segment": 0, "text": "...",
+                       "start_ms": 1200, "end_ms": 3400}
+    audio_stop
+        -> transcript final untuk ucapan yang masih terbuka, lalu audio_end {"segments": n}
+
+Final dikirim berurutan per segment; partial yang sudah basi (segment-nya
+sudah final, atau ada partial lebih baru) dibuang. Paling banyak satu partial
+per sesi yang sedang dikerjakan, dan partial dilewati bila antrean recognizer
+penuh (AUDIO_MAX_PENDING), jadi beban CPU terbatas; final tidak pernah dibuang.
+
+Recognizer:
+    stub     teks deterministik dari durasi ucapan (test / load test)
+    whisper  faster-whisper (CTranslate2, CPU int8): pip install faster-whisper
+    Opus butuh `pip install opuslib` (+ libopus).
+
+Env:
+    AUDIO_RECOGNIZER=            # kosong = fitur nonaktif | stub | whisper
+    AUDIO_WHISPER_MODEL=small
+    AUDIO_WORKERS=               # default separuh jumlah CPU
+    AUDIO_MP_START=              # forkserver | spawn | fork (default: forkserver, spawn)
+    AUDIO_MAX_SESSIONS=50
+    AUDIO_MAX_PENDING=8
+    AUDIO_MAX_CHUNK_BYTES=262144
+    AUDIO_FRAME_MS=30
+    AUDIO_VAD_MARGIN_DB=12       # ambang = noise floor + margin
+    AUDIO_VAD_MIN_DB=-50         # ambang tidak pernah di bawah ini (dBFS)
+    AUDIO_VAD_START_MS=90        # suara beruntun sebelum ucapan dianggap mulai
+    AUDIO_VAD_END_MS=600         # hening beruntun sebelum ucapan dipotong
+    AUDIO_PREROLL_MS=200         # audio sebelum awal ucapan yang ikut dikirim
+    AUDIO_PARTIAL_MS=1000
+    AUDIO_MAX_UTTERANCE_S=15     # ucapan lebih panjang dipotong paksa
+"""
+import importlib.util
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+HAS_OPUS = importlib.util.find_spec("opuslib") is not None
+HAS_WHISPER = importlib.util.find_spec("faster_whisper") is not None
+
+CODECS = ("pcm16", "f32", "opus")
+OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+MODEL_RATE = 16000  # sample rate yang diharapkan recognizer
+REORDER_MAX = 32  # chunk yang ditahan menunggu seq yang hilang
+
+
+class AudioError(ValueError):
+    def __init__(self, error: str, message: str = None):
+        super().__init__(message or error)
+        self.error = error
+
+    def to_dict(self) -> dict:
+        return {"error": self.error, "message": str(self)}
+
+
+# =========================
+# Buffer & decoder
+# =========================
+class RingBuffer:
+    """
+    Sampel int16 dengan kapasitas tetap; sampel dialamatkan dengan indeks
+    absolut sejak awal sesi. Sampel tertua ditimpa saat penuh.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._buf = np.zeros(capacity, dtype=np.int16)
+        self.start = 0  # indeks absolut sampel tertua yang masih ada
+        self.end = 0  # indeks absolut setelah sampel terbaru
+
+    def write(self, samples: np.ndarray):
+        n = len(samples)
+        if n >= self.capacity:
+            samples = samples[-self.capacity:]
+            self.end += n - self.capacity
+            n = self.capacity
+        pos = self.end % self.capacity
+        first = min(n, self.capacity - pos)
+        self._buf[pos:pos + first] = samples[:first]
+        self._buf[:n - first] = samples[first:]
+        self.end += n
+        self.start = max(self.start, self.end - self.capacity)
+
+    def read(self, start: int, end: int) -> np.ndarray:
+        start, end = max(start, self.start), min(end, self.end)
+        if end <= start:
+            return np.zeros(0, dtype=np.int16)
+        a, b = start % self.capacity, end % self.capacity
+        if a < b:
+            return self._buf[a:b].copy()
+        return np.concatenate((self._buf[a:], self._buf[:b]))
+
+
+class _PcmDecoder:
+    def __init__(self, dtype):
+        self.dtype = np.dtype(dtype).newbyteorder("<")
+        self._rest = b""
+
+    def decode(self, chunk: bytes) -> np.ndarray:
+        data = self._rest + chunk
+        usable = len(data) - len(data) % self.dtype.itemsize
+        self._rest = data[usable:]
+        samples = np.frombuffer(data[:usable], dtype=self.dtype)
+        if self.dtype.kind == "f":
+            return (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+        return samples.astype(np.int16)
+
+
+class _OpusDecoder:
+    def __init__(self, rate: int):
+        import opuslib
+        self._dec = opuslib.Decoder(rate, 1)
+        self._max_frame = rate * 120 // 1000  # paket Opus paling panjang 120 ms
+
+    def decode(self, packet: bytes) -> np.ndarray:
+        return np.frombuffer(self._dec.decode(packet, self._max_frame), dtype="<i2").astype(np.int16)
+
+
+def make_decoder(codec: str, rate: int):
+    if codec == "pcm16":
+        return _PcmDecoder(np.int16)
+    if codec == "f32":
+        return _PcmDecoder(np.float32)
+    if codec == "opus":
+        if not HAS_OPUS:
+            raise AudioError("codec_unsupported", "Opus butuh paket opuslib di server")
+        if rate not in OPUS_RATES:
+            raise AudioError("sample_rate_invalid", f"Opus hanya mendukung {OPUS_RATES}")
+        return _OpusDecoder(rate)
+    raise AudioError("codec_unsupported", f"codec harus salah satu dari {CODECS}")
+
+
+# =========================
+# VAD
+# =========================
+class VadConfig:
+    def __init__(self, frame_ms=30, margin_db=12.0, min_db=-50.0, start_ms=90, end_ms=600,
+                 preroll_ms=200, partial_ms=1000, max_utterance_s=15.0):
+        self.frame_ms = frame_ms
+        self.margin_db = margin_db
+        self.min_db = min_db
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.preroll_ms = preroll_ms
+        self.partial_ms = partial_ms
+        self.max_utterance_s = max_utterance_s
+
+
+class EnergyVAD:
+    """
+    VAD berbasis energi. Energi (dBFS) semua frame utuh di satu chunk dihitung
+    sekaligus dengan NumPy; noise floor mengikuti rata-rata frame hening.
+    process() mengembalikan [("start" | "end", indeks_sampel_absolut)].
+    """
+
+    FLOOR_MAX_DB = -25.0  # noise floor tidak boleh ikut naik ke level suara
+
+    def __init__(self, rate: int, cfg: VadConfig):
+        self.frame = max(1, rate * cfg.frame_ms // 1000)
+        self.cfg = cfg
+        self.start_frames = max(1, cfg.start_ms // cfg.frame_ms)
+        self.end_frames = max(1, cfg.end_ms // cfg.frame_ms)
+        self.floor_db = cfg.min_db - cfg.margin_db
+        self.speaking = False
+        self._pos = 0  # indeks absolut awal frame berikutnya
+        self._rest = np.zeros(0, dtype=np.int16)
+        self._voiced_run = 0
+        self._silent_run = 0
+
+    @property
+    def threshold_db(self) -> float:
+        return max(self.cfg.min_db, self.floor_db + self.cfg.margin_db)
+
+    def energies(self, samples: np.ndarray) -> np.ndarray:
+        """dBFS per frame utuh; sisa sampel disimpan untuk chunk berikutnya."""
+        data = np.concatenate((self._rest, samples)) if len(self._rest) else samples
+        n = len(data) // self.frame
+        self._rest = data[n * self.frame:]
+        frames = data[:n * self.frame].reshape(n, self.frame).astype(np.float32) / 32768.0
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        return 20.0 * np.log10(rms + 1e-10)
+
+    def process(self, samples: np.ndarray) -> list:
+        db = self.energies(samples)
+        if not len(db):
+            return []
+        voiced = db > self.threshold_db
+        if not self.speaking and (~voiced).any():
+            floor = float(db[~voiced].mean())
+            self.floor_db = min(self.FLOOR_MAX_DB, 0.9 * self.floor_db + 0.1 * floor)
+        events = []
+        for i, v in enumerate(voiced.tolist()):
+            frame_end = self._pos + (i + 1) * self.frame
+            if not self.speaking:
+                self._voiced_run = self._voiced_run + 1 if v else 0
+                if self._voiced_run >= self.start_frames:
+                    self.speaking = True
+                    self._silent_run = 0
+                    events.append(("start", frame_end - self._voiced_run * self.frame))
+            else:
+                self._silent_run = 0 if v else self._silent_run + 1
+                if self._silent_run >= self.end_frames:
+                    self.speaking = False
+                    self._voiced_run = 0
+                    # sisakan sedikit hening di ujung ucapan
+                    tail = min(self._silent_run, max(1, self.end_frames // 3))
+                    events.append(("end", frame_end - (self._silent_run - tail) * self.frame))
+        self._pos += len(db) * self.frame
+        return events
+
+
+# =========================
+# Sesi
+# =========================
+class AudioSession:
+    def __init__(self, sid: str, codec: str, rate: int, language: str, cfg: VadConfig):
+        self.sid = sid
+        self.codec = codec
+        self.rate = rate
+        self.language = language
+        self.cfg = cfg
+        self.decoder = make_decoder(codec, rate)
+        self.vad = EnergyVAD(rate, cfg)
+        self.max_samples = int(cfg.max_utterance_s * rate)
+        self.preroll = rate * cfg.preroll_ms // 1000
+        self.partial_every = rate * cfg.partial_ms // 1000
+        self.ring = RingBuffer(self.max_samples + self.preroll + rate)
+        self.segment = 0
+        self.utt_start = None
+        self.last_partial_end = None
+        self.partial_inflight = False
+        self.partial_seq = {}  # {segment: seq partial terbaru yang sudah dikirim}
+        self.next_final = 0
+        self.finals = {}  # final yang selesai lebih cepat dari pendahulunya
+        self.closing = False
+        self.next_seq = 0
+        self._reorder = {}
+        self.lock = threading.Lock()
+
+    def ms(self, index: int) -> int:
+        return int(index * 1000 // self.rate)
+
+    def _cut(self, end: int) -> dict:
+        cut = {"type": "final", "segment": self.segment, "start": self.utt_start, "end": end}
+        self.segment += 1
+        self.utt_start = None
+        self.last_partial_end = None
+        return cut
+
+    def feed(self, chunk: bytes, seq: int = None) -> list:
+        """Return potongan yang perlu dikenali: [{"type", "segment", "start", "end"}]."""
+        if seq is None:
+            return self._process(chunk)
+        if seq < self.next_seq:
+            return []  # duplikat / terlambat
+        self._reorder[seq] = chunk
+        cuts = []
+        while self._reorder:
+            if self.next_seq not in self._reorder:
+                if len(self._reorder) <= REORDER_MAX:
+                    break
+                self.next_seq = min(self._reorder)  # chunk hilang: lompati
+            cuts += self._process(self._reorder.pop(self.next_seq))
+            self.next_seq += 1
+        return cuts
+
+    def _process(self, chunk: bytes) -> list:
+        samples = self.decoder.decode(chunk)
+        if not len(samples):
+            return []
+        self.ring.write(samples)
+        cuts = []
+        for kind, index in self.vad.process(samples):
+            if kind == "start":
+                self.utt_start = max(self.ring.start, index - self.preroll)
+            elif self.utt_start is not None and index > self.utt_start:
+                cuts.append(self._cut(index))
+            else:
+                self.utt_start = None  # sisa hening setelah potongan paksa
+        end = self.ring.end
+        if self.utt_start is not None and self.vad.speaking:
+            if end - self.utt_start >= self.max_samples:
+                cuts.append(self._cut(end))
+                self.utt_start = end  # ucapan berlanjut sebagai segment baru
+            elif (not self.partial_inflight
+                  and end - (self.last_partial_end or self.utt_start) >= self.partial_every):
+                self.last_partial_end = end
+                cuts.append({"type": "partial", "segment": self.segment, "start": self.utt_start, "end": end})
+        return cuts
+
+    def close(self) -> list:
+        """audio_stop: potong ucapan yang masih terbuka."""
+        self.closing = True
+        if self.utt_start is not None and self.ring.end > self.utt_start:
+            return [self._cut(self.ring.end)]
+        return []
+
+
+# =========================
+# Recognizer (process pool)
+# =========================
+class StubRecognizer:
+    """Tanpa model: teks deterministik dari durasi, untuk test dan load test."""
+
+    def transcribe(self, audio: np.ndarray, language: str, final: bool) -> str:
+        seconds = len(audio) / MODEL_RATE
+        return f"ucapan {seconds:.1f} detik" + ("" if final else " ...")
+
+
+class WhisperRecognizer:
+    def __init__(self, model: str):
+        from faster_whisper import WhisperModel
+        threads = int(os.environ.get("AUDIO_WHISPER_THREADS", "0"))
+        self.model = WhisperModel(model, device="cpu", compute_type="int8", cpu_threads=threads)
+
+    def transcribe(self, audio: np.ndarray, language: str, final: bool) -> str:
+        segments, _ = self.model.transcribe(
+            audio, language=language or None, beam_size=5 if final else 1,
+            vad_filter=False, condition_on_previous_text=False)
+        return " ".join(s.text.strip() for s in segments).strip()
+
+
+RECOGNIZERS = {"stub": lambda model: StubRecognizer(), "whisper": WhisperRecognizer}
+
+_worker_recognizer = None
+
+
+def _init_worker(backend: str, model: str):
+    global _worker_recognizer
+    _worker_recognizer = RECOGNIZERS[backend](model)
+
+
+def resample(audio: np.ndarray, rate: int) -> np.ndarray:
+    if rate == MODEL_RATE or not len(audio):
+        return audio
+    n = int(len(audio) * MODEL_RATE / rate)
+    return np.interp(np.arange(n) * (rate / MODEL_RATE), np.arange(len(audio)), audio).astype(np.float32)
+
+
+def _recognize(pcm: bytes, rate: int, language: str, final: bool) -> str:
+    """Dijalankan di proses worker; input int16 mentah supaya murah di-pickle."""
+    audio = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+    return _worker_recognizer.transcribe(resample(audio, rate), language, final)
+
+
+def _mp_context():
+    """
+    Default forkserver (spawn bila tidak tersedia): saat pool dibuat server
+    sudah multi-thread (Socket.IO, listener log, worker batch), dan fork dari
+    proses multi-thread bisa mewarisi lock yang sedang dipegang thread lain.
+    Forkserver hanya me-preload modul ini (numpy); skrip utama `python api.py`
+    di-import ulang di worker sebagai __mp_main__, lihat guard di api.py.
+    AUDIO_MP_START menimpa pilihan ini.
+    """
+    method = os.environ.get("AUDIO_MP_START")
+    if not method:
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    ctx = multiprocessing.get_context(method)
+    if method == "forkserver":
+        ctx.set_forkserver_preload([__name__])
+    return ctx
+
+
+# =========================
+# Manager
+# =========================
+class AudioIngest:
+    def __init__(self, recognizer: str = "", model: str = "small", workers: int = 2,
+                 cfg: VadConfig = None, max_sessions: int = 50, max_pending: int = 8,
+                 max_chunk_bytes: int = 256 * 1024):
+        self.recognizer = recognizer
+        self.model = model
+        self.workers = workers
+        self.cfg = cfg or VadConfig()
+        self.max_sessions = max_sessions
+        self.max_pending = max_pending
+        self.max_chunk_bytes = max_chunk_bytes
+        self._sessions = {}
+        self._pool = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.counts = {"chunks": 0, "bytes": 0, "partials": 0, "finals": 0,
+                       "partials_skipped": 0, "partials_stale": 0, "errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.recognizer)
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self.counts[key] += n
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=_mp_context(),
+                    initializer=_init_worker, initargs=(self.recognizer, self.model))
+            return self._pool
+
+    def start(self, sid: str, opts: dict) -> dict:
+        if not self.enabled:
+            raise AudioError("audio_disabled", "AUDIO_RECOGNIZER belum dikonfigurasi")
+        codec = (opts.get("codec") or "pcm16").lower()
+        try:
+            rate = int(opts.get("sample_rate") or MODEL_RATE)
+        except (TypeError, ValueError):
+            raise AudioError("sample_rate_invalid")
+        if not 8000 <= rate <= 48000:
+            raise AudioError("sample_rate_invalid", "sample_rate harus 8000-48000")
+        with self._lock:
+            if sid not in self._sessions and len(self._sessions) >= self.max_sessions:
+                raise AudioError("too_many_sessions")
+        session = AudioSession(sid, codec, rate, opts.get("language") or "id", self.cfg)
+        self._executor()
+        with self._lock:
+            self._sessions[sid] = session
+        return {"codec": codec, "sample_rate": rate, "frame_ms": self.cfg.frame_ms,
+                "max_utterance_s": self.cfg.max_utterance_s}
+
+    def _submit(self, session: AudioSession, cut: dict) -> dict:
+        pcm = session.ring.read(cut["start"], cut["end"]).tobytes()
+        task = {"sid": session.sid, "session": session, "type": cut["type"],
+                "segment": cut["segment"], "start_ms": session.ms(cut["start"]),
+                "end_ms": session.ms(cut["end"]), "submitted": time.perf_counter()}
+        if cut["type"] == "partial":
+            session.partial_inflight = True
+            task["seq"] = cut["end"]
+        with self._lock:
+            self._pending += 1
+        task["future"] = self._executor().submit(
+            _recognize, pcm, session.rate, session.language, cut["type"] == "final")
+        return task
+
+    def push(self, sid: str, data) -> list:
+        """Proses satu audio_chunk; return task recognizer yang baru dikirim ke pool."""
+        seq = None
+        if isinstance(data, dict):
+            seq, data = data.get("seq"), data.get("data")
+            seq = int(seq) if isinstance(seq, (int, float)) else None
+        if not isinstance(data, (bytes, bytearray)):
+            raise AudioError("chunk_invalid", "audio_chunk harus berisi bytes")
+        if len(data) > self.max_chunk_bytes:
+            raise AudioError("chunk_too_large", f"maksimal {self.max_chunk_bytes} byte per chunk")
+        with self._lock:
+            session = self._sessions.get(sid)
+        if session is None or session.closing:
+            raise AudioError("audio_not_started", "kirim audio_start dulu")
+        self._count("chunks")
+        self._count("bytes", len(data))
+        tasks = []
+        with session.lock:
+            for cut in session.feed(bytes(data), seq):
+                if cut["type"] == "partial" and self._pending >= self.max_pending:
+                    self._count("partials_skipped")
+                    continue
+                tasks.append(self._submit(session, cut))
+        return tasks
+
+    def stop(self, sid: str):
+        """audio_stop: return (task final terakhir, event yang langsung dikirim)."""
+        with self._lock:
+            session = self._sessions.get(sid)
+        if session is None:
+            return [], [("audio_end", {"segments": 0})]
+        with session.lock:
+            tasks = [self._submit(session, cut) for cut in session.close()]
+            events = [] if tasks or session.next_final < session.segment else self._end(session)
+        return tasks, events
+
+    def _end(self, session: AudioSession) -> list:
+        with self._lock:
+            if self._sessions.get(session.sid) is session:
+                del self._sessions[session.sid]
+        return [("audio_end", {"segments": session.segment})]
+
+    def drop(self, sid: str):
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+    def complete(self, task: dict) -> list:
+        """
+        Dipanggil saat future task selesai. Return [(event, payload)] untuk
+        dikirim ke sesi: final berurutan per segment, partial basi dibuang.
+        """
+        with self._lock:
+            self._pending -= 1
+        session = task["session"]
+        with self._lock:
+            alive = self._sessions.get(task["sid"]) is session
+        error = task["future"].exception()
+        payload = {"type": task["type"], "segment": task["segment"],
+                   "start_ms": task["start_ms"], "end_ms": task["end_ms"],
+                   "text": None if error else task["future"].result()}
+        with session.lock:
+            if task["type"] == "partial":
+                session.partial_inflight = False
+                stale = (task["segment"] < session.next_final or task["segment"] in session.finals
+                         or session.partial_seq.get(task["segment"], -1) >= task["seq"])
+                if not alive or error or stale:
+                    self._count("partials_stale" if stale else "errors")
+                    return []
+                session.partial_seq[task["segment"]] = task["seq"]
+                self._count("partials")
+                return [("transcript", payload)]
+
+            session.finals[task["segment"]] = (payload, error)
+            events = []
+            while session.next_final in session.finals:
+                ready, err = session.finals.pop(session.next_final)
+                session.partial_seq.pop(session.next_final, None)
+                session.next_final += 1
+                if err is not None:
+                    self._count("errors")
+                    events.append(("audio_error", {"error": "recognizer_failed", "segment": ready["segment"],
+                                                   "message": f"{type(err).__name__}: {err}"}))
+                else:
+                    self._count("finals")
+                    events.append(("transcript", ready))
+            if session.closing and session.next_final >= session.segment:
+                events += self._end(session)
+        return events if alive else []
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.counts, sessions=len(self._sessions), pending=self._pending,
+                        recognizer=self.recognizer or None, workers=self.workers)
+
+
+def from_env() -> AudioIngest:
+    cfg = VadConfig(
+        frame_ms=int(os.environ.get("AUDIO_FRAME_MS", "30")),
+        margin_db=float(os.environ.get("AUDIO_VAD_MARGIN_DB", "12")),
+        min_db=float(os.environ.get("AUDIO_VAD_MIN_DB", "-50")),
+        start_ms=int(os.environ.get("AUDIO_VAD_START_MS", "90")),
+        end_ms=int(os.environ.get("AUDIO_VAD_END_MS", "600")),
+        preroll_ms=int(os.environ.get("AUDIO_PREROLL_MS", "200")),
+        partial_ms=int(os.environ.get("AUDIO_PARTIAL_MS", "1000")),
+        max_utterance_s=float(os.environ.get("AUDIO_MAX_UTTERANCE_S", "15")),
+    )
+    recognizer = os.environ.get("AUDIO_RECOGNIZER", "").strip().lower()
+    if recognizer and recognizer not in RECOGNIZERS:
+        raise ValueError(f"AUDIO_RECOGNIZER tidak dikenal: {recognizer} (pilih {sorted(RECOGNIZERS)})")
+    if recognizer == "whisper" and not HAS_WHISPER:
+        raise ValueError("AUDIO_RECOGNIZER=whisper butuh `pip install faster-whisper`")
+    return AudioIngest(
+        recognizer=recognizer,
+        model=os.environ.get("AUDIO_WHISPER_MODEL", "small"),
+        workers=int(os.environ.get("AUDIO_WORKERS", "0")) or max(1, (os.cpu_count() or 2) // 2),
+        cfg=cfg,
+        max_sessions=int(os.environ.get("AUDIO_MAX_SESSIONS", "50")),
+        max_pending=int(os.environ.get("AUDIO_MAX_PENDING", "8")),
+        max_chunk_bytes=int(os.environ.get("AUDIO_MAX_CHUNK_BYTES", str(256 * 1024))),
+    )
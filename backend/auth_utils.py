@@ -0,0 +1,211 @@
+# auth_utils.py
+"""
+Verifikasi JWT Supabase secara lokal (tanpa round trip ke /auth/v1/user).
+
+- Kunci publik diambil dari JWKS sekali lalu di-cache; `kid` yang belum
+  dikenal memicu refresh (rotasi kunci), dibatasi JWKS_MIN_REFRESH detik.
+- Proyek lama yang masih HS256 bisa memakai SUPABASE_JWT_SECRET; tanpa
+  secret itu token HS256 dicek ke /auth/v1/user (apikey SUPABASE_SERVICE_KEY)
+  dan hasilnya di-cache maksimal REMOTE_VERIFY_TTL detik.
+- Token yang sudah lolos verifikasi di-cache per hash token sampai `exp`.
+"""
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+
+import httpx
+import jwt
+from flask import request, g, jsonify
+from jwt import PyJWK
+
+import applog
+import http_clients
+
+ASYMMETRIC_ALGS = ["RS256", "ES256"]
+JWKS_MIN_REFRESH = 30.0
+TOKEN_CACHE_SIZE = 2048
+REMOTE_VERIFY_TTL = 60.0
+
+log = applog.get_logger("auth")
+
+
+def _supabase_url() -> str:
+    return os.getenv("SUPABASE_URL", "").rstrip("/")
+
+
+def _issuer() -> str:
+    return f"{_supabase_url()}/auth/v1"
+
+
+class JWKSCache:
+    def __init__(self, url: str = None, session: httpx.Client = None):
+        self._url = url
+        self._session = session
+        self._keys = {}  # {kid: PyJWK}
+        self._fetched_at = 0.0
+        self._lock = Lock()
+
+    @property
+    def url(self) -> str:
+        return self._url or os.getenv(
+            "SUPABASE_JWKS_URL", f"{_supabase_url()}/auth/v1/.well-known/jwks.json"
+        )
+
+    @property
+    def session(self) -> httpx.Client:
+        # dibuat saat pertama dipakai: pool keep-alive + timeout upstream "auth"
+        if self._session is None:
+            self._session = http_clients.httpx_client("auth")
+        return self._session
+
+    def load(self, jwks: dict):
+        """Pasang isi JWKS secara langsung (juga dipakai tes dengan kunci lokal)."""
+        keys = {}
+        for data in jwks.get("keys", []):
+            try:
+                keys[data.get("kid")] = PyJWK(data)
+            except jwt.PyJWKError:
+                continue  # algoritma/kunci yang tidak didukung dilewati
+        with self._lock:
+            self._keys = keys
+            self._fetched_at = time.monotonic()
+
+    def refresh(self, force: bool = False) -> bool:
+        with self._lock:
+            if not force and time.monotonic() - self._fetched_at < JWKS_MIN_REFRESH:
+                return False
+        resp = self.session.get(self.url)
+        resp.raise_for_status()
+        self.load(resp.json())
+        return True
+
+    def get(self, kid: str) -> PyJWK:
+        key = self._keys.get(kid)
+        if key is None and self.refresh(force=not self._keys):
+            key = self._keys.get(kid)
+        if key is None:
+            raise jwt.InvalidKeyError(f"unknown signing key: {kid}")
+        return key
+
+
+jwks = JWKSCache()
+
+
+def verify_remote(token: str, session: httpx.Client = None) -> dict:
+    """Cek token ke Supabase (/auth/v1/user); payload mirip klaim JWT."""
+    session = session or jwks.session
+    resp = session.get(f"{_issuer()}/user", headers={
+        "Authorization": f"Bearer {token}",
+        "apikey": os.getenv("SUPABASE_SERVICE_KEY", ""),
+    })
+    if resp.status_code != 200:
+        raise jwt.InvalidTokenError(f"auth/v1/user returned {resp.status_code}")
+    user = resp.json() or {}
+    if "id" not in user:
+        raise jwt.InvalidTokenError("auth/v1/user returned no user id")
+    claims = jwt.decode(token, options={"verify_signature": False})
+    # di-cache singkat saja: tanpa secret, pencabutan sesi hanya terlihat lewat server
+    exp = min(claims.get("exp", 0), time.time() + REMOTE_VERIFY_TTL)
+    return dict(claims, sub=user["id"], email=user.get("email"), exp=exp)
+
+_verified = OrderedDict()  # {sha256(token): payload}
+_verified_lock = Lock()
+
+
+def _cached_payload(token_hash: str):
+    with _verified_lock:
+        payload = _verified.get(token_hash)
+        if payload is None:
+            return None
+        if payload.get("exp", 0) <= time.time():
+            del _verified[token_hash]
+            return None
+        _verified.move_to_end(token_hash)
+        return payload
+
+
+def _remember(token_hash: str, payload: dict):
+    with _verified_lock:
+        _verified[token_hash] = payload
+        _verified.move_to_end(token_hash)
+        while len(_verified) > TOKEN_CACHE_SIZE:
+            _verified.popitem(last=False)
+
+
+def verify_supabase_jwt(token: str):
+    token_hash = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    payload = _cached_payload(token_hash)
+    if payload is not None:
+        return payload
+
+    header = jwt.get_unverified_header(token)
+    alg = header.get("alg")
+    if alg == "HS256":
+        secret = os.getenv("SUPABASE_JWT_SECRET", "")
+        if not secret:
+            payload = verify_remote(token)
+            _remember(token_hash, payload)
+            return payload
+        key, algorithms = secret, ["HS256"]
+    elif alg in ASYMMETRIC_ALGS:
+        key, algorithms = jwks.get(header.get("kid")).key, [alg]
+    else:
+        raise jwt.InvalidAlgorithmError(f"unsupported alg: {alg}")
+
+    payload = jwt.decode(
+        token,
+        key,
+        algorithms=algorithms,
+        audience="authenticated",     # aud default Supabase
+        issuer=_issuer(),
+        options={"require": ["exp", "iat"]},
+    )
+    _remember(token_hash, payload)
+    return payload  # berisi sub (user id), email, dll.
+
+
+def bearer_token():
+    """Ambil token dari header Authorization: Bearer ... (atau query/body sebagai fallback)."""
+    auth = request.headers.get("Authorization", "")
+    token = auth.split(" ", 1)[1].strip() if auth.startswith("Bearer ") else None
+    if not token:
+        token = request.args.get("token") or (request.get_json(silent=True) or {}).get("token")
+    return token
+
+
+def verify_or_none(token):
+    """Payload JWT bila token valid, None bila kosong/tidak valid (tanpa 401)."""
+    if not token:
+        return None
+    try:
+        return verify_supabase_jwt(token)
+    except Exception as e:
+        log.warning("token verification failed", error=f"{type(e).__name__}: {e}")
+        return None
+
+
+def optional_user():
+    """User request saat ini (payload JWT) atau None untuk pemanggil anonim."""
+    if "user" not in g:
+        g.user = verify_or_none(bearer_token())
+    return g.user
+
+
+def require_auth(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = bearer_token()
+        if not token:
+            return jsonify({"error": "missing_auth_token"}), 401
+
+        try:
+            g.user = verify_supabase_jwt(token)
+        except Exception as e:
+            log.warning("token verification failed", error=f"{type(e).__name__}: {e}")
+            return jsonify({"error": "invalid_token"}), 401
+
+        return fn(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,203 @@
+# backend/bench/coldstart.py
+"""
+Benchmark cold start: waktu import backend (per modul, dari `python -X
+importtime`) dan waktu sampai respons /test pertama, di interpreter baru
+setiap run, ditambah waktu init client lazy (lazy.warm_up) yang dibayar
+request pertama yang memakainya.
+
+    python bench/coldstart.py --runs 5 --out bench/results/coldstart.json
+    python bench/coldstart.py --module asgi --baseline bench/baselines/coldstart.json
+
+Angka = median dari --runs. Dengan --baseline, import total / first request
+yang naik lebih dari --tolerance dan lebih dari --min-delta-ms dicetak
+sebagai regresi dan exit code 1. Env upstream diisi nilai palsu (tanpa
+jaringan) supaya client Supabase/LLM dikonfigurasi seperti produksi.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+
+_IMPORTTIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$")
+
+# dijalankan di interpreter baru; mencetak satu baris JSON
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import {module} as target
+t1 = time.perf_counter()
+api = sys.modules["api"]
+resp = api.app.test_client().get("/test")
+t2 = time.perf_counter()
+clients = {{}}
+if {warmup}:
+    import lazy
+    clients = lazy.warm_up()
+print("COLDSTART " + json.dumps({{"import_s": t1 - t0, "first_request_s": t2 - t0,
+                                 "status": resp.status_code, "clients": clients}}))
+"""
+
+
+def probe_env(data_dir: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "GROQ_API_KEY": "fake",
+        "GROQ_BASE_URL": "http://127.0.0.1:9",
+        "SUPABASE_URL": "http://127.0.0.1:9",
+        "SUPABASE_SERVICE_KEY": "fake-service-key",
+        "HISTORY_BACKEND": "sqlite",
+        "SETTINGS_BACKEND": "sqlite",
+        "HISTORY_DB_PATH": os.path.join(data_dir, "history.db"),
+        "SETTINGS_DB_PATH": os.path.join(data_dir, "settings.db"),
+        "JOB_DB_PATH": os.path.join(data_dir, "jobs.db"),
+        "STATE_STORE_URL": "memory",
+        "LOG_LEVEL": "WARNING",
+        "LAZY_WARMUP": "0",
+    })
+    return env
+
+
+def parse_importtime(stderr: str, module: str) -> dict:
+    """{modul anak langsung dari `module`: kumulatif ms} + total."""
+    rows = []
+    for line in stderr.splitlines():
+        m = _IMPORTTIME.match(line)
+        if m:
+            rows.append((len(m.group(3)), m.group(4), int(m.group(2)) / 1000.0))
+    # importtime mencetak anak sebelum induknya; indentasi 1 = level teratas
+    total, children = None, {}
+    for i, (indent, name, cumulative) in enumerate(rows):
+        if indent == 1 and name == module:
+            total = cumulative
+            j = i - 1
+            while j >= 0 and rows[j][0] > 1:
+                if rows[j][0] == 3:
+                    children[rows[j][1]] = rows[j][2]
+                j -= 1
+            break
+    return {"total_ms": total, "modules": children}
+
+
+def run_once(module: str, warmup: bool, env: dict) -> dict:
+    code = PROBE.format(module=module, warmup=warmup)
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=BACKEND_DIR,
+                          env=env, capture_output=True, text=True, timeout=120)
+    wall = time.perf_counter() - started
+    line = next((l for l in proc.stdout.splitlines() if l.startswith("COLDSTART ")), None)
+    if proc.returncode != 0 or line is None:
+        raise RuntimeError(f"probe gagal (exit {proc.returncode}):\n{proc.stderr[-2000:]}")
+    res = json.loads(line[len("COLDSTART "):])
+    res["process_s"] = wall
+    res["importtime"] = parse_importtime(proc.stderr, module)
+    return res
+
+
+def _median(values):
+    values = [v for v in values if isinstance(v, (int, float))]
+    return round(statistics.median(values), 2) if values else None
+
+
+def run(args) -> dict:
+    data_dir = tempfile.mkdtemp(prefix="transcribe-coldstart-")
+    env = probe_env(data_dir)
+    runs = []
+    try:
+        for i in range(args.runs):
+            res = run_once(args.module, args.warmup, env)
+            runs.append(res)
+            print(f"run {i + 1}: import={res['import_s'] * 1000:.0f}ms "
+                  f"first_request={res['first_request_s'] * 1000:.0f}ms "
+                  f"process={res['process_s'] * 1000:.0f}ms", file=sys.stderr)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    names = set()
+    for r in runs:
+        names.update(r["importtime"]["modules"])
+    modules = {n: _median([r["importtime"]["modules"].get(n) for r in runs]) for n in names}
+    modules = dict(sorted(modules.items(), key=lambda kv: -(kv[1] or 0))[:args.top])
+    clients = {}
+    for r in runs:
+        for name, ms in r["clients"].items():
+            clients.setdefault(name, []).append(ms)
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "module": args.module,
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "cpus": os.cpu_count()},
+        "runs": args.runs,
+        "import_ms": _median([r["import_s"] * 1000 for r in runs]),
+        "importtime_total_ms": _median([r["importtime"]["total_ms"] for r in runs]),
+        "first_request_ms": _median([r["first_request_s"] * 1000 for r in runs]),
+        "process_ms": _median([r["process_s"] * 1000 for r in runs]),
+        "modules_ms": modules,
+        "lazy_init_ms": {k: _median(v) if any(isinstance(x, (int, float)) for x in v) else v[0]
+                         for k, v in clients.items()},
+    }
+
+
+COMPARED = ("import_ms", "first_request_ms")
+
+
+def compare(result: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> list:
+    regressions = []
+    for key in COMPARED:
+        b, c = baseline.get(key), result.get(key)
+        if not b or c is None:
+            continue
+        change = (c - b) / b
+        if change > tolerance and c - b >= min_delta_ms:
+            regressions.append(f"{key}: {b} -> {c} ({change:+.0%})")
+    return regressions
+
+
+def write_json(path: str, doc: dict):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--module", default="api", help="modul yang di-import (api atau asgi)")
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--top", type=int, default=15, help="jumlah modul terberat yang dilaporkan")
+    p.add_argument("--no-warmup", dest="warmup", action="store_false",
+                   help="jangan ukur waktu init client lazy")
+    p.add_argument("--out", default=os.path.join(BENCH_DIR, "results", "coldstart.json"))
+    p.add_argument("--baseline", help="file baseline JSON untuk dibandingkan")
+    p.add_argument("--save-baseline", help="tulis hasil run ini sebagai baseline")
+    p.add_argument("--tolerance", type=float, default=0.25)
+    p.add_argument("--min-delta-ms", type=float, default=50.0)
+    args = p.parse_args()
+
+    result = run(args)
+    print(f"import p50={result['import_ms']}ms first_request p50={result['first_request_ms']}ms",
+          file=sys.stderr)
+    for name, ms in result["modules_ms"].items():
+        print(f"  {name:24s} {ms}ms", file=sys.stderr)
+    for name, ms in result["lazy_init_ms"].items():
+        print(f"  lazy {name:19s} {ms}ms", file=sys.stderr)
+    write_json(args.out, result)
+    print(f"hasil: {args.out}", file=sys.stderr)
+    if args.save_baseline:
+        write_json(args.save_baseline, result)
+        print(f"baseline: {args.save_baseline}", file=sys.stderr)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance, args.min_delta_ms)
+        for r in regressions:
+            print(f"REGRESI {r}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
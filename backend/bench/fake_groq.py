@@ -0,0 +1,167 @@
+# backend/bench/fake_groq.py
+"""
+Server palsu yang kompatibel dengan endpoint chat completions Groq/OpenAI.
+Dipakai untuk load test tanpa jaringan / tanpa memakai kuota Groq.
+
+    python bench/fake_groq.py --port 8090 --ttft 0.3 --tps 80 --rate-429 0.05
+    GROQ_BASE_URL=http://127.0.0.1:8090 GROQ_API_KEY=fake python api.py
+
+--rate-429 menyuntikkan respons 429 (dengan header Retry-After) secara acak
+untuk menguji rate limiter / retry di jalur serving; --rate-5xx menyuntikkan
+503. --tail-rate/--tail-ttft membuat sebagian request lambat sebelum token
+pertama (ekor TTFT), untuk menguji hedged request (providers.py).
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = (
+    "**Ringkasan Patologi Klinis**\n\n"
+    "**Jenis Pemeriksaan:**\n- Histopatologi\n\n"
+    "**Jenis Spesimen:**\n- Jaringan biopsi\n\n"
+    "**Diagnosis:**\n- Sesuai teks sumber\n\n"
+    "**Rekomendasi / Tindak Lanjut:**\n- Kontrol ulang\n"
+)
+
+
+def make_handler(cfg):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def handle(self):
+            try:
+                super().handle()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client memutus koneksi (mis. request hedge yang kalah)
+
+        def do_POST(self):
+            if not self.path.endswith("/chat/completions"):
+                self.send_error(404)
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            cfg.count("requests")
+            if cfg.rate_429 and random.random() < cfg.rate_429:
+                cfg.count("rate_limited")
+                self._json(429, {"error": {"message": "Rate limit reached (fake)",
+                                           "type": "tokens", "code": "rate_limit_exceeded"}},
+                           headers={"Retry-After": str(cfg.retry_after)})
+                return
+            if cfg.rate_5xx and random.random() < cfg.rate_5xx:
+                cfg.count("server_errors")
+                self._json(503, {"error": {"message": "Service unavailable (fake)",
+                                           "type": "internal_server_error"}})
+                return
+            model = body.get("model", "fake")
+            words = [w + " " for w in REPLY.split(" ")]
+            prompt = " ".join(m.get("content") or "" for m in body.get("messages", []))
+            usage = {"prompt_tokens": max(1, len(prompt) // 4), "completion_tokens": len(words),
+                     "total_tokens": max(1, len(prompt) // 4) + len(words)}
+            slow = cfg.tail_rate and random.random() < cfg.tail_rate
+            if slow:
+                cfg.count("slow")
+            time.sleep(cfg.tail_ttft if slow else cfg.ttft)
+
+            if not body.get("stream"):
+                time.sleep(len(words) / cfg.tps)
+                self._json(200, {
+                    "id": f"chatcmpl-{uuid.uuid4().hex}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": REPLY}}],
+                    "usage": usage,
+                })
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            cid = f"chatcmpl-{uuid.uuid4().hex}"
+            for i, w in enumerate(words):
+                if i:
+                    time.sleep(1.0 / cfg.tps)
+                self._chunk({
+                    "id": cid, "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": w}, "finish_reason": None}],
+                })
+            self._chunk({
+                "id": cid, "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                "x_groq": {"id": cid, "usage": usage},
+            })
+            self._write(b"data: [DONE]\n\n")
+            self._write(b"")
+
+        def _json(self, status, obj, headers=None):
+            data = json.dumps(obj).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _chunk(self, obj):
+            self._write(b"data: " + json.dumps(obj).encode() + b"\n\n")
+
+        def _write(self, data: bytes):
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+    return Handler
+
+
+class Config:
+    def __init__(self, ttft=0.3, tps=80.0, rate_429=0.0, retry_after=1,
+                 rate_5xx=0.0, tail_rate=0.0, tail_ttft=3.0):
+        self.ttft = ttft
+        self.tps = tps
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.rate_5xx = rate_5xx
+        self.tail_rate = tail_rate
+        self.tail_ttft = tail_ttft
+        self.stats = {"requests": 0, "rate_limited": 0, "server_errors": 0, "slow": 0}
+        self._lock = threading.Lock()
+
+    def count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+
+def serve(port=8090, ttft=0.3, tps=80.0, rate_429=0.0, retry_after=1,
+          rate_5xx=0.0, tail_rate=0.0, tail_ttft=3.0):
+    """Return server (belum jalan); `server.cfg.stats` menghitung request, 429, 5xx, lambat."""
+    cfg = Config(ttft, tps, rate_429, retry_after, rate_5xx, tail_rate, tail_ttft)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(cfg))
+    server.daemon_threads = True
+    server.cfg = cfg
+    return server
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--port", type=int, default=8090)
+    p.add_argument("--ttft", type=float, default=0.3, help="detik sebelum token pertama")
+    p.add_argument("--tps", type=float, default=80.0, help="token per detik per stream")
+    p.add_argument("--rate-429", type=float, default=0.0, help="peluang respons 429 per request (0-1)")
+    p.add_argument("--retry-after", type=int, default=1, help="header Retry-After (detik) pada 429")
+    p.add_argument("--rate-5xx", type=float, default=0.0, help="peluang respons 503 per request (0-1)")
+    p.add_argument("--tail-rate", type=float, default=0.0, help="peluang request lambat (0-1)")
+    p.add_argument("--tail-ttft", type=float, default=3.0, help="TTFT request lambat (detik)")
+    args = p.parse_args()
+    print(f"fake groq on http://127.0.0.1:{args.port} ttft={args.ttft}s tps={args.tps} "
+          f"rate_429={args.rate_429} rate_5xx={args.rate_5xx} tail={args.tail_rate}@{args.tail_ttft}s")
+    serve(args.port, args.ttft, args.tps, args.rate_429, args.retry_after,
+          args.rate_5xx, args.tail_rate, args.tail_ttft).serve_forever()
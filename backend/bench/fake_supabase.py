@@ -0,0 +1,111 @@
+# backend/bench/fake_supabase.py
+"""
+Server palsu yang meniru bagian PostgREST Supabase yang dipakai
+/api/share/<token>, untuk load test tanpa proyek Supabase sungguhan.
+
+Setiap token berawalan "bench-" dianggap share aktif (tanpa kedaluwarsa /
+batas view) yang menunjuk ke history sintetis; token lain -> tidak ada.
+
+    python bench/fake_supabase.py --port 8091 --latency 0.03
+    SUPABASE_URL=http://127.0.0.1:8091 SUPABASE_SERVICE_KEY=fake python api.py
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+TRANSCRIPT = "Pasien datang untuk kontrol. Spesimen biopsi kulit 2 x 1 cm. " * 20
+SUMMARY = "**Ringkasan Patologi Klinis**\n\n**Diagnosis:**\n- Dermatitis kronik\n"
+
+
+def share_row(token: str) -> dict:
+    return {
+        "id": f"share-{token}",
+        "token": token,
+        "history_id": f"hist-{token}",
+        "is_active": True,
+        "expires_at": None,
+        "max_views": None,
+        "view_count": 0,
+        "created_at": "2025-01-01T00:00:00+00:00",
+        "histories": {
+            "id": f"hist-{token}",
+            "created_at": "2025-01-01T00:00:00+00:00",
+            "original_text": TRANSCRIPT,
+            "summary_result": SUMMARY,
+            "metadata": {"duration": "03:12"},
+        },
+    }
+
+
+def make_handler(cfg):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            cfg.count("select")
+            time.sleep(cfg.latency)
+            if url.path != "/rest/v1/share_tokens":
+                self._json(404, {"message": "not found"})
+                return
+            token = (parse_qs(url.query).get("token") or [""])[0]
+            token = token[3:] if token.startswith("eq.") else token
+            self._json(200, [share_row(token)] if token.startswith("bench-") else [])
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            cfg.count("write")
+            time.sleep(cfg.latency)
+            if self.path.startswith("/rest/v1/rpc/increment_share_views"):
+                self._json(200, None)
+            elif self.path.startswith("/rest/v1/"):
+                self._json(201, [])
+            else:
+                self._json(404, {"message": "not found"})
+
+        def do_PATCH(self):
+            self.do_POST()
+
+        def _json(self, status, obj):
+            data = json.dumps(obj).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return Handler
+
+
+class Config:
+    def __init__(self, latency=0.03):
+        self.latency = latency
+        self.stats = {"select": 0, "write": 0}
+        self._lock = threading.Lock()
+
+    def count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+
+def serve(port=8091, latency=0.03):
+    cfg = Config(latency)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(cfg))
+    server.daemon_threads = True
+    server.cfg = cfg
+    return server
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--port", type=int, default=8091)
+    p.add_argument("--latency", type=float, default=0.03, help="detik per query (meniru RTT ke Supabase)")
+    args = p.parse_args()
+    print(f"fake supabase on http://127.0.0.1:{args.port} latency={args.latency}s")
+    serve(args.port, args.latency).serve_forever()
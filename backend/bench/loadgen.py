@@ -0,0 +1,210 @@
+# backend/bench/loadgen.py
+"""
+Generator beban untuk jalur serving: /summarize, summarize_stream (Socket.IO),
+/save dan /api/share/<token>. Setiap skenario menjalankan `requests` operasi
+dengan `concurrency` worker (closed loop) dan melaporkan throughput, status,
+latency p50/p95/p99 dan (untuk stream) TTFT.
+
+Dipakai oleh bench/run.py; bisa juga langsung ke server yang sudah jalan:
+
+    python bench/loadgen.py --url http://127.0.0.1:5001 --scenario summarize --requests 200 --concurrency 20
+
+Butuh: pip install aiohttp
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from collections import Counter
+
+import aiohttp
+import socketio
+
+SCENARIOS = ("summarize", "stream", "save", "share")
+SHARE_TOKENS = 50  # token share yang dipakai bergantian (fake_supabase: "bench-<i>")
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _ms_summary(values) -> dict:
+    if not values:
+        return None
+    return {
+        "p50": round(percentile(values, 0.50) * 1000, 2),
+        "p95": round(percentile(values, 0.95) * 1000, 2),
+        "p99": round(percentile(values, 0.99) * 1000, 2),
+        "mean": round(sum(values) / len(values) * 1000, 2),
+        "max": round(max(values) * 1000, 2),
+    }
+
+
+class Recorder:
+    def __init__(self):
+        self.latency = []
+        self.ttft = []
+        self.status = Counter()
+        self.errors = Counter()
+
+    def ok(self, latency: float, status="200", ttft: float = None):
+        self.latency.append(latency)
+        self.status[str(status)] += 1
+        if ttft is not None:
+            self.ttft.append(ttft)
+
+    def fail(self, status, latency: float = None):
+        self.status[str(status)] += 1
+        self.errors[str(status)] += 1
+        if latency is not None:
+            self.latency.append(latency)
+
+    def report(self, wall: float) -> dict:
+        total = sum(self.status.values())
+        ok = total - sum(self.errors.values())
+        return {
+            "requests": total,
+            "ok": ok,
+            "errors": dict(self.errors),
+            "status": dict(self.status),
+            "wall_s": round(wall, 3),
+            "throughput_rps": round(ok / wall, 2) if wall > 0 else 0.0,
+            "latency_ms": _ms_summary(self.latency),
+            "ttft_ms": _ms_summary(self.ttft),
+        }
+
+
+def sample_text(i: int) -> str:
+    # teks unik per request supaya tidak kena summary cache
+    return (f"Sampel {i} {uuid.uuid4().hex[:8]}. Spesimen biopsi kulit ukuran 2 x 1 cm, "
+            "warna putih keabuan. Mikroskopik tampak hiperkeratosis dan infiltrat limfosit.")
+
+
+# =========================
+# Skenario HTTP
+# =========================
+async def _http(session, rec, method, url, **kw):
+    start = time.perf_counter()
+    try:
+        async with session.request(method, url, **kw) as resp:
+            await resp.read()
+            elapsed = time.perf_counter() - start
+            if resp.status < 400:
+                rec.ok(elapsed, resp.status)
+            else:
+                rec.fail(resp.status, elapsed)
+    except Exception as e:
+        rec.fail(type(e).__name__)
+
+
+async def op_summarize(ctx, i):
+    await _http(ctx["http"], ctx["rec"], "POST", f"{ctx['url']}/summarize",
+                json={"text": sample_text(i), "mode": "patologi"})
+
+
+async def op_save(ctx, i):
+    await _http(ctx["http"], ctx["rec"], "POST", f"{ctx['url']}/save",
+                json={"text": sample_text(i), "summary_result": "Ringkasan bench",
+                      "meta": {"source": "bench", "duration": "00:42"}})
+
+
+async def op_share(ctx, i):
+    await _http(ctx["http"], ctx["rec"], "GET", f"{ctx['url']}/api/share/bench-{i % SHARE_TOKENS}")
+
+
+# =========================
+# Skenario Socket.IO
+# =========================
+async def _socket(ctx, worker):
+    """Satu koneksi Socket.IO per worker, dipakai ulang untuk request berikutnya."""
+    sio = ctx["sockets"].get(worker)
+    if sio is None:
+        sio = socketio.AsyncClient(reconnection=False)
+        sio.pending = None
+
+        @sio.on("summary_stream")
+        async def on_stream(data):
+            p = sio.pending
+            if p is None:
+                return
+            if "token" in data and "ttft" not in p:
+                p["ttft"] = time.perf_counter() - p["start"]
+            if data.get("error"):
+                p["error"] = data.get("error")
+                p["done"].set()
+            elif data.get("end"):
+                p["done"].set()
+
+        await sio.connect(ctx["url"], transports=[ctx["transport"]])
+        ctx["sockets"][worker] = sio
+    return sio
+
+
+async def op_stream(ctx, i, worker=0):
+    rec = ctx["rec"]
+    try:
+        sio = await _socket(ctx, worker)
+    except Exception as e:
+        rec.fail(f"connect:{type(e).__name__}")
+        return
+    p = {"start": time.perf_counter(), "done": asyncio.Event()}
+    sio.pending = p
+    try:
+        await sio.emit("summarize_stream", {"text": sample_text(i), "mode": "patologi"})
+        await asyncio.wait_for(p["done"].wait(), timeout=ctx["timeout"])
+    except asyncio.TimeoutError:
+        rec.fail("timeout")
+        return
+    finally:
+        sio.pending = None
+    elapsed = time.perf_counter() - p["start"]
+    if p.get("error"):
+        rec.fail(p["error"], elapsed)
+    else:
+        rec.ok(elapsed, "end", ttft=p.get("ttft"))
+
+
+OPS = {"summarize": op_summarize, "stream": op_stream, "save": op_save, "share": op_share}
+
+
+async def run_scenario(url, scenario, requests=100, concurrency=10, timeout=60.0,
+                       transport="websocket") -> dict:
+    ctx = {"url": url.rstrip("/"), "rec": Recorder(), "timeout": timeout,
+           "transport": transport, "sockets": {}}
+    op = OPS[scenario]
+    counter = iter(range(requests))
+
+    async def worker(w):
+        for i in counter:
+            if scenario == "stream":
+                await op(ctx, i, worker=w)
+            else:
+                await op(ctx, i)
+
+    timeout_cfg = aiohttp.ClientTimeout(total=timeout)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(timeout=timeout_cfg, connector=connector) as http:
+        ctx["http"] = http
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(w) for w in range(concurrency)))
+        wall = time.perf_counter() - start
+        for sio in ctx["sockets"].values():
+            await sio.disconnect()
+    return dict(ctx["rec"].report(wall), scenario=scenario, concurrency=concurrency)
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--url", default="http://127.0.0.1:5001")
+    p.add_argument("--scenario", choices=SCENARIOS, default="summarize")
+    p.add_argument("--requests", type=int, default=100)
+    p.add_argument("--concurrency", type=int, default=10)
+    p.add_argument("--timeout", type=float, default=60.0)
+    p.add_argument("--transport", default="websocket", choices=("websocket", "polling"))
+    args = p.parse_args()
+    print(json.dumps(asyncio.run(run_scenario(
+        args.url, args.scenario, args.requests, args.concurrency, args.timeout, args.transport)), indent=2))
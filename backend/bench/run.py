@@ -0,0 +1,247 @@
+# backend/bench/run.py
+"""
+Benchmark jalur serving tanpa jaringan: jalankan fake Groq + fake Supabase,
+start backend (threading `python api.py` atau ASGI `uvicorn asgi:app`) yang
+diarahkan ke keduanya, lalu jalankan skenario loadgen dan simpan hasil JSON.
+
+    python bench/run.py --server threading --out bench/results/latest.json
+    python bench/run.py --server asgi --baseline bench/baselines/asgi.json
+
+Dengan --baseline, hasil dibandingkan per skenario: throughput turun atau
+latency/TTFT p95 naik lebih dari --tolerance (default 25%) dan lebih dari
+--min-delta-ms, atau error bertambah -> dicetak sebagai regresi dan exit
+code 1. --save-baseline menulis hasil run ini sebagai baseline baru.
+
+Ekor TTFT + hedged request (providers.py): 3% request fake Groq lambat 3 dtk.
+
+    python bench/run.py --server asgi --scenarios stream --tail-rate 0.03 --env LLM_HEDGE=1
+
+Angka bergantung mesin; bandingkan baseline dari mesin yang sama.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import fake_groq  # noqa: E402
+import fake_supabase  # noqa: E402
+import loadgen  # noqa: E402
+
+# metrik yang dibandingkan ke baseline: (path, lebih besar lebih baik?)
+COMPARED = [
+    (("throughput_rps",), True),
+    (("latency_ms", "p95"), False),
+    (("ttft_ms", "p95"), False),
+]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_background(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def wait_ready(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{url}/test", timeout=1.0):
+                return
+        except Exception:
+            time.sleep(0.2)
+    raise RuntimeError(f"backend tidak siap dalam {timeout}s: {url}")
+
+
+def start_backend(kind: str, port: int, env: dict, log_path: str):
+    if kind == "asgi":
+        cmd = [sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1",
+               "--port", str(port), "--log-level", "warning"]
+    else:
+        cmd = [sys.executable, "api.py"]
+    log = open(log_path, "wb")
+    return subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def backend_env(args, port, groq_port, supabase_port, data_dir) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "PORT": str(port),
+        "GROQ_API_KEY": "fake",
+        "GROQ_BASE_URL": f"http://127.0.0.1:{groq_port}",
+        "SUPABASE_URL": f"http://127.0.0.1:{supabase_port}",
+        "SUPABASE_SERVICE_KEY": "fake-service-key",
+        "HISTORY_BACKEND": "sqlite",
+        "SETTINGS_BACKEND": "sqlite",
+        "HISTORY_DB_PATH": os.path.join(data_dir, "history.db"),
+        "SETTINGS_DB_PATH": os.path.join(data_dir, "settings.db"),
+        "JOB_DB_PATH": os.path.join(data_dir, "jobs.db"),
+        "STATE_STORE_URL": "memory",
+        # yang diukur jalur serving, bukan kuota Groq: limiter dibuka lebar kecuali diminta
+        "GROQ_RPM": str(args.groq_rpm),
+        "GROQ_BURST": str(max(1, args.groq_rpm // 60)),
+        "LOG_LEVEL": "WARNING",
+    })
+    for kv in args.env:
+        k, _, v = kv.partition("=")
+        env[k] = v
+    return env
+
+
+def _get(d, path):
+    for k in path:
+        if not isinstance(d, dict):
+            return None
+        d = d.get(k)
+    return d
+
+
+def _ms(res, *path) -> str:
+    value = _get(res, path)
+    return "-" if value is None else f"{value}ms"
+
+
+def compare(result: dict, baseline: dict, tolerance: float, min_delta_ms: float = 0.0):
+    """
+    Return list regresi (string) hasil vs baseline. Selisih latency di bawah
+    `min_delta_ms` diabaikan (noise I/O pada angka milidetik kecil).
+    """
+    regressions = []
+    base_by_name = {s["scenario"]: s for s in baseline.get("scenarios", [])}
+    for cur in result["scenarios"]:
+        base = base_by_name.get(cur["scenario"])
+        if base is None:
+            continue
+        for path, higher_is_better in COMPARED:
+            b, c = _get(base, path), _get(cur, path)
+            if not b or c is None:
+                continue
+            change = (c - b) / b
+            worse = change < -tolerance if higher_is_better else change > tolerance
+            if path[0].endswith("_ms") and c - b < min_delta_ms:
+                worse = False
+            if worse:
+                regressions.append(f"{cur['scenario']}.{'.'.join(path)}: {b} -> {c} ({change:+.0%})")
+        if sum(cur["errors"].values()) > sum(base["errors"].values()):
+            regressions.append(f"{cur['scenario']}.errors: {base['errors']} -> {cur['errors']}")
+    return regressions
+
+
+def run(args) -> dict:
+    groq = start_background(fake_groq.serve(free_port(), args.ttft, args.tps, args.rate_429, args.retry_after,
+                                            args.rate_5xx, args.tail_rate, args.tail_ttft))
+    supa = start_background(fake_supabase.serve(free_port(), args.supabase_latency))
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    data_dir = tempfile.mkdtemp(prefix="transcribe-bench-")
+    log_path = os.path.join(data_dir, "backend.log")
+    proc = start_backend(args.server, port,
+                         backend_env(args, port, groq.server_address[1], supa.server_address[1], data_dir),
+                         log_path)
+    try:
+        wait_ready(url)
+        transport = args.transport or ("websocket" if args.server == "asgi" else "polling")
+        scenarios = []
+        for name in args.scenarios.split(","):
+            # pemanasan singkat (koneksi pool, cache JWKS/template, JIT import)
+            asyncio.run(loadgen.run_scenario(url, name, min(5, args.requests), 1, args.timeout, transport))
+            res = asyncio.run(loadgen.run_scenario(
+                url, name, args.requests, args.concurrency, args.timeout, transport))
+            print(f"{name:10s} ok={res['ok']}/{res['requests']} rps={res['throughput_rps']} "
+                  f"p50={_ms(res, 'latency_ms', 'p50')} p95={_ms(res, 'latency_ms', 'p95')} "
+                  f"p99={_ms(res, 'latency_ms', 'p99')} ttft_p95={_ms(res, 'ttft_ms', 'p95')}",
+                  file=sys.stderr)
+            scenarios.append(res)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        groq.shutdown()
+        supa.shutdown()
+        if not args.keep_data:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "server": args.server,
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "cpus": os.cpu_count()},
+        "config": {
+            "requests": args.requests, "concurrency": args.concurrency,
+            "fake_groq": {"ttft": args.ttft, "tps": args.tps, "rate_429": args.rate_429,
+                          "rate_5xx": args.rate_5xx, "tail_rate": args.tail_rate, "tail_ttft": args.tail_ttft},
+            "fake_supabase": {"latency": args.supabase_latency},
+            "groq_rpm": args.groq_rpm, "env": args.env,
+        },
+        "upstream_calls": {"groq": dict(groq.cfg.stats), "supabase": dict(supa.cfg.stats)},
+        "scenarios": scenarios,
+    }
+
+
+def write_json(path: str, doc: dict):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--server", choices=("threading", "asgi"), default="threading")
+    p.add_argument("--scenarios", default=",".join(loadgen.SCENARIOS))
+    p.add_argument("--requests", type=int, default=200)
+    p.add_argument("--concurrency", type=int, default=20)
+    p.add_argument("--timeout", type=float, default=60.0)
+    p.add_argument("--transport", choices=("websocket", "polling"), default=None,
+                   help="default: websocket untuk asgi, polling untuk threading (dev server)")
+    p.add_argument("--ttft", type=float, default=0.2)
+    p.add_argument("--tps", type=float, default=200.0)
+    p.add_argument("--rate-429", type=float, default=0.0)
+    p.add_argument("--retry-after", type=int, default=1)
+    p.add_argument("--rate-5xx", type=float, default=0.0)
+    p.add_argument("--tail-rate", type=float, default=0.0, help="porsi request fake Groq yang lambat")
+    p.add_argument("--tail-ttft", type=float, default=3.0)
+    p.add_argument("--supabase-latency", type=float, default=0.03)
+    p.add_argument("--groq-rpm", type=int, default=600000)
+    p.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                   help="env tambahan untuk backend, mis. --env STREAM_DEBOUNCE_MS=0")
+    p.add_argument("--out", default=os.path.join(BENCH_DIR, "results", "latest.json"))
+    p.add_argument("--baseline", help="file baseline JSON untuk dibandingkan")
+    p.add_argument("--save-baseline", help="tulis hasil run ini sebagai baseline")
+    p.add_argument("--tolerance", type=float, default=0.25)
+    p.add_argument("--min-delta-ms", type=float, default=50.0,
+                   help="kenaikan latency di bawah ini tidak dihitung regresi")
+    p.add_argument("--keep-data", action="store_true", help="jangan hapus folder DB/log sementara")
+    args = p.parse_args()
+
+    result = run(args)
+    write_json(args.out, result)
+    print(f"hasil: {args.out}", file=sys.stderr)
+    if args.save_baseline:
+        write_json(args.save_baseline, result)
+        print(f"baseline: {args.save_baseline}", file=sys.stderr)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance, args.min_delta_ms)
+        for r in regressions:
+            print(f"REGRESI {r}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
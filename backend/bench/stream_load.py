@@ -0,0 +1,88 @@
+# backend/bench/stream_load.py
+"""
+Load test summarize_stream: buka N sesi Socket.IO sekaligus dan ukur berapa
+yang benar-benar berjalan bersamaan, TTFT, dan waktu selesai.
+
+    python bench/stream_load.py --url http://127.0.0.1:5001 --sessions 300
+
+Bandingkan `python api.py` (threading) dengan `uvicorn backend.asgi:app`,
+keduanya diarahkan ke bench/fake_groq.py lewat GROQ_BASE_URL.
+Butuh: pip install aiohttp
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+import socketio
+
+
+def _pct(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))], 4)
+
+
+async def one_session(url, state):
+    sio = socketio.AsyncClient(reconnection=False)
+    done = asyncio.Event()
+    t = {}
+
+    @sio.on("summary_stream")
+    async def on_stream(data):
+        if "token" in data and "ttft" not in t:
+            t["ttft"] = time.perf_counter() - t["start"]
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        if data.get("error"):
+            state["errors"] += 1
+            done.set()
+        if data.get("end"):
+            if "ttft" in t:
+                state["active"] -= 1
+            t["total"] = time.perf_counter() - t["start"]
+            done.set()
+
+    try:
+        await sio.connect(url, transports=["websocket"])
+        t["start"] = time.perf_counter()
+        # teks unik supaya tidak kena summary cache
+        await sio.emit("summarize_stream", {"text": f"sampel {uuid.uuid4().hex} jaringan payudara", "mode": "patologi"})
+        await asyncio.wait_for(done.wait(), timeout=state["timeout"])
+    except Exception:
+        state["errors"] += 1
+    finally:
+        if "ttft" in t:
+            state["ttft"].append(t["ttft"])
+        if "total" in t:
+            state["total"].append(t["total"])
+        await sio.disconnect()
+
+
+async def run(url, sessions, timeout):
+    state = {"active": 0, "peak": 0, "errors": 0, "ttft": [], "total": [], "timeout": timeout}
+    start = time.perf_counter()
+    await asyncio.gather(*(one_session(url, state) for _ in range(sessions)))
+    wall = time.perf_counter() - start
+    return {
+        "sessions": sessions,
+        "completed": len(state["total"]),
+        "errors": state["errors"],
+        "peak_concurrent_streams": state["peak"],
+        "wall_s": round(wall, 3),
+        "ttft_p50": _pct(state["ttft"], 0.50),
+        "ttft_p95": _pct(state["ttft"], 0.95),
+        "total_p50": _pct(state["total"], 0.50),
+        "total_p95": _pct(state["total"], 0.95),
+    }
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--url", default="http://127.0.0.1:5001")
+    p.add_argument("--sessions", type=int, default=100)
+    p.add_argument("--timeout", type=float, default=60.0)
+    args = p.parse_args()
+    print(json.dumps(asyncio.run(run(args.url, args.sessions, args.timeout)), indent=2))
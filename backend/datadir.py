@@ -0,0 +1,32 @@
+# backend/datadir.py
+"""
+Lokasi default file SQLite lokal (history.db, jobs.db, settings.db) bila
+*_DB_PATH tidak di-set.
+
+backend/ dipakai bila bisa ditulis (dev lokal, Render); selain itu direktori
+temp sistem (/tmp), mis. di Vercel yang filesystem deploy-nya read-only.
+Isi /tmp di serverless tidak persisten: untuk data yang harus bertahan,
+konfigurasikan Supabase (history & setelan otomatis memakainya).
+
+Env:
+    DATA_DIR=          # paksa direktori untuk semua file DB default
+"""
+import os
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def data_dir() -> str:
+    configured = os.environ.get("DATA_DIR")
+    if configured:
+        os.makedirs(configured, exist_ok=True)
+        return configured
+    if os.access(BACKEND_DIR, os.W_OK):
+        return BACKEND_DIR
+    return tempfile.gettempdir()
+
+
+def path(env_var: str, filename: str) -> str:
+    """Nilai env `env_var` bila di-set, selain itu data_dir()/filename."""
+    return os.environ.get(env_var) or os.path.join(data_dir(), filename)
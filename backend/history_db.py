@@ -0,0 +1,475 @@
+# backend/history_db.py
+"""
+Penyimpanan history (/save, /api/history) yang bisa diganti backend-nya.
+
+- SqliteHistoryStore: default lokal, persisten, ter-index (id, user, created_at).
+- SupabaseHistoryStore: interface yang sama di atas tabel `histories`.
+
+Pencarian (search) di SQLite memakai FTS5 dengan diacritic folding dan stemmer
+bahasa Indonesia sederhana; index diperbarui di setiap add().
+
+Pagination memakai cursor keyset (created_at, id) supaya ukuran respons dan
+biaya query tetap konstan berapa pun jumlah history. iter_range() memakai
+keyset yang sama (terlama dulu) untuk export: generator yang baru meng-query
+halaman berikutnya saat halaman sebelumnya habis dikonsumsi.
+
+Setiap entry membawa `sections` (sections.parse dari summary_result) supaya
+sistem lain bisa membaca diagnosis dst. tanpa mem-parse markdown: kolom JSON
+`sections` di SQLite, `metadata.sections` di tabel Supabase.
+
+Env:
+    HISTORY_BACKEND=sqlite | supabase   # default supabase bila dikonfigurasi
+    HISTORY_DB_PATH=backend/history.db  # default lihat datadir.py
+    HISTORY_EXPORT_PAGE_SIZE=500
+"""
+import base64
+import html
+import json
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from datetime import datetime, timedelta, timezone
+
+import datadir
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+EXPORT_PAGE_SIZE = int(os.environ.get("HISTORY_EXPORT_PAGE_SIZE", "500"))
+
+
+def encode_cursor(created_at: str, entry_id: str) -> str:
+    raw = f"{created_at}|{entry_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+# cursor datang dari client: isinya divalidasi sebelum dipakai di filter query
+_CURSOR_TS_RE = re.compile(r"^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(\.\d{1,9})?(Z|[+-]\d{2}:?\d{2})?$")
+_CURSOR_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def decode_cursor(cursor: str):
+    """Return (created_at, id) atau raise ValueError bila cursor rusak / tidak valid."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, entry_id = base64.urlsafe_b64decode(padded).decode("utf-8").split("|", 1)
+    except Exception:
+        raise ValueError("invalid_cursor")
+    if not _CURSOR_TS_RE.match(created_at) or not _CURSOR_ID_RE.match(entry_id):
+        raise ValueError("invalid_cursor")
+    return created_at, entry_id
+
+
+def parse_bound(value: str, end: bool = False):
+    """
+    Batas rentang export: tanggal (`2025-01-31`) atau timestamp ISO. `from`
+    inklusif, `to` eksklusif; `to` berupa tanggal saja = sampai akhir hari itu.
+    Return string UTC yang sebanding dengan created_at, None bila kosong.
+    """
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        if len(value) == 10:
+            dt = datetime.strptime(value, "%Y-%m-%d")
+            if end:
+                dt += timedelta(days=1)
+        else:
+            dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            if dt.tzinfo is not None:
+                dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    except ValueError:
+        raise ValueError("invalid_to" if end else "invalid_from")
+    return dt.isoformat(timespec="microseconds") + "Z"
+
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_PARTICLES = ("lah", "kah", "tah", "pun")
+_POSSESSIVES = ("nya", "ku", "mu")
+_SUFFIXES = ("kan", "an", "i")
+_PREFIXES = ("meng", "meny", "mem", "men", "me", "peng", "peny", "pem", "pen",
+             "pe", "ber", "per", "ter", "di", "ke", "se")
+# peluluhan konsonan awal setelah prefiks nasal: pem+eriksa -> periksa
+_NASAL_RECODE = {"meny": "s", "peny": "s", "mem": "p", "pem": "p", "men": "t", "pen": "t"}
+
+
+def fold(text: str) -> str:
+    """Lowercase + buang diakritik (é -> e) supaya ejaan bervariasi tetap cocok."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def stem_id(word: str) -> str:
+    """
+    Stemmer Indonesia ringan (bukan Nazief-Adriani penuh): buang partikel,
+    kata ganti milik, sufiks, lalu satu prefiks. "pemeriksaannya" -> "periksa".
+    """
+    w = fold(word)
+    if len(w) <= 4 or not w.isalpha():
+        return w
+    for group in (_PARTICLES, _POSSESSIVES, _SUFFIXES):
+        for suf in group:
+            if w.endswith(suf) and len(w) - len(suf) >= 4:
+                w = w[:-len(suf)]
+                break
+    for pre in _PREFIXES:
+        if w.startswith(pre) and len(w) - len(pre) >= 4:
+            rest = w[len(pre):]
+            if pre in _NASAL_RECODE and rest[0] in "aiueo":
+                rest = _NASAL_RECODE[pre] + rest
+            w = rest
+            break
+    return w
+
+
+def tokenize(text: str):
+    return _TOKEN_RE.findall(fold(text))
+
+
+def stems_of(*parts) -> str:
+    return " ".join(stem_id(t) for part in parts for t in tokenize(part))
+
+
+def meta_text(meta) -> str:
+    if isinstance(meta, dict):
+        return " ".join(meta_text(v) for v in meta.values())
+    if isinstance(meta, (list, tuple)):
+        return " ".join(meta_text(v) for v in meta)
+    return "" if meta is None else str(meta)
+
+
+def fts_query(q: str) -> str:
+    """Ubah input bebas jadi query FTS5 aman: tiap kata cocok via prefix atau stem."""
+    terms = []
+    for tok in tokenize(q):
+        stem = stem_id(tok)
+        if stem == tok:
+            terms.append(f'"{tok}" *')
+        else:
+            terms.append(f'("{tok}" * OR stems : "{stem}" *)')
+    return " AND ".join(terms)
+
+
+def clamp_limit(limit) -> int:
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(MAX_PAGE_SIZE, limit))
+
+
+class HistoryStore:
+    """Interface backend history. Entry: id, user_id, text, summary_result, meta, created_at."""
+
+    def add(self, entry: dict) -> dict:
+        raise NotImplementedError
+
+    def get(self, entry_id: str):
+        raise NotImplementedError
+
+    def list(self, limit: int = DEFAULT_PAGE_SIZE, before: str = None, user_id: str = None):
+        """Return (entries terbaru dulu, next_before cursor atau None)."""
+        raise NotImplementedError
+
+    def search(self, q: str, limit: int = 20, user_id: str = None):
+        """Return entries yang cocok dengan `q`, paling relevan dulu, plus `score`/`snippets`."""
+        raise NotImplementedError
+
+    def iter_range(self, start: str = None, end: str = None, user_id: str = None,
+                   page_size: int = EXPORT_PAGE_SIZE):
+        """Semua entry dengan start <= created_at < end, terlama dulu, per halaman keyset."""
+        after = None
+        while True:
+            rows = self._range_page(start, end, user_id, after, page_size)
+            yield from rows
+            if len(rows) < page_size:
+                return
+            after = (rows[-1]["created_at"], rows[-1]["id"])
+
+    def _range_page(self, start, end, user_id, after, limit) -> list:
+        raise NotImplementedError
+
+    def _page(self, rows, limit):
+        entries = rows[:limit]
+        next_before = None
+        if len(rows) > limit and entries:
+            last = entries[-1]
+            next_before = encode_cursor(last["created_at"], last["id"])
+        return entries, next_before
+
+
+class SqliteHistoryStore(HistoryStore):
+    def __init__(self, path: str):
+        # file DB baru dibuka saat query pertama, bukan saat import api.py
+        self.path = path
+        self._local = threading.local()
+        self._setup_lock = threading.Lock()
+        self._ready = False
+
+    def _setup(self, conn):
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS history (
+                id TEXT PRIMARY KEY,
+                user_id TEXT,
+                text TEXT NOT NULL,
+                summary_result TEXT,
+                meta TEXT,
+                created_at TEXT NOT NULL,
+                sections TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_history_created ON history (created_at DESC, id DESC);
+            CREATE INDEX IF NOT EXISTS idx_history_user_created ON history (user_id, created_at DESC, id DESC);
+            CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5 (
+                text, summary_result, meta, stems,
+                tokenize = 'unicode61 remove_diacritics 2'
+            );
+            """
+        )
+        # DB dari versi sebelum kolom sections
+        if "sections" not in {r["name"] for r in conn.execute("PRAGMA table_info(history)")}:
+            conn.execute("ALTER TABLE history ADD COLUMN sections TEXT")
+        conn.commit()
+        self._backfill_fts(conn)
+
+    def _backfill_fts(self, conn):
+        """Index ulang baris lama yang belum punya entri FTS (mis. DB dari versi sebelumnya)."""
+        rows = conn.execute(
+            "SELECT rowid, * FROM history WHERE rowid NOT IN (SELECT rowid FROM history_fts)"
+        ).fetchall()
+        for row in rows:
+            self._index(conn, row["rowid"], self._row_to_entry(row))
+        if rows:
+            conn.commit()
+
+    @staticmethod
+    def _index(conn, rowid, entry):
+        summary = entry.get("summary_result") or ""
+        meta = meta_text(entry.get("meta"))
+        conn.execute(
+            "INSERT INTO history_fts (rowid, text, summary_result, meta, stems) VALUES (?, ?, ?, ?, ?)",
+            (rowid, entry["text"], summary, meta, stems_of(entry["text"], summary, meta)),
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        # satu koneksi per thread; WAL supaya baca tidak menunggu tulis
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._ready:
+            with self._setup_lock:
+                if not self._ready:
+                    self._setup(conn)
+                    self._ready = True
+        return conn
+
+    @staticmethod
+    def _row_to_entry(row) -> dict:
+        return {
+            "id": row["id"],
+            "user_id": row["user_id"],
+            "text": row["text"],
+            "summary_result": row["summary_result"],
+            "meta": json.loads(row["meta"]) if row["meta"] else {},
+            "created_at": row["created_at"],
+            "sections": json.loads(row["sections"]) if row["sections"] else None,
+        }
+
+    def add(self, entry: dict) -> dict:
+        conn = self._conn()
+        cur = conn.execute(
+            "INSERT INTO history (id, user_id, text, summary_result, meta, created_at, sections)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (entry["id"], entry.get("user_id"), entry["text"], entry.get("summary_result"),
+             json.dumps(entry.get("meta") or {}, ensure_ascii=False), entry["created_at"],
+             json.dumps(entry["sections"], ensure_ascii=False) if entry.get("sections") else None),
+        )
+        self._index(conn, cur.lastrowid, entry)
+        conn.commit()
+        return entry
+
+    def get(self, entry_id: str):
+        row = self._conn().execute("SELECT * FROM history WHERE id = ?", (entry_id,)).fetchone()
+        return self._row_to_entry(row) if row else None
+
+    def list(self, limit: int = DEFAULT_PAGE_SIZE, before: str = None, user_id: str = None):
+        limit = clamp_limit(limit)
+        where, args = [], []
+        if user_id:
+            where.append("user_id = ?")
+            args.append(user_id)
+        if before:
+            created_at, entry_id = decode_cursor(before)
+            where.append("(created_at < ? OR (created_at = ? AND id < ?))")
+            args += [created_at, created_at, entry_id]
+        sql = "SELECT * FROM history"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        rows = self._conn().execute(sql, args + [limit + 1]).fetchall()
+        return self._page([self._row_to_entry(r) for r in rows], limit)
+
+    def _range_page(self, start, end, user_id, after, limit) -> list:
+        where, args = [], []
+        if user_id:
+            where.append("user_id = ?")
+            args.append(user_id)
+        if start:
+            where.append("created_at >= ?")
+            args.append(start)
+        if end:
+            where.append("created_at < ?")
+            args.append(end)
+        if after:
+            where.append("(created_at > ? OR (created_at = ? AND id > ?))")
+            args += [after[0], after[0], after[1]]
+        sql = "SELECT * FROM history"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created_at ASC, id ASC LIMIT ?"
+        return [self._row_to_entry(r) for r in self._conn().execute(sql, args + [limit]).fetchall()]
+
+    def search(self, q: str, limit: int = 20, user_id: str = None):
+        match = fts_query(q)
+        if not match:
+            return []
+        sql = (
+            "SELECT h.*, bm25(history_fts, 1.0, 2.0, 0.5, 0.5) AS score,"
+            " snippet(history_fts, 0, char(2), char(3), '…', 12) AS snip_text,"
+            " snippet(history_fts, 1, char(2), char(3), '…', 12) AS snip_summary"
+            " FROM history_fts JOIN history h ON h.rowid = history_fts.rowid"
+            " WHERE history_fts MATCH ?"
+        )
+        args = [match]
+        if user_id:
+            sql += " AND h.user_id = ?"
+            args.append(user_id)
+        sql += " ORDER BY score LIMIT ?"
+        rows = self._conn().execute(sql, args + [clamp_limit(limit)]).fetchall()
+        results = []
+        for row in rows:
+            entry = self._row_to_entry(row)
+            entry["score"] = round(-row["score"], 4)  # bm25: makin kecil makin relevan
+            entry["snippets"] = {"text": mark_snippet(row["snip_text"]),
+                                 "summary": mark_snippet(row["snip_summary"])}
+            results.append(entry)
+        return results
+
+
+def mark_snippet(snippet):
+    """
+    Snippet FTS5 (penanda char(2) / char(3)) -> HTML aman: isi transkrip
+    di-escape dulu, baru penanda diganti <mark>...</mark>.
+    """
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace("\x02", "<mark>").replace("\x03", "</mark>")
+
+
+def pg_quote(value: str) -> str:
+    """Nilai untuk filter or_() PostgREST, di-quote supaya , . : ( ) tidak dibaca sebagai sintaks."""
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def like_escape(value: str) -> str:
+    """Escape wildcard LIKE (% _) dan backslash supaya kata dicocokkan apa adanya."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class SupabaseHistoryStore(HistoryStore):
+    """Tabel `histories`: original_text / summary_result / metadata (+ metadata.sections)."""
+
+    COLUMNS = "id, user_id, original_text, summary_result, metadata, created_at"
+
+    def __init__(self, supabase):
+        self.supabase = supabase
+
+    @staticmethod
+    def _row_to_entry(row) -> dict:
+        meta = dict(row.get("metadata") or {})
+        return {
+            "id": row["id"],
+            "user_id": row.get("user_id"),
+            "text": row.get("original_text") or "",
+            "summary_result": row.get("summary_result"),
+            "meta": meta,
+            "created_at": row["created_at"],
+            "sections": meta.pop("sections", None),
+        }
+
+    def add(self, entry: dict) -> dict:
+        self.supabase.table("histories").insert({
+            "id": entry["id"],
+            "user_id": entry.get("user_id"),
+            "original_text": entry["text"],
+            "summary_result": entry.get("summary_result"),
+            # tanpa migrasi skema: bentuk terstruktur ikut di kolom jsonb metadata
+            "metadata": dict(entry.get("meta") or {}, **({"sections": entry["sections"]}
+                                                         if entry.get("sections") else {})),
+            "created_at": entry["created_at"],
+        }).execute()
+        return entry
+
+    def get(self, entry_id: str):
+        res = self.supabase.table("histories").select(self.COLUMNS).eq("id", entry_id).limit(1).execute()
+        return self._row_to_entry(res.data[0]) if res.data else None
+
+    def list(self, limit: int = DEFAULT_PAGE_SIZE, before: str = None, user_id: str = None):
+        limit = clamp_limit(limit)
+        q = self.supabase.table("histories").select(self.COLUMNS)
+        if user_id:
+            q = q.eq("user_id", user_id)
+        if before:
+            created_at, entry_id = map(pg_quote, decode_cursor(before))
+            q = q.or_(f"created_at.lt.{created_at},and(created_at.eq.{created_at},id.lt.{entry_id})")
+        res = q.order("created_at", desc=True).order("id", desc=True).limit(limit + 1).execute()
+        return self._page([self._row_to_entry(r) for r in (res.data or [])], limit)
+
+    def _range_page(self, start, end, user_id, after, limit) -> list:
+        q = self.supabase.table("histories").select(self.COLUMNS)
+        if user_id:
+            q = q.eq("user_id", user_id)
+        if start:
+            q = q.gte("created_at", start)
+        if end:
+            q = q.lt("created_at", end)
+        if after:
+            created_at, entry_id = map(pg_quote, after)
+            q = q.or_(f"created_at.gt.{created_at},and(created_at.eq.{created_at},id.gt.{entry_id})")
+        res = q.order("created_at").order("id").limit(limit).execute()
+        return [self._row_to_entry(r) for r in (res.data or [])]
+
+    def search(self, q: str, limit: int = 20, user_id: str = None):
+        # tanpa index FTS di Postgres: pencocokan ILIKE per kata, terbaru dulu
+        query = self.supabase.table("histories").select(self.COLUMNS)
+        if user_id:
+            query = query.eq("user_id", user_id)
+        for tok in tokenize(q):
+            pattern = pg_quote(f"*{like_escape(tok)}*")
+            query = query.or_(f"original_text.ilike.{pattern},summary_result.ilike.{pattern}")
+        res = query.order("created_at", desc=True).limit(clamp_limit(limit)).execute()
+        results = []
+        for row in res.data or []:
+            entry = self._row_to_entry(row)
+            entry["score"] = None
+            entry["snippets"] = {"text": None, "summary": None}
+            results.append(entry)
+        return results
+
+
+def backend_from_env(supabase=None) -> str:
+    """HISTORY_BACKEND, default supabase bila client Supabase dikonfigurasi."""
+    return os.environ.get("HISTORY_BACKEND", "supabase" if supabase is not None else "sqlite").lower()
+
+
+def from_env(supabase=None) -> HistoryStore:
+    if backend_from_env(supabase) == "supabase":
+        if supabase is None:
+            raise RuntimeError("HISTORY_BACKEND=supabase but Supabase is not configured")
+        return SupabaseHistoryStore(supabase)
+    return SqliteHistoryStore(datadir.path("HISTORY_DB_PATH", "history.db"))
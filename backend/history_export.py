@@ -0,0 +1,99 @@
+# backend/history_export.py
+"""
+Export history (GET /api/history/export) sebagai NDJSON atau CSV yang
+di-stream. Entry dibaca dari HistoryStore.iter_range (generator, keyset per
+halaman), diserialisasi per baris, dikumpulkan sampai ~CHUNK_BYTES lalu
+dikirim, opsional lewat gzip on-the-fly (zlib, sync flush per chunk supaya
+client menerima data secara bertahap). Memori konstan berapa pun jumlah
+entry; bila download dibatalkan, generator ditutup oleh server dan halaman
+berikutnya tidak pernah di-query.
+
+Env:
+    HISTORY_EXPORT_PAGE_SIZE=500     # entry per query (history_db.py)
+    HISTORY_EXPORT_CHUNK_KB=64
+    HISTORY_EXPORT_GZIP_LEVEL=6
+"""
+import csv
+import io
+import json
+import os
+import time
+import zlib
+
+import applog
+
+log = applog.get_logger("history_export")
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+CSV_COLUMNS = ("id", "created_at", "user_id", "text", "summary_result", "meta", "sections")
+CHUNK_BYTES = int(os.environ.get("HISTORY_EXPORT_CHUNK_KB", "64")) * 1024
+GZIP_LEVEL = int(os.environ.get("HISTORY_EXPORT_GZIP_LEVEL", "6"))
+
+
+def ndjson_lines(entries):
+    for entry in entries:
+        yield json.dumps(entry, ensure_ascii=False) + "\n"
+
+
+def csv_lines(entries):
+    """Satu baris CSV per entry; meta & sections sebagai JSON di satu sel."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+
+    def take():
+        line = buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+        return line
+
+    writer.writerow(CSV_COLUMNS)
+    yield take()
+    for entry in entries:
+        writer.writerow([
+            entry.get("id"), entry.get("created_at"), entry.get("user_id") or "",
+            entry.get("text") or "", entry.get("summary_result") or "",
+            json.dumps(entry.get("meta") or {}, ensure_ascii=False),
+            json.dumps(entry["sections"], ensure_ascii=False) if entry.get("sections") else "",
+        ])
+        yield take()
+
+
+def stream(entries, fmt: str, gzip: bool = False, chunk_bytes: int = CHUNK_BYTES, **log_fields):
+    """Generator bytes body response; log ringkasan (done / cancelled / error) di akhir."""
+    lines = csv_lines(entries) if fmt == "csv" else ndjson_lines(entries)
+    comp = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) if gzip else None  # wbits 31 = format gzip
+    stats = {"rows": 0, "bytes": 0, "sent": 0}
+    started = time.perf_counter()
+    status = "error"
+
+    def out(data: bytes) -> bytes:
+        stats["bytes"] += len(data)
+        if comp is not None:
+            data = comp.compress(data) + comp.flush(zlib.Z_SYNC_FLUSH)
+        stats["sent"] += len(data)
+        return data
+
+    try:
+        buf, size = [], 0
+        for line in lines:
+            data = line.encode("utf-8")
+            buf.append(data)
+            size += len(data)
+            stats["rows"] += 1
+            if size >= chunk_bytes:
+                yield out(b"".join(buf))
+                buf, size = [], 0
+        tail = out(b"".join(buf))
+        if comp is not None:
+            tail += comp.flush()
+        yield tail
+        status = "done"
+    except GeneratorExit:
+        status = "cancelled"
+        raise
+    finally:
+        if fmt == "csv":
+            stats["rows"] = max(0, stats["rows"] - 1)  # baris header
+        log.info("history export", status=status, format=fmt, gzip=gzip, rows=stats["rows"],
+                 bytes=stats["bytes"], sent=stats["sent"],
+                 ms=round((time.perf_counter() - started) * 1000, 1), **log_fields)
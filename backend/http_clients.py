@@ -0,0 +1,342 @@
+# backend/http_clients.py
+"""
+Lapisan koneksi keluar bersama untuk Groq, Supabase, dan auth (JWKS).
+
+Setiap upstream punya pool keep-alive sendiri dengan batas koneksi dan
+timeout connect/read yang bisa diatur lewat env:
+
+    HTTP_<UPSTREAM>_CONNECT_TIMEOUT   (detik, default 5)
+    HTTP_<UPSTREAM>_READ_TIMEOUT      (detik, default per upstream)
+    HTTP_<UPSTREAM>_MAX_CONNECTIONS   (default 50)
+
+UPSTREAM = GROQ | SUPABASE | AUTH. HTTP/2 dipakai bila paket `h2` terpasang,
+kecuali client stream (streaming_httpx_client) yang bisa dibatalkan lewat
+CancelScope. pool_stats() melaporkan koneksi yang sedang dipakai per upstream.
+"""
+import contextvars
+import importlib.util
+import os
+import socket
+import threading
+
+import httpcore
+import httpx
+
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+_DEFAULT_READ = {"groq": 60.0, "supabase": 15.0, "auth": 5.0}
+
+
+def _env(upstream: str, name: str, default):
+    return type(default)(os.environ.get(f"HTTP_{upstream.upper()}_{name}", default))
+
+
+def timeout_for(upstream: str) -> httpx.Timeout:
+    connect = _env(upstream, "CONNECT_TIMEOUT", 5.0)
+    read = _env(upstream, "READ_TIMEOUT", _DEFAULT_READ.get(upstream, 30.0))
+    return httpx.Timeout(connect=connect, read=read, write=read, pool=connect)
+
+
+def limits_for(upstream: str) -> httpx.Limits:
+    max_conn = _env(upstream, "MAX_CONNECTIONS", 50)
+    return httpx.Limits(max_connections=max_conn, max_keepalive_connections=max_conn,
+                        keepalive_expiry=60.0)
+
+
+class PoolStats:
+    def __init__(self, upstream: str, capacity: int):
+        self.upstream = upstream
+        self.capacity = capacity
+        self.in_use = 0
+        self.peak = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            self.in_use += 1
+            self.requests += 1
+            self.peak = max(self.peak, self.in_use)
+
+    def release(self):
+        with self._lock:
+            self.in_use -= 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "in_use": self.in_use,
+                "capacity": self.capacity,
+                "utilization": round(self.in_use / self.capacity, 4) if self.capacity else 0.0,
+                "peak": self.peak,
+                "requests": self.requests,
+            }
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _stats_for(upstream: str, capacity: int) -> PoolStats:
+    with _stats_lock:
+        if upstream not in _stats:
+            _stats[upstream] = PoolStats(upstream, capacity)
+        return _stats[upstream]
+
+
+def pool_stats() -> dict:
+    with _stats_lock:
+        return {name: s.snapshot() for name, s in _stats.items()}
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Lepas slot PoolStats saat body response selesai dibaca / ditutup."""
+
+    def __init__(self, inner, stats, scope=None):
+        self._inner = inner
+        self._stats = stats
+        self._scope = scope
+        self._released = False
+
+    def __iter__(self):
+        # body bisa dibaca dari thread lain (streaming.paced), jadi scope dibawa di sini
+        try:
+            yield from self._inner
+        except Exception:
+            if self._scope is not None:
+                self._scope.check()
+            raise
+
+    def close(self):
+        try:
+            self._inner.close()
+        finally:
+            if not self._released:
+                self._released = True
+                self._stats.release()
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, inner, stats):
+        self._inner = inner
+        self._stats = stats
+        self._released = False
+
+    async def __aiter__(self):
+        async for part in self._inner:
+            yield part
+
+    async def aclose(self):
+        try:
+            await self._inner.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._stats.release()
+
+
+class InstrumentedTransport(httpx.HTTPTransport):
+    def __init__(self, stats: PoolStats, **kwargs):
+        super().__init__(**kwargs)
+        self._stats = stats
+
+    def handle_request(self, request):
+        return self._send(request)
+
+    def _send(self, request, scope=None):
+        self._stats.acquire()
+        try:
+            response = super().handle_request(request)
+        except BaseException:
+            self._stats.release()
+            raise
+        response.stream = _ReleasingStream(response.stream, self._stats, scope)
+        return response
+
+
+class AsyncInstrumentedTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, stats: PoolStats, **kwargs):
+        super().__init__(**kwargs)
+        self._stats = stats
+
+    async def handle_async_request(self, request):
+        self._stats.acquire()
+        try:
+            response = await super().handle_async_request(request)
+        except BaseException:
+            self._stats.release()
+            raise
+        response.stream = _AsyncReleasingStream(response.stream, self._stats)
+        return response
+
+
+# =========================
+# Pembatalan request stream (CancelScope)
+# =========================
+class Cancelled(Exception):
+    """Request dibatalkan lewat CancelScope (generasi digantikan / dihentikan / kalah hedge)."""
+
+
+_active_scope = contextvars.ContextVar("http_cancel_scope", default=None)
+
+
+class CancelScope:
+    """
+    Batalkan satu request dari thread lain kapan pun: sebelum dikirim, saat
+    menunggu header, atau saat membaca body. Request yang dibuat di dalam
+    `with scope:` lewat streaming_httpx_client() mendaftarkan socket
+    koneksinya ke scope begitu socket itu dipakai; cancel() men-shutdown
+    socket tersebut sehingga thread yang blocking di recv() langsung bangun
+    (close() biasa tidak membangunkannya). Client stream hanya HTTP/1.1,
+    jadi setiap stream memegang koneksinya sendiri dan shutdown tidak pernah
+    memutus request lain. release() saat response selesai: koneksi kembali
+    ke pool dan tidak boleh disentuh cancel() lagi.
+    """
+
+    def __init__(self):
+        self.reason = None
+        self._cancelled = False
+        self._released = False
+        self._streams = []
+        self._lock = threading.Lock()
+        self._tokens = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def __enter__(self):
+        self._tokens.append(_active_scope.set(self))
+        return self
+
+    def __exit__(self, *exc):
+        _active_scope.reset(self._tokens.pop())
+
+    def cancel(self, reason: str = "cancelled"):
+        with self._lock:
+            if self._cancelled or self._released:
+                return
+            self._cancelled = True
+            self.reason = reason
+            streams = list(self._streams)
+        for stream in streams:
+            _shutdown(stream)
+
+    def release(self):
+        with self._lock:
+            self._released = True
+            self._streams = []
+
+    def _attach(self, stream):
+        with self._lock:
+            if self._released or stream in self._streams:
+                return
+            self._streams.append(stream)
+            cancelled = self._cancelled
+        if cancelled:
+            _shutdown(stream)
+
+    def check(self):
+        if self._cancelled:
+            raise Cancelled(self.reason)
+
+
+def _shutdown(stream):
+    sock = stream.get_extra_info("socket")
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class _ScopedNetworkStream(httpcore.NetworkStream):
+    """Socket yang mendaftarkan diri ke CancelScope aktif setiap kali dipakai."""
+
+    def __init__(self, inner):
+        self._inner = inner
+
+    def _enter(self):
+        scope = _active_scope.get()
+        if scope is not None:
+            scope._attach(self)
+
+    def read(self, max_bytes, timeout=None):
+        self._enter()
+        return self._inner.read(max_bytes, timeout)
+
+    def write(self, buffer, timeout=None):
+        self._enter()
+        self._inner.write(buffer, timeout)
+
+    def close(self):
+        self._inner.close()
+
+    def start_tls(self, ssl_context, server_hostname=None, timeout=None):
+        return _ScopedNetworkStream(self._inner.start_tls(ssl_context, server_hostname, timeout))
+
+    def get_extra_info(self, info):
+        return self._inner.get_extra_info(info)
+
+
+class _ScopedBackend(httpcore.NetworkBackend):
+    def __init__(self, inner):
+        self._inner = inner
+
+    def connect_tcp(self, *args, **kwargs):
+        return _ScopedNetworkStream(self._inner.connect_tcp(*args, **kwargs))
+
+    def connect_unix_socket(self, *args, **kwargs):
+        return _ScopedNetworkStream(self._inner.connect_unix_socket(*args, **kwargs))
+
+    def sleep(self, seconds):
+        self._inner.sleep(seconds)
+
+
+class CancellableTransport(InstrumentedTransport):
+    """Transport client stream: HTTP/1.1, socket terdaftar ke CancelScope aktif."""
+
+    def __init__(self, stats: PoolStats, **kwargs):
+        super().__init__(stats, http2=False, **kwargs)
+        # httpx tidak membuka opsi network_backend; pool-nya httpcore.ConnectionPool
+        # (atribut privat: versi httpx/httpcore dipatok di requirements.txt)
+        self._pool._network_backend = _ScopedBackend(self._pool._network_backend)
+
+    def handle_request(self, request):
+        scope = _active_scope.get()
+        if scope is None:
+            return super().handle_request(request)
+        scope.check()  # dibatalkan sebelum request dikirim: tidak ada yang sampai ke upstream
+        try:
+            return self._send(request, scope)
+        except Exception:
+            scope.check()
+            raise
+
+
+def httpx_client(upstream: str) -> httpx.Client:
+    limits = limits_for(upstream)
+    stats = _stats_for(upstream, limits.max_connections)
+    return httpx.Client(
+        transport=InstrumentedTransport(stats, http2=HTTP2, limits=limits),
+        timeout=timeout_for(upstream),
+    )
+
+
+def streaming_httpx_client(upstream: str) -> httpx.Client:
+    """Client untuk stream yang bisa dibatalkan lewat CancelScope (selalu HTTP/1.1)."""
+    limits = limits_for(upstream)
+    stats = _stats_for(f"{upstream}_stream", limits.max_connections)
+    return httpx.Client(
+        transport=CancellableTransport(stats, limits=limits),
+        timeout=timeout_for(upstream),
+    )
+
+
+def async_httpx_client(upstream: str) -> httpx.AsyncClient:
+    limits = limits_for(upstream)
+    stats = _stats_for(f"{upstream}_async", limits.max_connections)
+    return httpx.AsyncClient(
+        transport=AsyncInstrumentedTransport(stats, http2=HTTP2, limits=limits),
+        timeout=timeout_for(upstream),
+    )
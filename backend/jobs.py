@@ -0,0 +1,317 @@
+# backend/jobs.py
+"""
+Antrian job ringkasan batch (POST /api/summarize/batch) berbasis SQLite.
+
+- Setiap item disimpan dengan hash isinya (summary_cache.make_key), jadi
+  item kembar dalam satu batch / antar batch hanya diringkas sekali, dan
+  item yang hash-nya sudah pernah selesai langsung diisi dari hasil lama.
+- Worker mengambil item lewat transaksi BEGIN IMMEDIATE, jadi aman walau
+  beberapa proses memakai file DB yang sama.
+- Item `running` yang tidak selesai dalam JOB_LEASE_SECONDS (proses mati di
+  tengah jalan) dikembalikan ke `queued` oleh claim() berikutnya, jadi batch
+  lanjut setelah restart tanpa mengambil item yang masih dikerjakan proses
+  lain yang hidup.
+
+Env:
+    JOB_DB_PATH=backend/jobs.db   # default lihat datadir.py
+    JOB_WORKERS=2
+    JOB_MAX_ATTEMPTS=5
+    JOB_LEASE_SECONDS=900  # batas waktu satu item running sebelum dianggap ditinggal
+    JOB_MAX_ITEMS=1000
+    JOB_RESERVE_TOKENS=1   # token rate limiter Groq yang disisakan untuk request interaktif
+"""
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import applog
+import datadir
+
+log = applog.get_logger("jobs")
+
+
+class JobQueue:
+    def __init__(self, path: str, max_attempts: int = 5, lease: float = 900.0):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease = lease
+        # file DB baru dibuka saat dipakai pertama, bukan saat import api.py
+        self._local = threading.local()
+        self._setup_lock = threading.Lock()
+        self._ready = False
+
+    def _setup(self, conn):
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS batch_jobs (
+                id TEXT PRIMARY KEY,
+                created_at TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                user_id TEXT
+            );
+            CREATE TABLE IF NOT EXISTS batch_items (
+                job_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                key TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                text TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                summary TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                not_before REAL NOT NULL DEFAULT 0,
+                updated_at REAL,
+                PRIMARY KEY (job_id, idx)
+            );
+            CREATE INDEX IF NOT EXISTS idx_batch_items_status ON batch_items (status, not_before);
+            CREATE INDEX IF NOT EXISTS idx_batch_items_key ON batch_items (key, status);
+            """
+        )
+        # jobs.db dari versi sebelum job punya pemilik
+        if "user_id" not in {r["name"] for r in conn.execute("PRAGMA table_info(batch_jobs)")}:
+            conn.execute("ALTER TABLE batch_jobs ADD COLUMN user_id TEXT")
+
+    def _conn(self) -> sqlite3.Connection:
+        # satu koneksi per thread, autocommit; transaksi ditulis eksplisit
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._ready:
+            with self._setup_lock:
+                if not self._ready:
+                    self._setup(conn)
+                    self._ready = True
+        return conn
+
+    def enqueue(self, items, user_id: str = None) -> dict:
+        """
+        items: list of {"key", "mode", "text"}; `user_id` = pemilik job.
+        Return ringkasan job baru. Item dengan hash yang sudah pernah selesai
+        langsung ditandai done.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO batch_jobs (id, created_at, total, user_id) VALUES (?, ?, ?, ?)",
+                (job_id, datetime.utcnow().isoformat() + "Z", len(items), user_id),
+            )
+            reused = 0
+            for idx, item in enumerate(items):
+                row = conn.execute(
+                    "SELECT summary FROM batch_items WHERE key = ? AND status = 'done' LIMIT 1",
+                    (item["key"],),
+                ).fetchone()
+                status, summary = ("done", row["summary"]) if row else ("queued", None)
+                reused += 1 if row else 0
+                conn.execute(
+                    "INSERT INTO batch_items (job_id, idx, key, mode, text, status, summary, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, idx, item["key"], item["mode"], item["text"], status, summary, now),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        unique = len({item["key"] for item in items})
+        return {"job_id": job_id, "total": len(items), "unique": unique, "reused": reused}
+
+    def claim(self):
+        """
+        Ambil satu hash yang siap dikerjakan dan tandai semua item ber-hash
+        sama sebagai running. Return sqlite3.Row (key, mode, text, attempts) atau None.
+        Item running yang lease-nya habis (prosesnya mati) diantrikan ulang dulu.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "UPDATE batch_items SET status = 'queued' WHERE status = 'running' AND updated_at < ?",
+                (time.time() - self.lease,),
+            )
+            row = conn.execute(
+                "SELECT key, mode, text, attempts FROM batch_items"
+                " WHERE status = 'queued' AND not_before <= ? ORDER BY rowid LIMIT 1",
+                (time.time(),),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE batch_items SET status = 'running', updated_at = ?"
+                    " WHERE key = ? AND status = 'queued'",
+                    (time.time(), row["key"]),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return row
+
+    def complete(self, key: str, summary: str):
+        self._conn().execute(
+            "UPDATE batch_items SET status = 'done', summary = ?, error = NULL, updated_at = ?"
+            " WHERE key = ? AND status IN ('running', 'queued')",
+            (summary, time.time(), key),
+        )
+
+    def retry_later(self, key: str, delay: float, error: str):
+        """Kembalikan ke antrian setelah `delay` detik; gagal permanen setelah max_attempts."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "UPDATE batch_items SET status = CASE WHEN attempts + 1 >= ? THEN 'error' ELSE 'queued' END,"
+            " attempts = attempts + 1, not_before = ?, error = ?, updated_at = ?"
+            " WHERE key = ? AND status = 'running'",
+            (self.max_attempts, now + delay, error, now, key),
+        )
+
+    def fail(self, key: str, error: str):
+        self._conn().execute(
+            "UPDATE batch_items SET status = 'error', error = ?, updated_at = ?"
+            " WHERE key = ? AND status = 'running'",
+            (error, time.time(), key),
+        )
+
+    def pending(self) -> int:
+        row = self._conn().execute(
+            "SELECT COUNT(*) FROM batch_items WHERE status IN ('queued', 'running')"
+        ).fetchone()
+        return row[0]
+
+    def next_ready_in(self) -> float:
+        """Detik sampai item queued berikutnya boleh diambil (None = tidak ada)."""
+        row = self._conn().execute(
+            "SELECT MIN(not_before) FROM batch_items WHERE status = 'queued'"
+        ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def get(self, job_id: str, include_items: bool = True, user_id: str = None):
+        """Status job; None bila tidak ada atau (dengan `user_id`) bukan milik user itu."""
+        conn = self._conn()
+        job = conn.execute("SELECT * FROM batch_jobs WHERE id = ?", (job_id,)).fetchone()
+        if job is None or (user_id is not None and job["user_id"] != user_id):
+            return None
+        counts = {r["status"]: r["n"] for r in conn.execute(
+            "SELECT status, COUNT(*) AS n FROM batch_items WHERE job_id = ? GROUP BY status", (job_id,)
+        )}
+        done, failed = counts.get("done", 0), counts.get("error", 0)
+        if done + failed == job["total"]:
+            status = "completed" if not failed else "completed_with_errors"
+        elif counts.get("running") or done or failed:
+            status = "running"
+        else:
+            status = "queued"
+        out = {
+            "id": job["id"],
+            "created_at": job["created_at"],
+            "status": status,
+            "total": job["total"],
+            "done": done,
+            "failed": failed,
+            "pending": counts.get("queued", 0) + counts.get("running", 0),
+        }
+        if include_items:
+            out["items"] = [
+                {"index": r["idx"], "mode": r["mode"], "status": r["status"],
+                 "summary": r["summary"], "error": r["error"] if r["status"] == "error" else None}
+                for r in conn.execute(
+                    "SELECT idx, mode, status, summary, error FROM batch_items"
+                    " WHERE job_id = ? ORDER BY idx", (job_id,)
+                )
+            ]
+        return out
+
+
+class WorkerPool:
+    """
+    Thread worker yang memproses JobQueue.
+
+    `process(text, mode)` return ringkasan. `ready()` dipanggil sebelum
+    mengambil item (mis. menyisakan kuota Groq untuk request interaktif).
+    `retry_delay(exc)` return detik tunda untuk error yang bisa di-retry,
+    atau None untuk error permanen.
+    """
+
+    def __init__(self, queue: JobQueue, process, workers: int = 2, ready=None, retry_delay=None):
+        self.queue = queue
+        self.process = process
+        self.workers = max(1, workers)
+        self.ready = ready or (lambda: True)
+        self.retry_delay = retry_delay or (lambda e: None)
+        self._wake = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._run, name=f"batch-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def notify(self):
+        self.start()
+        self._wake.set()
+
+    def _idle(self, timeout: float):
+        self._wake.wait(timeout)
+        self._wake.clear()
+
+    def _run(self):
+        while True:
+            try:
+                self._step()
+            except Exception:
+                # mis. DB terkunci proses lain terlalu lama; worker tidak boleh mati
+                log.exception("batch worker step failed")
+                time.sleep(1.0)
+
+    def _step(self):
+        if not self.ready():
+            time.sleep(0.2)
+            return
+        row = self.queue.claim()
+        if row is None:
+            wait = self.queue.next_ready_in()
+            self._idle(5.0 if wait is None else min(5.0, max(0.05, wait)))
+            return
+        try:
+            summary = self.process(row["text"], row["mode"])
+        except Exception as e:
+            delay = self.retry_delay(e)
+            log.warning("batch item failed", key=row["key"][:12], attempts=row["attempts"] + 1,
+                        retry_in=delay, error=f"{type(e).__name__}: {e}")
+            if delay is None:
+                self.queue.fail(row["key"], f"{type(e).__name__}: {e}")
+            else:
+                self.queue.retry_later(row["key"], delay, f"{type(e).__name__}: {e}")
+            return
+        self.queue.complete(row["key"], summary)
+
+
+def from_env() -> JobQueue:
+    return JobQueue(
+        datadir.path("JOB_DB_PATH", "jobs.db"),
+        max_attempts=int(os.environ.get("JOB_MAX_ATTEMPTS", "5")),
+        lease=float(os.environ.get("JOB_LEASE_SECONDS", "900")),
+    )
+
+
+def workers_from_env() -> int:
+    return int(os.environ.get("JOB_WORKERS", "2"))
+
+
+def max_items_from_env() -> int:
+    return int(os.environ.get("JOB_MAX_ITEMS", "1000"))
@@ -0,0 +1,104 @@
+# backend/lazy.py
+"""
+Inisialisasi saat pertama dipakai untuk client upstream dan import berat,
+supaya cold start serverless (wsgi.py di Vercel, Render) tidak membayar
+semua client dan SDK hanya untuk request seperti /test.
+
+- Lazy(factory, name): nilai yang dibuat sekali saat pertama dipakai,
+  thread-safe (double-checked lock). Akses atribut diteruskan ke objeknya,
+  jadi bisa menggantikan client global langsung (`supabase.table(...)`).
+  Factory yang gagal tidak di-cache; pemakaian berikutnya mencoba lagi.
+- module(name): proxy modul; import terjadi saat atribut pertama diakses.
+- warm_up(): bangun semua Lazy yang terdaftar, mis. dari GET /api/warmup
+  atau LAZY_WARMUP=1 (thread latar saat start, tidak menahan import).
+
+Env:
+    LAZY_WARMUP=0     # 1 = bangun semua client di thread latar setelah import
+"""
+import importlib
+import threading
+import time
+
+import applog
+
+log = applog.get_logger("lazy")
+
+_UNSET = object()
+_registry = []  # Lazy yang ikut warm_up(), urut pendaftaran
+_registry_lock = threading.Lock()
+
+
+class Lazy:
+    def __init__(self, factory, name: str = None, warm: bool = True):
+        self._factory = factory
+        self._name = name or getattr(factory, "__name__", "lazy")
+        self._value = _UNSET
+        self._lock = threading.Lock()
+        self.init_seconds = None
+        if warm:
+            with _registry_lock:
+                _registry.append(self)
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def ready(self) -> bool:
+        return self._value is not _UNSET
+
+    def get(self):
+        value = self._value
+        if value is _UNSET:
+            with self._lock:
+                if self._value is _UNSET:
+                    started = time.perf_counter()
+                    try:
+                        self._value = self._factory()
+                    except Exception as e:
+                        log.error("lazy init failed", name=self._name, error=f"{type(e).__name__}: {e}")
+                        raise
+                    self.init_seconds = time.perf_counter() - started
+                    log.info("lazy init", name=self._name, ms=round(self.init_seconds * 1000, 1))
+                value = self._value
+        return value
+
+    def __getattr__(self, attr):
+        # hanya dipanggil untuk atribut yang tidak ada di Lazy sendiri
+        if attr.startswith("__") or attr in ("_factory", "_name", "_value", "_lock"):
+            raise AttributeError(attr)
+        return getattr(self.get(), attr)
+
+    def __repr__(self):
+        return f"<Lazy {self._name} {'ready' if self.ready else 'pending'}>"
+
+
+def module(name: str) -> Lazy:
+    """`np = lazy.module("numpy")`: import numpy baru terjadi di `np.xxx` pertama."""
+    return Lazy(lambda: importlib.import_module(name), name=f"import:{name}", warm=False)
+
+
+def warm_up() -> dict:
+    """Bangun semua Lazy terdaftar; return {name: ms} (atau "error: ...")."""
+    with _registry_lock:
+        items = list(_registry)
+    result = {}
+    for item in items:
+        try:
+            item.get()
+            result[item.name] = round((item.init_seconds or 0.0) * 1000, 1)
+        except Exception as e:
+            result[item.name] = f"error: {type(e).__name__}: {e}"
+    return result
+
+
+def stats() -> dict:
+    with _registry_lock:
+        items = list(_registry)
+    return {item.name: {"ready": item.ready,
+                        "init_ms": None if item.init_seconds is None else round(item.init_seconds * 1000, 1)}
+            for item in items}
+
+
+def warm_up_in_background():
+    threading.Thread(target=warm_up, name="lazy-warmup", daemon=True).start()
@@ -0,0 +1,159 @@
+# backend/longform.py
+"""
+Map-reduce untuk transkrip yang terlalu panjang untuk satu prompt.
+
+1. split_chunks(): pecah teks di batas kalimat / judul bagian dengan
+   anggaran token per chunk. Batas chunk ditentukan oleh isi kalimat
+   (content-defined), jadi editan kecil hanya mengubah chunk di sekitarnya;
+   chunk lain tetap sama dan ringkasannya bisa diambil dari cache.
+2. map_chunks(): ringkas setiap chunk secara paralel di pool thread terbatas.
+3. Hasilnya digabung jadi teks sumber untuk prompt template biasa (reduce).
+
+Env:
+    LONGFORM_THRESHOLD_TOKENS=6000   # di atas ini otomatis mode map-reduce
+    LONGFORM_CHUNK_TOKENS=2000       # anggaran token per chunk
+    LONGFORM_WORKERS=4               # panggilan map paralel (per proses)
+"""
+import hashlib
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+THRESHOLD_TOKENS = int(os.environ.get("LONGFORM_THRESHOLD_TOKENS", "6000"))
+CHUNK_TOKENS = int(os.environ.get("LONGFORM_CHUNK_TOKENS", "2000"))
+WORKERS = int(os.environ.get("LONGFORM_WORKERS", "4"))
+
+# kira-kira 4 karakter per token untuk teks Indonesia/Inggris
+CHARS_PER_TOKEN = 4
+
+_SENTENCE_RE = re.compile(r"[^.!?\n]+(?:[.!?]+|\n|$)")
+_HEADING_RE = re.compile(r"^\s*(?:#{1,6}\s|\*\*[^*]+\*\*:?\s*$|[A-Z][^.!?]{0,60}:\s*$)")
+
+# rata-rata satu batas "alami" per ~8 kalimat setelah chunk cukup besar
+_BOUNDARY_MOD = 8
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text or "") + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def is_long(text: str, threshold: int = None) -> bool:
+    return estimate_tokens(text) > (threshold or THRESHOLD_TOKENS)
+
+
+def split_sentences(text: str):
+    """Kalimat (atau baris judul bagian) beserta flag apakah itu judul."""
+    for line in (text or "").splitlines():
+        if not line.strip():
+            continue
+        if _HEADING_RE.match(line):
+            yield line.strip(), True
+            continue
+        for m in _SENTENCE_RE.finditer(line):
+            s = m.group(0).strip()
+            if s:
+                yield s, False
+
+
+def _hard_split(sentence: str, budget_chars: int):
+    """Kalimat yang lebih besar dari anggaran dipotong di batas kata."""
+    words, buf, size = sentence.split(), [], 0
+    for w in words:
+        if buf and size + len(w) + 1 > budget_chars:
+            yield " ".join(buf)
+            buf, size = [], 0
+        buf.append(w)
+        size += len(w) + 1
+    if buf:
+        yield " ".join(buf)
+
+
+def _is_boundary(sentence: str) -> bool:
+    digest = hashlib.blake2b(sentence.encode("utf-8"), digest_size=4).digest()
+    return int.from_bytes(digest, "big") % _BOUNDARY_MOD == 0
+
+
+def split_chunks(text: str, budget_tokens: int = None):
+    """
+    Pecah `text` jadi list chunk <= budget_tokens (perkiraan).
+
+    Chunk ditutup bila: berikutnya akan melewati anggaran, muncul judul
+    bagian baru, atau kalimat terakhir adalah batas alami (hash kalimat)
+    dan chunk sudah >= separuh anggaran.
+    """
+    budget_chars = max(1, (budget_tokens or CHUNK_TOKENS) * CHARS_PER_TOKEN)
+    chunks, buf, size = [], [], 0
+
+    def close():
+        nonlocal buf, size
+        if buf:
+            chunks.append(" ".join(buf))
+        buf, size = [], 0
+
+    for sentence, heading in split_sentences(text):
+        if heading:
+            close()
+        pieces = [sentence] if len(sentence) <= budget_chars else list(_hard_split(sentence, budget_chars))
+        for piece in pieces:
+            if buf and size + len(piece) + 1 > budget_chars:
+                close()
+            buf.append(piece)
+            size += len(piece) + 1
+            if not heading and size >= budget_chars // 2 and _is_boundary(piece):
+                close()
+    close()
+    return chunks
+
+
+_pool = None
+_pool_lock = Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=max(1, WORKERS), thread_name_prefix="longform-map")
+        return _pool
+
+
+def map_chunks(chunks, summarize_chunk, cache=None, key_fn=None):
+    """
+    Ringkas setiap chunk: dari cache (kunci `key_fn(index, chunk)`) bila ada,
+    selain itu lewat `summarize_chunk(index, chunk)` di pool bersama.
+
+    Return (notes, cached_count) dengan urutan sama seperti `chunks`.
+    Error di salah satu chunk diteruskan ke pemanggil.
+    """
+    notes = [None] * len(chunks)
+    futures = {}
+    cached = 0
+    for i, chunk in enumerate(chunks):
+        key = key_fn(i, chunk) if key_fn else None
+        hit = cache.get(key) if cache is not None and key else None
+        if hit is not None:
+            notes[i] = hit
+            cached += 1
+        else:
+            futures[i] = (key, _executor().submit(summarize_chunk, i, chunk))
+
+    error = None
+    for i, (key, fut) in futures.items():
+        try:
+            notes[i] = fut.result()
+        except Exception as e:
+            # chunk lain tetap disimpan ke cache supaya retry tidak mengulang semuanya
+            error = error or e
+            continue
+        if cache is not None and key and notes[i]:
+            cache.put(key, notes[i])
+    if error is not None:
+        raise error
+    return notes, cached
+
+
+def join_notes(notes) -> str:
+    """Gabungkan catatan per chunk jadi teks sumber untuk langkah reduce."""
+    total = len(notes)
+    return "\n\n".join(f"[Bagian {i + 1}/{total}]\n{n.strip()}" for i, n in enumerate(notes))
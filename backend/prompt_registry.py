@@ -0,0 +1,256 @@
+# backend/prompt_registry.py
+"""
+Registry template prompt, dimuat sekali saat startup dari folder prompts/.
+
+- `<mode>.txt`: template ringkasan satu mode (nama file = nama mode), wajib
+  `{text}`. Menambah mode cukup menambah file, tanpa ubah kode.
+- `_incremental.txt`: perbarui ringkasan lama, wajib `{prior_summary}` `{delta}`.
+- `_chunk.txt`: langkah map input panjang, wajib `{chunk}` `{index}` `{total}`.
+
+Header opsional di antara baris `---` di awal file:
+
+    ---
+    label: Dokter Patologi      # nama tampilan
+    role: dokter patologi       # mengisi {role} di template bersama
+    max_output_tokens: 512      # opsional: batas atas max_tokens ke Groq
+    ---
+
+Tanpa max_output_tokens, max_tokens hanya dibatasi sisa konteks dan batas
+output model (MODEL_MAX_OUTPUT_TOKENS), jadi ringkasan panjang tidak
+terpotong. Hanya _chunk.txt yang memakainya (catatan map harus pendek).
+
+Field header diisi saat kompilasi, jadi setiap template per mode sudah
+"pra-token": jumlah token bagian statisnya dihitung sekali. Per request
+cukup menjumlahkan token nilai yang dimasukkan, sehingga jumlah token prompt
+diketahui sebelum memanggil Groq dan max_tokens bisa dipilih dari sisa konteks.
+Placeholder yang tidak dikenal atau memakai format (`{x!r}`, `{x:>5}`)
+ditolak saat startup.
+
+Env:
+    PROMPT_DIR=backend/prompts
+    PROMPT_DEFAULT_MODE=patologi
+    MODEL_CONTEXT_TOKENS=131072   # jendela konteks model Groq
+    MODEL_MAX_OUTPUT_TOKENS=32768 # batas completion model Groq (llama-3.3-70b-versatile)
+    MIN_OUTPUT_TOKENS=256         # di bawah ini prompt dianggap terlalu panjang
+"""
+import os
+import string
+
+from longform import estimate_tokens
+
+KINDS = {
+    "summary": {"text"},
+    "incremental": {"prior_summary", "delta"},
+    "chunk": {"chunk", "index", "total"},
+}
+# perkiraan token 4 karakter/token bisa meleset; sisakan ruang di konteks
+CONTEXT_SAFETY = 0.9
+# catatan map lebih pendek dari ini tidak berguna untuk langkah reduce
+MIN_NOTE_TOKENS = 64
+NOTE_OVERHEAD_TOKENS = 6  # "[Bagian i/n]" + pemisah di longform.join_notes
+
+
+class TemplateError(ValueError):
+    pass
+
+
+class PromptTooLong(ValueError):
+    status = 413
+    error = "input_too_long"
+
+    def __init__(self, prompt_tokens: int, limit: int):
+        super().__init__(f"prompt needs ~{prompt_tokens} tokens, limit is {limit}")
+        self.prompt_tokens = prompt_tokens
+        self.limit = limit
+
+    def to_dict(self) -> dict:
+        return {"error": self.error, "message": str(self),
+                "prompt_tokens": self.prompt_tokens, "limit": self.limit}
+
+
+class Prompt(str):
+    """Teks prompt yang membawa perkiraan jumlah token dan batas output template-nya."""
+
+    def __new__(cls, text: str, tokens: int, max_output_tokens: int):
+        obj = super().__new__(cls, text)
+        obj.tokens = tokens
+        obj.max_output_tokens = max_output_tokens
+        return obj
+
+
+def parse_file(path: str):
+    """Return (meta dict, body) dari file template."""
+    with open(path, encoding="utf-8") as f:
+        raw = f.read()
+    meta = {}
+    if raw.startswith("---\n"):
+        header, sep, body = raw[4:].partition("\n---\n")
+        if not sep:
+            raise TemplateError(f"{path}: header '---' tidak ditutup")
+        for line in header.splitlines():
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            key, sep, value = line.partition(":")
+            if not sep:
+                raise TemplateError(f"{path}: baris header tidak valid: {line!r}")
+            meta[key.strip()] = value.strip()
+        raw = body
+    return meta, raw
+
+
+class Template:
+    """Template yang sudah divalidasi dan dipecah jadi (literal, field)."""
+
+    def __init__(self, name: str, source: str, required: set, meta: dict):
+        self.name = name
+        try:
+            max_output = meta.get("max_output_tokens")
+            self.max_output_tokens = int(max_output) if max_output else None
+        except ValueError:
+            raise TemplateError(f"{name}: max_output_tokens harus angka")
+
+        segments, literal, seen = [], [], set()
+        try:
+            parsed = list(string.Formatter().parse(source))
+        except ValueError as e:
+            raise TemplateError(f"{name}: {e}")
+        for text, field, spec, conversion in parsed:
+            literal.append(text)
+            if field is None:
+                continue
+            if spec or conversion or not field.isidentifier():
+                raise TemplateError(f"{name}: placeholder tidak didukung: {{{field}}}")
+            if field in required:
+                segments.append(("".join(literal), field))
+                literal = []
+                seen.add(field)
+            elif field in meta:
+                literal.append(meta[field])
+            else:
+                raise TemplateError(f"{name}: placeholder tidak dikenal: {{{field}}}")
+        missing = required - seen
+        if missing:
+            raise TemplateError(f"{name}: placeholder wajib tidak ada: {sorted(missing)}")
+        self._segments = segments
+        self._tail = "".join(literal)
+        self.static_tokens = sum(estimate_tokens(lit) for lit, _ in segments) + estimate_tokens(self._tail)
+
+    def count(self, **values) -> int:
+        """Perkiraan token prompt tanpa merakit teksnya."""
+        return self.static_tokens + sum(estimate_tokens(str(values[f])) for _, f in self._segments)
+
+    def render(self, **values) -> Prompt:
+        parts = []
+        for lit, field in self._segments:
+            parts.append(lit)
+            parts.append(str(values[field]))
+        parts.append(self._tail)
+        return Prompt("".join(parts), self.count(**values), self.max_output_tokens)
+
+
+class PromptRegistry:
+    def __init__(self, path: str, default_mode: str = "patologi",
+                 context_tokens: int = 131072, min_output_tokens: int = 256,
+                 max_output_tokens: int = 32768):
+        self.path = path
+        self.context_tokens = context_tokens
+        self.min_output_tokens = min_output_tokens
+        self.max_output_tokens = max_output_tokens
+        self._modes = {}  # {mode: {"meta": dict, "summary"/"incremental"/"chunk": Template}}
+        self._load()
+        if not self._modes:
+            raise TemplateError(f"{path}: tidak ada template mode (<mode>.txt)")
+        self.default_mode = default_mode if default_mode in self._modes else sorted(self._modes)[0]
+
+    def _load(self):
+        shared = {}
+        for kind in ("incremental", "chunk"):
+            shared[kind] = parse_file(os.path.join(self.path, f"_{kind}.txt"))
+        for fname in sorted(os.listdir(self.path)):
+            if not fname.endswith(".txt") or fname.startswith("_"):
+                continue
+            mode = fname[:-4].lower()
+            meta, body = parse_file(os.path.join(self.path, fname))
+            meta.setdefault("role", mode.replace("_", " "))
+            meta.setdefault("label", meta["role"].title())
+            entry = {"meta": meta, "summary": Template(fname, body, KINDS["summary"], meta)}
+            for kind, (shared_meta, shared_body) in shared.items():
+                # header template bersama (mis. max_output_tokens _chunk) menimpa header mode
+                entry[kind] = Template(f"{mode}/_{kind}.txt", shared_body, KINDS[kind],
+                                       dict(meta, **shared_meta))
+            self._modes[mode] = entry
+
+    @property
+    def modes(self):
+        return list(self._modes)
+
+    def __contains__(self, mode) -> bool:
+        return mode in self._modes
+
+    def template(self, mode: str, kind: str = "summary") -> Template:
+        entry = self._modes.get((mode or "").lower()) or self._modes[self.default_mode]
+        return entry[kind]
+
+    def summary(self, mode: str, text: str) -> Prompt:
+        return self.template(mode, "summary").render(text=text)
+
+    def incremental(self, mode: str, prior_summary: str, delta: str) -> Prompt:
+        return self.template(mode, "incremental").render(prior_summary=prior_summary, delta=delta)
+
+    def chunk(self, mode: str, chunk: str, index: int, total: int) -> Prompt:
+        return self.template(mode, "chunk").render(chunk=chunk, index=index, total=total)
+
+    @property
+    def usable_context(self) -> int:
+        return int(self.context_tokens * CONTEXT_SAFETY)
+
+    def output_cap(self, template_cap) -> int:
+        """Batas output template (bila ada), tidak pernah melebihi batas model."""
+        return min(template_cap or self.max_output_tokens, self.max_output_tokens)
+
+    def max_tokens(self, prompt: Prompt) -> int:
+        """
+        max_tokens untuk panggilan Groq: sisa konteks, dipotong batas output
+        model dan batas template (bila di-set).
+        Raise PromptTooLong bila sisa konteks < MIN_OUTPUT_TOKENS.
+        """
+        room = self.usable_context - prompt.tokens
+        if room < self.min_output_tokens:
+            raise PromptTooLong(prompt.tokens, self.usable_context - self.min_output_tokens)
+        return min(self.output_cap(prompt.max_output_tokens), room)
+
+    def note_budget(self, mode: str, chunks: int) -> int:
+        """
+        max_tokens per catatan chunk (langkah map) supaya prompt reduce, yang
+        memuat semua catatan, pasti muat di konteks. Raise PromptTooLong sebelum
+        ada panggilan Groq bila chunk terlalu banyak.
+        """
+        summary = self.template(mode, "summary")
+        room = self.usable_context - summary.static_tokens - min(self.output_cap(summary.max_output_tokens),
+                                                                 self.min_output_tokens)
+        per_note = room // max(1, chunks) - NOTE_OVERHEAD_TOKENS
+        if per_note < MIN_NOTE_TOKENS:
+            needed = summary.static_tokens + chunks * (MIN_NOTE_TOKENS + NOTE_OVERHEAD_TOKENS)
+            raise PromptTooLong(needed, self.usable_context - self.min_output_tokens)
+        return min(self.output_cap(self.template(mode, "chunk").max_output_tokens), per_note)
+
+    def describe(self) -> list:
+        return [
+            {"mode": mode, "label": entry["meta"]["label"], "role": entry["meta"]["role"],
+             "static_tokens": entry["summary"].static_tokens,
+             "max_output_tokens": self.output_cap(entry["summary"].max_output_tokens),
+             "default": mode == self.default_mode}
+            for mode, entry in self._modes.items()
+        ]
+
+
+def from_env() -> PromptRegistry:
+    default_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts")
+    return PromptRegistry(
+        os.environ.get("PROMPT_DIR", default_path),
+        default_mode=os.environ.get("PROMPT_DEFAULT_MODE", "patologi"),
+        context_tokens=int(os.environ.get("MODEL_CONTEXT_TOKENS", "131072")),
+        min_output_tokens=int(os.environ.get("MIN_OUTPUT_TOKENS", "256")),
+        max_output_tokens=int(os.environ.get("MODEL_MAX_OUTPUT_TOKENS", "32768")),
+    )
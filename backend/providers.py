@@ -0,0 +1,591 @@
+# backend/providers.py
+"""
+Lapisan provider LLM di depan chat.completions.create: daftar model/endpoint
+berurutan (Groq atau server OpenAI-compatible apa pun, termasuk
+bench/fake_groq.py), dengan fallback dan hedged request.
+
+- Fallback: 429 / 5xx / error koneksi / circuit breaker terbuka di satu
+  provider -> langsung coba provider berikutnya. Percobaan yang masih punya
+  cadangan tidak di-retry dan tidak menunggu kuota; hanya provider terakhir
+  memakai retry + backoff penuh dari UpstreamGuard.
+- Hedge (khusus stream, LLM_HEDGE=1): bila token pertama belum datang setelah
+  persentil TTFT terbaru provider tersebut (default p95), kirim request kedua
+  ke provider berikutnya (atau provider yang sama bila hanya satu). Yang lebih
+  dulu menghasilkan token menang; koneksi yang kalah langsung diputus.
+  Karena jedanya p95, hanya ~5% stream yang memicu request kedua.
+
+Setiap provider punya UpstreamGuard sendiri (rate limit + breaker + retry).
+Tanpa LLM_PROVIDERS perilakunya sama seperti satu client Groq global:
+satu provider "groq" dari GROQ_API_KEY / GROQ_MODEL / GROQ_BASE_URL.
+
+Env:
+    LLM_PROVIDERS=groq               # nama provider berurutan, pisah koma
+    LLM_<NAME>_API=groq              # groq | openai (butuh paket `openai`)
+    LLM_<NAME>_MODEL=                # default GROQ_MODEL
+    LLM_<NAME>_BASE_URL=             # default GROQ_BASE_URL / bawaan SDK
+    LLM_<NAME>_API_KEY=              # default GROQ_API_KEY; provider tanpa key dilewati
+    LLM_<NAME>_RPM, _BURST, ...      # setelan guard, default GROQ_RPM dst. (upstream.py)
+    LLM_HEDGE=0                      # 1 = hedged request untuk stream
+    LLM_HEDGE_PERCENTILE=0.95
+    LLM_HEDGE_DEFAULT_MS=1500        # jeda hedge sebelum ada LLM_HEDGE_MIN_SAMPLES sampel
+    LLM_HEDGE_MIN_SAMPLES=20
+    LLM_HEDGE_MIN_MS=150
+    LLM_HEDGE_MAX_MS=5000
+"""
+import asyncio
+import importlib.util
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque
+
+import applog
+import http_clients
+import lazy
+import upstream
+
+log = applog.get_logger("providers")
+
+HAS_OPENAI = importlib.util.find_spec("openai") is not None
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+
+
+class LatencyWindow:
+    """Sampel TTFT terakhir (detik) untuk menghitung jeda hedge."""
+
+    def __init__(self, size: int = 200):
+        self._values = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._values.append(seconds)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._values)
+
+    def percentile(self, q: float):
+        with self._lock:
+            values = sorted(self._values)
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class Provider:
+    """Satu model di satu endpoint, dengan guard dan statistiknya sendiri."""
+
+    def __init__(self, name: str, model: str, api_key: str, base_url: str = None,
+                 api: str = "groq", guard: upstream.UpstreamGuard = None):
+        if api not in ("groq", "openai"):
+            raise ValueError(f"LLM provider {name}: API tidak dikenal: {api}")
+        if api == "openai" and not HAS_OPENAI:
+            raise ValueError(f"LLM provider {name}: API openai butuh `pip install openai`")
+        self.name = name
+        self.model = model
+        self.api = api
+        self.base_url = base_url or None
+        self.guard = guard or upstream.from_env()
+        self.ttft = LatencyWindow()
+        self._api_key = api_key
+        # SDK (groq/openai) di-import dan client dibuat saat request pertama,
+        # bukan saat import api.py (cold start); lihat lazy.py
+        self._client = lazy.Lazy(lambda: self._build(sync=True), name=f"llm:{name}")
+        self._aclient = lazy.Lazy(lambda: self._build(sync=False), name=f"llm:{name}:async", warm=False)
+        # stream threading: koneksi HTTP/1.1 per stream, bisa diputus lewat CancelScope
+        self._sclient = lazy.Lazy(lambda: self._build(sync=True, stream=True), name=f"llm:{name}:stream")
+        self.counts = {"requests": 0, "errors": 0, "fallbacks": 0, "hedges": 0, "hedge_wins": 0}
+        self._lock = threading.Lock()
+
+    def _build(self, sync: bool, stream: bool = False):
+        if self.api == "openai":
+            import openai
+            cls = openai.OpenAI if sync else openai.AsyncOpenAI
+        else:
+            import groq
+            cls = groq.Groq if sync else groq.AsyncGroq
+        if not sync:
+            http_client = http_clients.async_httpx_client("groq")
+        elif stream:
+            http_client = http_clients.streaming_httpx_client("groq")
+        else:
+            http_client = http_clients.httpx_client("groq")
+        # retry ditangani guard, jadi retry bawaan SDK dimatikan
+        return cls(
+            api_key=self._api_key,
+            base_url=self.base_url,
+            http_client=http_client,
+            timeout=http_clients.timeout_for("groq"),
+            max_retries=0,
+        )
+
+    @property
+    def client(self):
+        return self._client.get()
+
+    @property
+    def aclient(self):
+        """Client async dibuat saat pertama dipakai (hanya mode ASGI yang butuh)."""
+        return self._aclient.get()
+
+    def count(self, key: str):
+        with self._lock:
+            self.counts[key] += 1
+
+    def create(self, **kwargs):
+        self.count("requests")
+        client = self._sclient.get() if kwargs.get("stream") else self.client
+        return client.chat.completions.create(**dict(kwargs, model=self.model))
+
+    def acreate(self, **kwargs):
+        self.count("requests")
+        return self.aclient.chat.completions.create(**dict(kwargs, model=self.model))
+
+    def stats(self, hedge_delay: float = None) -> dict:
+        p50, p95 = self.ttft.percentile(0.5), self.ttft.percentile(0.95)
+        with self._lock:
+            counts = dict(self.counts)
+        return dict(
+            counts, name=self.name, model=self.model, api=self.api, base_url=self.base_url,
+            circuit=self.guard.breaker.state,
+            ttft_samples=len(self.ttft),
+            ttft_p50_ms=round(p50 * 1000, 1) if p50 is not None else None,
+            ttft_p95_ms=round(p95 * 1000, 1) if p95 is not None else None,
+            hedge_delay_ms=round(hedge_delay * 1000, 1) if hedge_delay is not None else None,
+        )
+
+
+# generasi dibatalkan (tiket) atau percobaan kalah hedge; lihat http_clients.CancelScope
+Cancelled = http_clients.Cancelled
+
+
+def can_fall_back(e: Exception) -> bool:
+    """429 / 5xx / koneksi / breaker terbuka: coba provider lain. Error lain (400 dst.) tidak."""
+    return isinstance(e, upstream.UpstreamError) or upstream.classify_error(e) is not None
+
+
+def _has_content(chunk) -> bool:
+    try:
+        delta = chunk.choices[0].delta
+    except Exception:
+        return False
+    return bool(getattr(delta, "content", None))
+
+
+class LLMStream:
+    """
+    Stream pemenang: chunk yang sudah dibaca sampai token pertama, lalu
+    sisanya dari koneksi yang sama. `provider` = provider yang melayani.
+    """
+
+    def __init__(self, provider: Provider, raw, prefix: list, rest, hedged: bool = False, scope=None):
+        self.provider = provider
+        self.raw = raw
+        self.hedged = hedged
+        self._prefix = prefix
+        self._rest = rest
+        self._scope = scope
+
+    def __iter__(self):
+        yield from self._prefix
+        yield from self._rest
+
+    async def __aiter__(self):
+        for chunk in self._prefix:
+            yield chunk
+        async for chunk in self._rest:
+            yield chunk
+
+    def close(self):
+        if self._scope is not None:
+            self._scope.release()  # koneksi kembali ke pool: tiket tidak boleh memutusnya lagi
+        self.raw.close()
+
+    async def aclose(self):
+        await self.raw.close()
+
+
+class _Attempt:
+    """Satu percobaan stream ke satu provider, sampai token pertama."""
+
+    def __init__(self, provider: Provider, kwargs: dict, on_retry=None, ticket=None,
+                 final: bool = True, hedge: bool = False):
+        self.provider = provider
+        self.kwargs = kwargs
+        self.on_retry = on_retry
+        self.ticket = ticket
+        self.hedge = hedge
+        # hanya percobaan tanpa cadangan yang boleh retry / menunggu kuota
+        self.max_retries = None if final and not hedge else 0
+        self.max_wait = None if final and not hedge else 0.0
+        self.abandoned = False
+        self._lock = threading.Lock()
+        self.scope = http_clients.CancelScope()
+
+    def _failed(self, e: Exception):
+        self.provider.count("errors")
+        # putus sebelum token pertama: tetap dihitung oleh circuit breaker
+        if not isinstance(e, upstream.UpstreamError) and upstream.classify_error(e):
+            self.provider.guard.breaker.record_failure()
+
+    def _create(self):
+        # SDK membungkus error transport (APIConnectionError): kembalikan jadi
+        # Cancelled di sini supaya guard tidak menghitungnya sebagai kegagalan upstream
+        try:
+            return self.provider.create(**self.kwargs)
+        except Exception:
+            self.scope.check()
+            raise
+
+    def _discard(self, raw):
+        self.scope.release()
+        raw.close()
+
+    def open(self):
+        """Blocking. Return LLMStream, atau None bila ditinggalkan (kalah hedge)."""
+        p = self.provider
+        scope = self.scope
+        if self.ticket is not None:
+            # didaftarkan sebelum request dikirim: digantikan / dihentikan saat menunggu
+            # kuota, header, atau token pertama -> socket diputus saat itu juga
+            self.ticket.on_cancel(lambda: scope.cancel(self.ticket.reason))
+        started = time.monotonic()
+        with scope:
+            try:
+                raw = p.guard.call(self._create, on_retry=self.on_retry,
+                                   max_retries=self.max_retries, max_wait=self.max_wait)
+            except Exception:
+                if not scope.cancelled:
+                    p.count("errors")
+                raise
+            if self.abandoned:
+                self._discard(raw)
+                return None
+            prefix, rest = [], iter(raw)
+            try:
+                for chunk in rest:
+                    prefix.append(chunk)
+                    if _has_content(chunk):
+                        break
+            except Exception as e:
+                self._discard(raw)
+                scope.check()
+                self._failed(e)
+                raise
+        if self.abandoned:
+            self._discard(raw)
+            return None
+        p.ttft.record(time.monotonic() - started)
+        return LLMStream(p, raw, prefix, rest, hedged=self.hedge, scope=scope)
+
+    async def aopen(self):
+        p = self.provider
+        started = time.monotonic()
+        try:
+            raw = await p.guard.acall(lambda: p.acreate(**self.kwargs), on_retry=self.on_retry,
+                                      max_retries=self.max_retries, max_wait=self.max_wait)
+        except Exception:
+            p.count("errors")
+            raise
+        prefix, rest = [], raw.__aiter__()
+        try:
+            async for chunk in rest:
+                prefix.append(chunk)
+                if _has_content(chunk):
+                    break
+        except BaseException as e:
+            # termasuk CancelledError saat kalah hedge / dihentikan
+            await raw.close()
+            if isinstance(e, Exception):
+                self._failed(e)
+            raise
+        p.ttft.record(time.monotonic() - started)
+        return LLMStream(p, raw, prefix, rest, hedged=self.hedge)
+
+    def abandon(self):
+        """Kalah hedge: putus koneksinya (thread pembacanya menutup response sendiri)."""
+        with self._lock:
+            self.abandoned = True
+        self.scope.cancel("abandoned")
+
+
+class ProviderPool:
+    def __init__(self, providers: list, hedge: bool = False, hedge_percentile: float = 0.95,
+                 hedge_default: float = 1.5, hedge_min: float = 0.15, hedge_max: float = 5.0,
+                 hedge_min_samples: int = 20):
+        self.providers = providers
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_default = hedge_default
+        self.hedge_min = hedge_min
+        self.hedge_max = hedge_max
+        self.hedge_min_samples = hedge_min_samples
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.providers)
+
+    @property
+    def primary(self) -> Provider:
+        return self.providers[0] if self.providers else None
+
+    def ready(self, reserve: int = 0) -> bool:
+        """Ada provider yang bisa dipanggil sekarang tanpa menunggu?"""
+        return any(p.guard.available(reserve) for p in self.providers)
+
+    def hedge_delay(self, provider: Provider) -> float:
+        if len(provider.ttft) < self.hedge_min_samples:
+            return self.hedge_default
+        delay = provider.ttft.percentile(self.hedge_percentile)
+        return min(self.hedge_max, max(self.hedge_min, delay))
+
+    def candidates(self) -> list:
+        """Provider berurutan, yang breaker-nya terbuka dilewati (kecuali semua terbuka)."""
+        healthy = [p for p in self.providers if p.guard.breaker.state != "open"]
+        return healthy or list(self.providers)
+
+    def _fell_back(self, provider: Provider, e: Exception):
+        provider.count("fallbacks")
+        log.warning("llm fallback", provider=provider.name, error=f"{type(e).__name__}: {e}")
+
+    def _hedge_target(self, candidates: list, used: int):
+        if used < len(candidates):
+            return candidates[used]
+        # satu provider saja: hedge ke provider yang sama
+        return candidates[0] if len(candidates) == 1 else None
+
+    # =========================
+    # Non-stream
+    # =========================
+    def call(self, on_retry=None, **kwargs):
+        """chat.completions.create non-stream dengan fallback berurutan."""
+        candidates = self.candidates()
+        for i, p in enumerate(candidates):
+            final = i == len(candidates) - 1
+            try:
+                return p.guard.call(lambda p=p: p.create(**kwargs), on_retry=on_retry,
+                                    max_retries=None if final else 0,
+                                    max_wait=None if final else 0.0)
+            except Exception as e:
+                p.count("errors")
+                if final or not can_fall_back(e):
+                    raise
+                self._fell_back(p, e)
+        raise upstream.UpstreamConnectionError("tidak ada provider LLM yang dikonfigurasi")
+
+    # =========================
+    # Stream (threading)
+    # =========================
+    def stream(self, on_retry=None, ticket=None, **kwargs) -> LLMStream:
+        """
+        Buka stream (stream=True) sampai token pertama, dengan fallback dan
+        (bila aktif) hedge. `ticket` (StreamTicket) memutus koneksi saat
+        generasi dibatalkan dan menghentikan fallback.
+        """
+        candidates = self.candidates()
+        if not candidates:
+            raise upstream.UpstreamConnectionError("tidak ada provider LLM yang dikonfigurasi")
+        if not self.hedge:
+            for i, p in enumerate(candidates):
+                final = i == len(candidates) - 1
+                try:
+                    return _Attempt(p, kwargs, on_retry, ticket, final=final).open()
+                except Exception as e:
+                    if final or not can_fall_back(e) or (ticket is not None and ticket.cancelled):
+                        raise
+                    self._fell_back(p, e)
+        return self._race(candidates, kwargs, on_retry, ticket)
+
+    def _race(self, candidates, kwargs, on_retry, ticket) -> LLMStream:
+        events = queue.Queue()
+        running = []
+
+        def launch(p, final, hedge=False):
+            att = _Attempt(p, kwargs, on_retry, ticket, final=final, hedge=hedge)
+            running.append(att)
+            if hedge:
+                p.count("hedges")
+
+            def run():
+                try:
+                    result = att.open()
+                except Exception as e:
+                    events.put((att, None, e))
+                    return
+                # serah-terima di bawah lock: setelah abandon(), hasil tidak masuk antrean lagi
+                with att._lock:
+                    if not att.abandoned:
+                        events.put((att, result, None))
+                        return
+                if result is not None:
+                    result.close()
+
+            threading.Thread(target=run, daemon=True, name=f"llm-{p.name}").start()
+
+        if ticket is not None:
+            # bangunkan penunggu segera; percobaan yang masih menunggu header ditinggalkan
+            ticket.on_cancel(lambda: events.put((None, None, Cancelled(ticket.reason))))
+        used = 1
+        launch(candidates[0], final=len(candidates) == 1)
+        deadline = time.monotonic() + self.hedge_delay(candidates[0])
+        error = None
+        try:
+            while running:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    att, result, exc = events.get(timeout=timeout)
+                except queue.Empty:
+                    deadline = None
+                    target = self._hedge_target(candidates, used)
+                    if target is not None:
+                        used += target is not candidates[0]
+                        launch(target, final=False, hedge=True)
+                    continue
+                if att is None:
+                    raise exc
+                running.remove(att)
+                if result is not None:
+                    if att.hedge:
+                        att.provider.count("hedge_wins")
+                    return result
+                error = exc
+                if running:
+                    continue  # percobaan lain (mis. hedge) masih berjalan
+                if not can_fall_back(exc) or (ticket is not None and ticket.cancelled):
+                    raise exc
+                if used >= len(candidates):
+                    raise exc
+                self._fell_back(att.provider, exc)
+                deadline = None
+                launch(candidates[used], final=used == len(candidates) - 1)
+                used += 1
+            raise error
+        finally:
+            for att in running:
+                att.abandon()
+            # hasil yang masuk antrean sebelum abandon() tapi tidak pernah dipilih
+            while True:
+                try:
+                    _, result, _ = events.get_nowait()
+                except queue.Empty:
+                    break
+                if result is not None:
+                    result.close()
+
+    # =========================
+    # Stream (asyncio)
+    # =========================
+    async def astream(self, on_retry=None, **kwargs) -> LLMStream:
+        """Versi asyncio dari stream(); pembatalan lewat pembatalan task pemanggil."""
+        candidates = self.candidates()
+        if not candidates:
+            raise upstream.UpstreamConnectionError("tidak ada provider LLM yang dikonfigurasi")
+        if not self.hedge:
+            for i, p in enumerate(candidates):
+                final = i == len(candidates) - 1
+                try:
+                    return await _Attempt(p, kwargs, on_retry, final=final).aopen()
+                except Exception as e:
+                    if final or not can_fall_back(e):
+                        raise
+                    self._fell_back(p, e)
+        return await self._arace(candidates, kwargs, on_retry)
+
+    async def _arace(self, candidates, kwargs, on_retry) -> LLMStream:
+        tasks = {}
+
+        def launch(p, final, hedge=False):
+            att = _Attempt(p, kwargs, on_retry, final=final, hedge=hedge)
+            if hedge:
+                p.count("hedges")
+            tasks[asyncio.ensure_future(att.aopen())] = att
+
+        used = 1
+        launch(candidates[0], final=len(candidates) == 1)
+        deadline = time.monotonic() + self.hedge_delay(candidates[0])
+        winner = None
+        error = None
+        try:
+            while tasks and winner is None:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    deadline = None
+                    target = self._hedge_target(candidates, used)
+                    if target is not None:
+                        used += target is not candidates[0]
+                        launch(target, final=False, hedge=True)
+                    continue
+                for task in done:
+                    att = tasks.pop(task)
+                    exc = task.exception()
+                    if exc is not None:
+                        error = exc
+                    elif winner is None:
+                        winner = task.result()
+                        if att.hedge:
+                            att.provider.count("hedge_wins")
+                    else:
+                        await task.result().aclose()  # selesai bersamaan: buang
+                if winner is not None or tasks:
+                    continue
+                if not can_fall_back(error) or used >= len(candidates):
+                    raise error
+                self._fell_back(att.provider, error)
+                deadline = None
+                launch(candidates[used], final=used == len(candidates) - 1)
+                used += 1
+            if winner is None:
+                raise error
+            return winner
+        finally:
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "hedge": self.hedge,
+            "hedge_percentile": self.hedge_percentile,
+            "providers": [p.stats(self.hedge_delay(p) if self.hedge else None) for p in self.providers],
+        }
+
+
+def _env_name(name: str) -> str:
+    return re.sub(r"[^A-Z0-9]", "_", name.upper())
+
+
+def from_env() -> ProviderPool:
+    providers = []
+    for name in [n.strip() for n in os.environ.get("LLM_PROVIDERS", "groq").split(",") if n.strip()]:
+        prefix = f"LLM_{_env_name(name)}"
+
+        def env(key, default=""):
+            return os.environ.get(f"{prefix}_{key}", os.environ.get(f"GROQ_{key}", default))
+
+        api_key = env("API_KEY")
+        if not api_key:
+            log.warning("llm provider skipped: no api key", provider=name)
+            continue
+        providers.append(Provider(
+            name,
+            model=env("MODEL", DEFAULT_MODEL),
+            api_key=api_key,
+            base_url=env("BASE_URL") or None,
+            api=os.environ.get(f"{prefix}_API", "groq").lower(),
+            guard=upstream.from_env(prefix),
+        ))
+    ms = lambda key, default: float(os.environ.get(key, default)) / 1000.0  # noqa: E731
+    return ProviderPool(
+        providers,
+        hedge=os.environ.get("LLM_HEDGE", "0") == "1",
+        hedge_percentile=float(os.environ.get("LLM_HEDGE_PERCENTILE", "0.95")),
+        hedge_default=ms("LLM_HEDGE_DEFAULT_MS", "1500"),
+        hedge_min=ms("LLM_HEDGE_MIN_MS", "150"),
+        hedge_max=ms("LLM_HEDGE_MAX_MS", "5000"),
+        hedge_min_samples=int(os.environ.get("LLM_HEDGE_MIN_SAMPLES", "20")),
+    )
@@ -0,0 +1,153 @@
+# backend/sections.py
+"""
+Struktur ringkasan per section. Template di prompts/ meminta heading tebal
+(`**Diagnosis:**`, `**Rencana Penanganan:**`); heading itu memecah ringkasan
+menjadi section yang bisa di-stream dan disimpan terpisah.
+
+- SectionParser: parser inkremental untuk jalur streaming. feed(text)
+  mengembalikan event `summary_section`:
+
+    {"event": "started",   "index": 4, "key": "diagnosis", "heading": "Diagnosis"}
+    {"event": "appended",  "index": 4, "key": "diagnosis", "text": "- Dermatitis "}
+    {"event": "completed", "index": 4, "key": "diagnosis", "content": "- Dermatitis kronik"}
+
+- parse(text): bentuk terstruktur sekali jalan (dikirim di event final dan
+  disimpan bersama history):
+
+    {"title": "Ringkasan Patologi Klinis",
+     "sections": [{"key": "diagnosis", "heading": "Diagnosis", "content": "- ..."}]}
+
+Heading = baris yang seluruhnya tebal (`**X:**`, `**X**:`) atau heading
+markdown (`## X`). Heading tanpa titik dua sebelum section pertama dianggap
+judul. Baris yang masih mungkin heading ditahan sampai baris selesai; baris
+lain langsung diteruskan, jadi `appended` tidak menunggu newline.
+"""
+import re
+import unicodedata
+
+_BOLD_HEADING = re.compile(r"^\s*(?:#{1,6}\s*)?\*\*\s*(?P<h>[^*\n]+?)\s*\*\*\s*(?P<colon>:?)\s*(?P<rest>.*)$")
+_MD_HEADING = re.compile(r"^\s*#{1,6}\s+(?P<h>[^\n]+?)\s*$")
+
+
+def section_key(heading: str) -> str:
+    """"Rekomendasi / Tindak Lanjut" -> "rekomendasi_tindak_lanjut"."""
+    folded = unicodedata.normalize("NFKD", heading)
+    folded = "".join(c for c in folded if not unicodedata.combining(c)).lower()
+    return re.sub(r"[^a-z0-9]+", "_", folded).strip("_") or "section"
+
+
+def match_heading(line: str):
+    """Return (heading, punya_titik_dua, isi_sebaris) atau None bila bukan heading."""
+    m = _BOLD_HEADING.match(line)
+    if m:
+        heading, colon, rest = m.group("h"), bool(m.group("colon")), m.group("rest")
+        if heading.endswith(":"):
+            heading, colon = heading[:-1].rstrip(), True
+        # "**Catatan** bla bla" = teks tebal biasa; isi sebaris hanya setelah "**X:**"
+        if rest and not colon:
+            return None
+        return heading, colon, rest
+    m = _MD_HEADING.match(line)
+    if m:
+        heading = m.group("h").rstrip(":").strip()
+        return heading, m.group("h").endswith(":"), ""
+    return None
+
+
+def _maybe_heading(buf: str) -> bool:
+    """Awal baris yang belum selesai masih bisa menjadi heading?"""
+    s = buf.lstrip(" \t")
+    return not s or "**".startswith(s) or s.startswith("**") or s.startswith("#")
+
+
+class SectionParser:
+    def __init__(self):
+        self.title = None
+        self.sections = []  # [{"index", "key", "heading", "content"}]
+        self._current = None
+        self._line = ""  # baris yang sedang ditahan (mungkin heading)
+        self._released = False  # sebagian baris ini sudah diteruskan (pasti bukan heading)
+        self._ws = ""  # spasi/newline yang ditunda sampai ada teks lagi di section
+        self._keys = set()
+
+    def feed(self, text: str) -> list:
+        events = []
+        parts = text.split("\n")
+        for i, part in enumerate(parts):
+            self._line += part
+            if i < len(parts) - 1:
+                self._end_line(events, "\n")
+            elif self._line and (self._released or not _maybe_heading(self._line)):
+                self._released = True
+                self._append(self._line, events)
+                self._line = ""
+        return events
+
+    def flush(self) -> list:
+        """Akhir stream: proses baris terakhir dan tutup section yang terbuka."""
+        events = []
+        if self._line:
+            self._end_line(events, "")
+        self._complete(events)
+        return events
+
+    def structured(self) -> dict:
+        return {
+            "title": self.title,
+            "sections": [{"key": s["key"], "heading": s["heading"], "content": s["content"].rstrip()}
+                         for s in self.sections],
+        }
+
+    def _end_line(self, events: list, newline: str):
+        line, self._line = self._line, ""
+        released, self._released = self._released, False
+        found = None if released else match_heading(line)
+        if found is None:
+            self._append(line + newline, events)
+            return
+        heading, colon, rest = found
+        if not colon and self.title is None and not self.sections:
+            self.title = heading
+            return
+        self._start(heading, events)
+        if rest:
+            self._append(rest + newline, events)
+
+    def _start(self, heading: str, events: list):
+        self._complete(events)
+        key = base = section_key(heading)
+        n = 2
+        while key in self._keys:
+            key = f"{base}_{n}"
+            n += 1
+        self._keys.add(key)
+        self._current = {"index": len(self.sections), "key": key, "heading": heading, "content": ""}
+        self.sections.append(self._current)
+        events.append({"event": "started", "index": self._current["index"], "key": key, "heading": heading})
+
+    def _append(self, text: str, events: list):
+        cur = self._current
+        if cur is None:
+            return  # teks sebelum section pertama (mis. kalimat pembuka) tidak masuk section
+        if not cur["content"]:
+            text = text.lstrip()
+        if not text.strip():
+            self._ws += text
+            return
+        text, self._ws = self._ws + text, ""
+        cur["content"] += text
+        events.append({"event": "appended", "index": cur["index"], "key": cur["key"], "text": text})
+
+    def _complete(self, events: list):
+        cur, self._current = self._current, None
+        self._ws = ""
+        if cur is not None:
+            events.append({"event": "completed", "index": cur["index"], "key": cur["key"],
+                           "content": cur["content"].rstrip()})
+
+
+def parse(text: str) -> dict:
+    parser = SectionParser()
+    parser.feed(text or "")
+    parser.flush()
+    return parser.structured()
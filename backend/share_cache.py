@@ -0,0 +1,180 @@
+# backend/share_cache.py
+"""
+Cache untuk GET /api/share/<token> (halaman share publik).
+
+- ShareCache: token -> payload yang sudah dirakit, berlaku sampai TTL atau
+  expires_at token (mana yang lebih dulu). DELETE /api/share/<token> dan token
+  kedaluwarsa memanggil invalidate() (hanya cache proses ini); perubahan yang
+  dibuat langsung di tabel share_tokens, atau lewat worker lain, baru terlihat
+  setelah TTL.
+- ViewCounter: view count dijumlahkan di memori lalu di-flush berkala dalam
+  batch lewat increment atomik, jadi viewer bersamaan tidak saling menimpa.
+
+Env:
+    SHARE_CACHE_TTL=60
+    SHARE_VIEW_FLUSH=thread | request       # default request di serverless (Vercel/Lambda)
+    SHARE_VIEW_FLUSH_INTERVAL=5             # detik; default 0 (tiap view) di serverless
+"""
+import atexit
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+
+import applog
+
+log = applog.get_logger("share")
+
+
+def parse_ts(value: str):
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class ShareCache:
+    def __init__(self, ttl: float = 60.0, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._items = OrderedDict()  # {token: (valid_until_epoch, share_row, payload)}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str):
+        """Return (share_row, payload) atau None."""
+        with self._lock:
+            item = self._items.get(token)
+            if item is None or item[0] < time.time():
+                if item is not None:
+                    del self._items[token]
+                self.misses += 1
+                return None
+            self._items.move_to_end(token)
+            self.hits += 1
+            return item[1], item[2]
+
+    def put(self, token: str, share_row: dict, payload: dict):
+        valid_until = time.time() + self.ttl
+        expires_at = parse_ts(share_row.get("expires_at"))
+        if expires_at:
+            valid_until = min(valid_until, expires_at.timestamp())
+        with self._lock:
+            self._items[token] = (valid_until, share_row, payload)
+            self._items.move_to_end(token)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def invalidate(self, token: str):
+        with self._lock:
+            self._items.pop(token, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._items), "hits": self.hits, "misses": self.misses, "ttl": self.ttl}
+
+
+class ViewCounter:
+    """
+    Akumulasi view per token. `persist({token: count})` dipanggil sekali per
+    flush dan harus menambah view_count semua token itu secara atomik di
+    database; bila gagal, view dikembalikan ke antrian flush berikutnya.
+
+    background=True: flush berkala di thread latar (server long-running).
+    background=False: untuk serverless, di mana thread latar dibekukan di
+    antara request: hit() sendiri yang flush begitu `interval` terlewati.
+    """
+
+    def __init__(self, persist, interval: float = 5.0, background: bool = True):
+        self.persist = persist
+        self.interval = interval
+        self.background = background
+        self._pending = {}   # {token: views belum di-flush}
+        self._seen = {}      # {token: total views lokal sejak proses start}
+        self._lock = threading.Lock()
+        # dipegang selama persist berjalan; lihat settled()
+        self._flush_lock = threading.Lock()
+        self._last_flush = None
+        self._thread = None
+
+    def hit(self, token: str) -> int:
+        """Catat satu view; return jumlah view lokal untuk token ini sejak start."""
+        with self._lock:
+            self._pending[token] = self._pending.get(token, 0) + 1
+            self._seen[token] = self._seen.get(token, 0) + 1
+            seen = self._seen[token]
+        if self.background:
+            self._ensure_thread()
+        elif self._last_flush is None or time.monotonic() - self._last_flush >= self.interval:
+            self.flush()
+        return seen
+
+    def local_views(self, token: str) -> int:
+        with self._lock:
+            return self._seen.get(token, 0)
+
+    @contextmanager
+    def settled(self):
+        """
+        Tahan flush selama blok: view_count yang dibaca dari DB di dalamnya
+        memuat tepat semua view yang sudah di-flush, sisanya masih pending.
+        """
+        with self._flush_lock:
+            yield
+
+    def forget(self, token: str):
+        """Dipanggil di dalam settled() setelah membaca view_count dari DB."""
+        with self._lock:
+            self._seen[token] = self._pending.get(token, 0)
+
+    def flush(self):
+        with self._flush_lock:
+            self._last_flush = time.monotonic()
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            try:
+                self.persist(pending)
+            except Exception as e:
+                log.warning("failed to flush views", tokens=len(pending), count=sum(pending.values()),
+                            error=str(e))
+                with self._lock:
+                    for token, count in pending.items():
+                        self._pending[token] = self._pending.get(token, 0) + count
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="share-view-flush", daemon=True)
+            self._thread.start()
+        # jangan sampai view yang belum di-flush hilang saat proses berhenti
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+
+def serverless() -> bool:
+    """Vercel / Lambda: proses dibekukan di antara request, thread latar tidak bisa diandalkan."""
+    return bool(os.environ.get("VERCEL") or os.environ.get("AWS_LAMBDA_FUNCTION_NAME"))
+
+
+def ttl_from_env() -> float:
+    return float(os.environ.get("SHARE_CACHE_TTL", "60"))
+
+
+def flush_interval_from_env() -> float:
+    return float(os.environ.get("SHARE_VIEW_FLUSH_INTERVAL", "0" if serverless() else "5"))
+
+
+def flush_background_from_env() -> bool:
+    mode = os.environ.get("SHARE_VIEW_FLUSH", "request" if serverless() else "thread")
+    return mode.lower() != "request"
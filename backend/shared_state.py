@@ -0,0 +1,150 @@
+# backend/shared_state.py
+"""
+State bersama antar proses/worker untuk mode scale-out.
+
+    STATE_STORE_URL=memory              # default: satu proses, dict in-process
+    STATE_STORE_URL=redis://host:6379/0 # beberapa worker / host (paket `redis`)
+
+Dipakai untuk sinyal stop/supersede summarize_stream, invalidasi cache
+setelan user, dan ringkasan bergulir per sesi socket. Nilai harus bisa
+di-serialize ke JSON. Untuk tes multi-worker di satu mesin bisa dipakai
+server Redis lokal atau server kompatibel (mis. fakeredis.TcpFakeServer).
+"""
+import json
+import os
+import threading
+import time
+
+PREFIX = "transcribe:"
+
+
+class MemoryStore:
+    """Store in-process: cepat, tapi hanya terlihat oleh proses ini."""
+
+    shared = False
+
+    def __init__(self):
+        self._data = {}  # {key: (expires_at | None, value)}
+        self._subs = {}  # {channel: [callback]}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key: str, value, ttl: float = None):
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def publish(self, channel: str, message: dict):
+        with self._lock:
+            callbacks = list(self._subs.get(channel, ()))
+        for cb in callbacks:
+            cb(message)
+
+    def subscribe(self, channel: str, callback):
+        with self._lock:
+            self._subs.setdefault(channel, []).append(callback)
+
+
+class RedisStore:
+    """Store Redis: semua worker yang memakai URL sama berbagi state & pub/sub."""
+
+    shared = True
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("STATE_STORE_URL=redis://... requires the `redis` package") from e
+        self.url = url
+        self._r = redis.Redis.from_url(url, decode_responses=True,
+                                       socket_timeout=5.0, socket_connect_timeout=5.0)
+        self._subs = {}
+        self._pubsub = None
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default=None):
+        raw = self._r.get(PREFIX + key)
+        return default if raw is None else json.loads(raw)
+
+    def set(self, key: str, value, ttl: float = None):
+        self._r.set(PREFIX + key, json.dumps(value), px=int(ttl * 1000) if ttl else None)
+
+    def delete(self, key: str):
+        self._r.delete(PREFIX + key)
+
+    def publish(self, channel: str, message: dict):
+        self._r.publish(PREFIX + channel, json.dumps(message))
+
+    def subscribe(self, channel: str, callback):
+        with self._lock:
+            self._subs.setdefault(PREFIX + channel, []).append(callback)
+            if self._pubsub is None:
+                self._pubsub = self._r.pubsub(ignore_subscribe_messages=True)
+                self._pubsub.subscribe(**{PREFIX + channel: self._dispatch})
+                self._pubsub.run_in_thread(sleep_time=0.5, daemon=True)
+            else:
+                self._pubsub.subscribe(**{PREFIX + channel: self._dispatch})
+
+    def _dispatch(self, msg):
+        try:
+            message = json.loads(msg["data"])
+        except (TypeError, ValueError):
+            return
+        for cb in list(self._subs.get(msg["channel"], ())):
+            try:
+                cb(message)
+            except Exception:
+                pass
+
+
+class StoreMapping:
+    """Tampilan mirip dict (get / [] = / pop) atas sebagian key di store."""
+
+    def __init__(self, store, namespace: str, ttl: float = None):
+        self.store = store
+        self.namespace = namespace
+        self.ttl = ttl
+
+    def _key(self, key) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key, default=None):
+        return self.store.get(self._key(key), default)
+
+    def __setitem__(self, key, value):
+        self.store.set(self._key(key), value, ttl=self.ttl)
+
+    def pop(self, key, default=None):
+        value = self.store.get(self._key(key), default)
+        self.store.delete(self._key(key))
+        return value
+
+
+def from_env():
+    url = os.environ.get("STATE_STORE_URL", "memory")
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStore(url)
+    return MemoryStore()
+
+
+def message_queue_from_env():
+    """URL message queue Socket.IO; default ikut STATE_STORE_URL bila itu Redis."""
+    url = os.environ.get("SOCKETIO_MESSAGE_QUEUE")
+    if url is None:
+        state_url = os.environ.get("STATE_STORE_URL", "")
+        url = state_url if state_url.startswith(("redis://", "rediss://")) else ""
+    return url or None
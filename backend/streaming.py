@@ -0,0 +1,368 @@
+# backend/streaming.py
+"""
+Utilitas untuk jalur streaming summary_stream (dipakai api.py dan asgi.py).
+"""
+import asyncio
+import os
+import queue
+import time
+import uuid
+from collections import deque
+from threading import Event, Lock, Thread
+
+
+class FrameStats:
+    """Statistik frame summary_stream yang benar-benar dikirim ke client."""
+
+    def __init__(self, window: float = 10.0):
+        self.window = window
+        self.frames = 0
+        self.bytes = 0
+        self.pieces_in = 0
+        self._recent = deque()  # (ts, bytes) dalam jendela terakhir
+        self._lock = Lock()
+
+    def record_piece(self):
+        with self._lock:
+            self.pieces_in += 1
+
+    def record_frame(self, nbytes: int):
+        now = time.monotonic()
+        with self._lock:
+            self.frames += 1
+            self.bytes += nbytes
+            self._recent.append((now, nbytes))
+            self._trim(now)
+
+    def _trim(self, now):
+        while self._recent and self._recent[0][0] < now - self.window:
+            self._recent.popleft()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._trim(time.monotonic())
+            recent_frames = len(self._recent)
+            recent_bytes = sum(b for _, b in self._recent)
+            return {
+                "frames_total": self.frames,
+                "bytes_total": self.bytes,
+                "pieces_in_total": self.pieces_in,
+                "coalesce_ratio": round(self.pieces_in / self.frames, 3) if self.frames else 0.0,
+                "frames_per_sec": round(recent_frames / self.window, 3),
+                "bytes_per_frame": round(recent_bytes / recent_frames, 1) if recent_frames else 0.0,
+                "window_s": self.window,
+            }
+
+
+class TokenCoalescer:
+    """
+    Gabungkan delta token dari Groq menjadi frame yang lebih besar.
+
+    Token pertama langsung dikirim (TTFT tetap rendah); berikutnya ditahan
+    sampai `window` detik berlalu sejak frame terakhir atau buffer mencapai
+    `max_chars`. push()/flush() mengembalikan teks frame yang harus dikirim
+    (atau None), jadi bisa dipakai dari handler threading maupun asyncio.
+    Bila upstream berhenti sejenak, due() memberi tahu kapan buffer harus
+    tetap dikirim tanpa menunggu token berikutnya (lihat paced()/apaced()).
+    """
+
+    def __init__(self, window: float = 0.04, max_chars: int = 200, stats: FrameStats = None):
+        self.window = window
+        self.max_chars = max_chars
+        self.stats = stats
+        self._buf = []
+        self._buf_len = 0
+        self._last_flush = None
+
+    def push(self, piece: str):
+        if self.stats:
+            self.stats.record_piece()
+        self._buf.append(piece)
+        self._buf_len += len(piece)
+        if (self._last_flush is None
+                or self._buf_len >= self.max_chars
+                or time.monotonic() - self._last_flush >= self.window):
+            return self.flush()
+        return None
+
+    def due(self):
+        """Detik sampai isi buffer wajib dikirim; None bila buffer kosong."""
+        if not self._buf:
+            return None
+        if self._last_flush is None:
+            return 0.0
+        return max(0.0, self._last_flush + self.window - time.monotonic())
+
+    def flush(self):
+        if not self._buf:
+            return None
+        frame = "".join(self._buf)
+        self._buf = []
+        self._buf_len = 0
+        self._last_flush = time.monotonic()
+        if self.stats:
+            self.stats.record_frame(len(frame.encode("utf-8")))
+        return frame
+
+
+# item dari paced()/apaced(): window coalescer habis tanpa chunk baru -> flush()
+FLUSH_DUE = object()
+_END = object()
+
+
+def paced(chunks, coalescer: TokenCoalescer):
+    """
+    Iterasi chunk stream sync dengan batas waktu frame: bila buffer coalescer
+    sudah jatuh tempo sementara upstream belum mengirim chunk berikutnya,
+    yield FLUSH_DUE. Chunk dibaca oleh thread pompa (read socket blocking);
+    thread itu berhenti sendiri saat response ditutup.
+    """
+    if coalescer.window <= 0:
+        yield from chunks
+        return
+    inbox = queue.Queue()
+
+    def pump():
+        try:
+            for chunk in chunks:
+                inbox.put((chunk, None))
+            inbox.put((_END, None))
+        except BaseException as e:
+            inbox.put((_END, e))
+
+    Thread(target=pump, name="stream-pump", daemon=True).start()
+    while True:
+        try:
+            chunk, error = inbox.get(timeout=coalescer.due())
+        except queue.Empty:
+            yield FLUSH_DUE
+            continue
+        if chunk is _END:
+            if error is not None:
+                raise error
+            return
+        yield chunk
+
+
+class apaced:
+    """
+    Versi asyncio dari paced(): __anext__ chunk berikutnya ditunggu paling
+    lama sampai buffer jatuh tempo, tanpa membatalkan pembacaan yang sedang
+    berjalan. Panggil aclose() sebelum response.aclose().
+    """
+
+    def __init__(self, chunks, coalescer: TokenCoalescer):
+        self._chunks = chunks.__aiter__()
+        self._coalescer = coalescer
+        self._next = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._coalescer.window <= 0:
+            return await self._chunks.__anext__()
+        if self._next is None:
+            self._next = asyncio.ensure_future(self._chunks.__anext__())
+        done, _ = await asyncio.wait({self._next}, timeout=self._coalescer.due())
+        if not done:
+            return FLUSH_DUE
+        nxt, self._next = self._next, None
+        return nxt.result()
+
+    async def aclose(self):
+        nxt, self._next = self._next, None
+        if nxt is not None and not nxt.done():
+            nxt.cancel()
+            await asyncio.gather(nxt, return_exceptions=True)
+
+
+class ThinkFilter:
+    """
+    Buang blok <think>...</think> (model reasoning) dari stream token secara
+    inkremental, sebelum token dikirim ke client.
+
+    feed(piece) mengembalikan teks yang boleh dikirim. Tag yang terpotong di
+    antara dua chunk (mis. "<th" + "ink>") ditahan sampai jelas, jadi tidak
+    pernah bocor. Spasi/baris kosong di awal output (biasanya sisa setelah
+    </think>) juga dibuang. Blok yang tidak pernah ditutup dibuang semuanya.
+    """
+
+    OPEN = "<think>"
+    CLOSE = "</think>"
+
+    def __init__(self):
+        self._inside = False
+        self._pending = ""
+        self._started = False
+        self.suppressed = 0  # jumlah karakter reasoning yang dibuang
+
+    @staticmethod
+    def _partial_tag(buf: str, tag: str) -> int:
+        """Panjang akhiran `buf` yang merupakan awalan `tag` (kandidat tag terpotong)."""
+        start = buf.rfind("<", max(0, len(buf) - len(tag) + 1))
+        if start != -1 and tag.startswith(buf[start:].lower()):
+            return len(buf) - start
+        return 0
+
+    def feed(self, piece: str) -> str:
+        buf = self._pending + piece
+        self._pending = ""
+        out = []
+        while buf:
+            tag = self.CLOSE if self._inside else self.OPEN
+            i = buf.lower().find(tag)
+            if i == -1:
+                hold = self._partial_tag(buf, tag)
+                self._pending = buf[len(buf) - hold:] if hold else ""
+                buf = buf[:len(buf) - hold]
+                if self._inside:
+                    self.suppressed += len(buf)
+                else:
+                    out.append(buf)
+                break
+            if self._inside:
+                self.suppressed += i
+            else:
+                out.append(buf[:i])
+            buf = buf[i + len(tag):]
+            self._inside = not self._inside
+        return self._visible("".join(out))
+
+    def flush(self) -> str:
+        """Akhir stream: kirim sisa yang ternyata bukan tag; buang blok yang tidak ditutup."""
+        rest, self._pending = self._pending, ""
+        if self._inside:
+            self.suppressed += len(rest)
+            return ""
+        return self._visible(rest)
+
+    def _visible(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        return text
+
+
+def strip_think(text: str) -> str:
+    """Versi sekali jalan dari ThinkFilter untuk respons non-stream."""
+    f = ThinkFilter()
+    return (f.feed(text) + f.flush()).strip()
+
+
+class StreamTicket:
+    """Satu generasi summarize_stream untuk satu sesi socket."""
+
+    def __init__(self, sid: str, key: str = None):
+        self.id = uuid.uuid4().hex
+        self.sid = sid
+        self.key = key
+        self.reason = None  # "superseded" | "stopped" | "disconnect"
+        self.replaces = False  # sesi ini masih punya generasi berjalan saat tiket dibuat
+        self._event = Event()
+        self._callbacks = []
+        self._lock = Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: float) -> bool:
+        """Tunggu sampai dibatalkan atau timeout; True jika dibatalkan (dipakai untuk debounce)."""
+        return self._event.wait(timeout)
+
+    def on_cancel(self, fn):
+        """Daftarkan fn() (mis. response.close); langsung dipanggil bila sudah dibatalkan."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(fn)
+                return
+        fn()
+
+    def cancel(self, reason: str) -> bool:
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            try:
+                fn()
+            except Exception:
+                pass
+        return True
+
+
+class SessionScheduler:
+    """
+    Paling banyak satu generasi aktif per sesi. begin() untuk request baru
+    membatalkan generasi lama (reason "superseded"), kecuali request-nya
+    identik (key sama) dengan yang masih berjalan -> None (duplikat).
+    end() hanya menghapus tiket miliknya sendiri, jadi generasi lama yang
+    selesai belakangan tidak menghapus tiket generasi baru.
+
+    Dengan `bus` (shared_state store bersama), supersede dan stop juga
+    dikirim ke worker lain lewat pub/sub channel "stream_cancel".
+    """
+
+    CHANNEL = "stream_cancel"
+
+    def __init__(self, bus=None):
+        self._current = {}  # {sid: StreamTicket}
+        self._lock = Lock()
+        self.bus = bus
+        if bus is not None:
+            bus.subscribe(self.CHANNEL, self._on_remote)
+
+    def begin(self, sid: str, key: str = None):
+        with self._lock:
+            prev = self._current.get(sid)
+            if prev is not None and not prev.cancelled and key is not None and prev.key == key:
+                return None
+            ticket = StreamTicket(sid, key)
+            ticket.replaces = prev is not None and not prev.cancelled
+            self._current[sid] = ticket
+        if prev is not None:
+            prev.cancel("superseded")
+        if self.bus is not None:
+            self.bus.publish(self.CHANNEL, {"sid": sid, "reason": "superseded", "keep": ticket.id})
+        return ticket
+
+    def end(self, ticket: StreamTicket):
+        with self._lock:
+            if self._current.get(ticket.sid) is ticket:
+                del self._current[ticket.sid]
+
+    def cancel(self, sid: str, reason: str) -> bool:
+        with self._lock:
+            ticket = self._current.get(sid)
+        if self.bus is not None:
+            self.bus.publish(self.CHANNEL, {"sid": sid, "reason": reason})
+        return ticket.cancel(reason) if ticket is not None else False
+
+    def _on_remote(self, message: dict):
+        with self._lock:
+            ticket = self._current.get(message.get("sid"))
+        if ticket is not None and ticket.id != message.get("keep"):
+            ticket.cancel(message.get("reason") or "superseded")
+
+    def __len__(self):
+        with self._lock:
+            return len(self._current)
+
+
+frame_stats = FrameStats()
+
+
+def coalescer_from_env() -> TokenCoalescer:
+    return TokenCoalescer(
+        window=float(os.environ.get("STREAM_FLUSH_MS", "40")) / 1000.0,
+        max_chars=int(os.environ.get("STREAM_FLUSH_CHARS", "200")),
+        stats=frame_stats,
+    )
+
+
+def debounce_from_env() -> float:
+    """Jeda sebelum generasi yang menggantikan generasi lain; request pertama tidak ditahan."""
+    return float(os.environ.get("STREAM_DEBOUNCE_MS", "150")) / 1000.0
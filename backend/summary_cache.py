@@ -0,0 +1,114 @@
+# backend/summary_cache.py
+"""
+Cache ringkasan berbasis hash isi (mode, model, teks ternormalisasi).
+
+Tier memori: LRU + TTL dengan ukuran terbatas.
+Tier disk (opsional): SQLite, supaya cache bertahan setelah restart.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from threading import Lock
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Rapikan spasi supaya perbedaan whitespace tidak memecah cache."""
+    return _WS_RE.sub(" ", text or "").strip()
+
+
+def make_key(mode: str, model: str, text: str) -> str:
+    raw = f"{(mode or '').lower()}\x00{model}\x00{normalize_text(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    def __init__(self, maxsize=512, ttl=3600.0, db_path=None):
+        self.maxsize = max(0, int(maxsize))
+        self.ttl = float(ttl)
+        self._mem = OrderedDict()  # {key: (expires_at, summary)}
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS summary_cache ("
+                " key TEXT PRIMARY KEY, summary TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM summary_cache WHERE expires_at < ?", (time.time(),))
+            self._db.commit()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            item = self._mem.get(key)
+            if item is not None:
+                expires_at, summary = item
+                if expires_at >= now:
+                    self._mem.move_to_end(key)
+                    self.hits += 1
+                    return summary
+                del self._mem[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT summary, expires_at FROM summary_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row and row[1] >= now:
+                    self._store_mem(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, summary: str):
+        if not summary:
+            return
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store_mem(key, summary, expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO summary_cache (key, summary, expires_at) VALUES (?, ?, ?)",
+                    (key, summary, expires_at),
+                )
+                self._db.commit()
+
+    def _store_mem(self, key, summary, expires_at):
+        if self.maxsize == 0:
+            return
+        self._mem[key] = (expires_at, summary)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.maxsize:
+            self._mem.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._mem),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "disk": self._db is not None,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+def from_env() -> SummaryCache:
+    return SummaryCache(
+        maxsize=int(os.environ.get("SUMMARY_CACHE_SIZE", "512")),
+        ttl=float(os.environ.get("SUMMARY_CACHE_TTL", "3600")),
+        db_path=os.environ.get("SUMMARY_CACHE_DB") or None,
+    )
@@ -0,0 +1,6 @@
+# backend/tests/conftest.py
+# modul backend di-import datar (`import upstream`), sama seperti api.py
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,73 @@
+# backend/tests/test_applog.py
+import json
+import logging
+import queue
+
+import applog
+
+
+def make_record(msg, level=logging.INFO, **fields):
+    record = logging.LogRecord("transcribe.test", level, __file__, 1, msg, None, None)
+    record.fields = fields
+    return record
+
+
+def test_redact_sensitive_keys_and_bearer_tokens():
+    out = applog.redact({
+        "headers": {"Authorization": "Bearer abc.def", "Accept": "json"},
+        "text": "transkrip pasien",
+        "note": "pakai Bearer eyJhbGci.x-y",
+        "empty": {"token": ""},
+    })
+    assert out["headers"]["Authorization"] == "[redacted len=14]"
+    assert out["headers"]["Accept"] == "json"
+    assert out["text"] == "[redacted len=16]"
+    assert out["note"] == "pakai Bearer [redacted]"
+    assert out["empty"]["token"] == ""
+
+
+def test_parse_rates_ignores_garbage_and_clamps():
+    assert applog._parse_rates("/save=0.1, summarize_stream=2,bad,x=y,=0.5") == {
+        "/save": 0.1, "summarize_stream": 1.0}
+
+
+def test_json_formatter_adds_context_and_redacts_fields():
+    token = applog.bind(route="/save", request_id="rid-1", sid="s1")
+    try:
+        record = make_record("save ok", text="isi transkrip", text_len=13)
+        applog._ContextFilter().filter(record)
+    finally:
+        applog.unbind(token)
+    doc = json.loads(applog.JsonFormatter().format(record))
+    assert doc["request_id"] == "rid-1" and doc["sid"] == "s1" and doc["route"] == "/save"
+    assert doc["text"] == "[redacted len=13]" and doc["text_len"] == 13
+    assert applog.request_id() is None
+
+
+def test_sampling_decided_once_per_request_but_warnings_always_pass(monkeypatch):
+    monkeypatch.setattr(applog, "SAMPLE_RATES", {"/save": 0.0})
+    token = applog.bind(route="/save")
+    try:
+        f = applog._ContextFilter()
+        assert not f.filter(make_record("info"))
+        assert f.filter(make_record("warn", level=logging.WARNING))
+        forced = make_record("dump")
+        forced.force = True
+        assert f.filter(forced)
+    finally:
+        applog.unbind(token)
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = applog.DroppingQueueHandler(queue.Queue(maxsize=1))
+    handler.handle(make_record("a"))
+    handler.handle(make_record("b"))
+    assert handler.dropped == 1
+
+
+def test_wants_dump_requires_server_opt_in(monkeypatch):
+    monkeypatch.setattr(applog, "DEBUG_DUMPS", False)
+    assert not applog.wants_dump({"X-Debug-Dump": "1"})
+    monkeypatch.setattr(applog, "DEBUG_DUMPS", True)
+    assert applog.wants_dump({"X-Debug-Dump": "1"})
+    assert not applog.wants_dump({})
@@ -0,0 +1,87 @@
+# backend/tests/test_asgi.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+asgi = pytest.importorskip("asgi")
+
+
+def http_scope(path="/"):
+    return {"type": "http", "http_version": "1.1", "method": "GET", "path": path, "raw_path": path.encode(),
+            "query_string": b"", "root_path": "", "scheme": "http", "headers": [],
+            "server": ("127.0.0.1", 5001), "client": ("127.0.0.1", 40000)}
+
+
+async def call(app, on_send=None, gone=None):
+    """Jalankan satu request; http.disconnect dikirim setelah `gone` di-set."""
+    sent, requested = [], []
+    gone = gone or asyncio.Event()
+
+    async def receive():
+        if not requested:
+            requested.append(1)
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await gone.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+        if on_send:
+            on_send(message)
+
+    await app(http_scope(), receive, send)
+    return sent
+
+
+def test_wsgi_routes_run_concurrently():
+    def slow(environ, start_response):
+        time.sleep(0.2)
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [threading.current_thread().name.encode()]
+
+    app = asgi.PooledWsgiToAsgi(slow)
+
+    async def main():
+        t0 = time.monotonic()
+        results = await asyncio.gather(*(call(app) for _ in range(5)))
+        return time.monotonic() - t0, results
+
+    elapsed, results = asyncio.run(main())
+    assert elapsed < 0.6  # bukan 5 x 0.2 detik berurutan
+    assert all(r[0]["status"] == 200 for r in results)
+
+
+def test_client_disconnect_closes_streaming_body():
+    closed = threading.Event()
+    produced = []
+
+    def endless(environ, start_response):
+        start_response("200 OK", [("Content-Type", "application/x-ndjson")])
+
+        def body():
+            try:
+                while True:
+                    produced.append(1)
+                    time.sleep(0.01)
+                    yield b"{}\n"
+            finally:
+                closed.set()
+        return body()
+
+    app = asgi.PooledWsgiToAsgi(endless)
+
+    async def main():
+        gone = asyncio.Event()
+        loop = asyncio.get_running_loop()
+
+        def on_send(message):
+            if message.get("body"):
+                loop.call_soon(gone.set)
+
+        await asyncio.wait_for(call(app, on_send=on_send, gone=gone), timeout=5)
+
+    asyncio.run(main())
+    assert closed.wait(2)
+    assert len(produced) < 50
@@ -0,0 +1,103 @@
+# backend/tests/test_audio_ingest.py
+import numpy as np
+import pytest
+
+import audio_ingest
+from audio_ingest import AudioIngest, AudioSession, EnergyVAD, RingBuffer, VadConfig
+
+RATE = 16000
+
+
+def tone(seconds, amplitude=8000):
+    t = np.arange(int(RATE * seconds)) / RATE
+    return (amplitude * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+
+
+def silence(seconds):
+    return np.zeros(int(RATE * seconds), dtype=np.int16)
+
+
+def test_ring_buffer_wraps_and_keeps_absolute_indices():
+    ring = RingBuffer(8)
+    ring.write(np.arange(6, dtype=np.int16))
+    ring.write(np.arange(6, 10, dtype=np.int16))
+    assert (ring.start, ring.end) == (2, 10)
+    assert ring.read(0, 10).tolist() == list(range(2, 10))  # sampel tertua sudah ditimpa
+    assert ring.read(7, 9).tolist() == [7, 8]
+    assert len(ring.read(10, 12)) == 0
+
+
+def test_ring_buffer_oversized_write_keeps_tail():
+    ring = RingBuffer(4)
+    ring.write(np.arange(10, dtype=np.int16))
+    assert ring.read(ring.start, ring.end).tolist() == [6, 7, 8, 9]
+
+
+def test_vad_marks_start_and_end_of_speech():
+    vad = EnergyVAD(RATE, VadConfig())
+    events = vad.process(np.concatenate((silence(0.5), tone(1.0), silence(1.0))))
+    kinds = [kind for kind, _ in events]
+    assert kinds == ["start", "end"]
+    start, end = events[0][1], events[1][1]
+    assert abs(start - int(0.5 * RATE)) <= vad.frame
+    assert int(1.5 * RATE) <= end < int(2.0 * RATE)
+
+
+def test_vad_keeps_partial_frame_for_next_chunk():
+    vad = EnergyVAD(RATE, VadConfig(frame_ms=30))
+    assert vad.process(silence(0.01)) == []
+    assert len(vad.energies(silence(0.02))) == 1  # 10 ms + 20 ms = satu frame 30 ms
+
+
+def test_session_cuts_final_and_reorders_by_seq():
+    session = AudioSession("sid", "pcm16", RATE, "id", VadConfig(partial_ms=10000))
+    chunks = [c.tobytes() for c in (silence(0.5), tone(1.0), silence(1.0))]
+    assert session.feed(chunks[1], seq=1) == []  # menunggu seq 0
+    cuts = session.feed(chunks[0], seq=0) + session.feed(chunks[2], seq=2)
+    assert [c["type"] for c in cuts] == ["final"]
+    assert cuts[0]["segment"] == 0
+    assert session.feed(chunks[0], seq=1) == []  # duplikat dibuang
+
+
+def test_session_forces_cut_on_long_utterance():
+    session = AudioSession("sid", "pcm16", RATE, "id", VadConfig(max_utterance_s=1.0, partial_ms=10000))
+    cuts = []
+    for _ in range(5):
+        cuts += session.feed(tone(0.5).tobytes())
+    assert [c["type"] for c in cuts].count("final") >= 2
+    assert all(c["end"] - c["start"] <= RATE * 1.3 for c in cuts)
+
+
+def test_mp_context_never_defaults_to_fork(monkeypatch):
+    monkeypatch.delenv("AUDIO_MP_START", raising=False)
+    ctx = audio_ingest._mp_context()
+    assert ctx.get_start_method() in ("forkserver", "spawn")
+    monkeypatch.setenv("AUDIO_MP_START", "spawn")
+    assert audio_ingest._mp_context().get_start_method() == "spawn"
+
+
+def test_stub_recognizer_in_default_pool(monkeypatch):
+    monkeypatch.delenv("AUDIO_MP_START", raising=False)
+    ingest = AudioIngest(recognizer="stub", workers=1, cfg=VadConfig(partial_ms=10000))
+    try:
+        ingest.start("sid", {"codec": "pcm16", "sample_rate": RATE})
+        pcm = np.concatenate((silence(0.5), tone(1.0), silence(1.0))).tobytes()
+        tasks = ingest.push("sid", {"seq": 0, "data": pcm})
+        assert [t["type"] for t in tasks] == ["final"]
+        tasks[0]["future"].result(timeout=60)
+        events = ingest.complete(tasks[0])
+        assert events[0][0] == "transcript"
+        assert events[0][1]["text"].startswith("ucapan")
+    finally:
+        if ingest._pool is not None:
+            ingest._pool.shutdown()
+
+
+def test_push_validates_chunks():
+    ingest = AudioIngest(recognizer="stub", max_chunk_bytes=4)
+    with pytest.raises(audio_ingest.AudioError) as exc:
+        ingest.push("sid", b"\0" * 8)
+    assert exc.value.error == "chunk_too_large"
+    with pytest.raises(audio_ingest.AudioError) as exc:
+        ingest.push("sid", b"\0\0")
+    assert exc.value.error == "audio_not_started"
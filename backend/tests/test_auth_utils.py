@@ -0,0 +1,101 @@
+# backend/tests/test_auth_utils.py
+import json
+import time
+
+import httpx
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec
+
+import auth_utils
+
+SUPABASE_URL = "https://proj.supabase.co"
+
+
+@pytest.fixture(autouse=True)
+def env(monkeypatch):
+    monkeypatch.setenv("SUPABASE_URL", SUPABASE_URL)
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", "rahasia-hs256-untuk-test-saja-32b")
+    monkeypatch.setattr(auth_utils, "jwks", auth_utils.JWKSCache(url="http://jwks.invalid"))
+    auth_utils._verified.clear()
+
+
+def claims(**extra):
+    now = int(time.time())
+    return dict({"sub": "user-1", "aud": "authenticated", "iss": f"{SUPABASE_URL}/auth/v1",
+                 "iat": now, "exp": now + 3600}, **extra)
+
+
+def es256_key(kid="k1"):
+    private = ec.generate_private_key(ec.SECP256R1())
+    public = json.loads(jwt.algorithms.ECAlgorithm.to_jwk(private.public_key()))
+    return private, dict(public, kid=kid, alg="ES256", use="sig")
+
+
+def test_es256_token_verified_with_jwks_key():
+    private, public = es256_key()
+    auth_utils.jwks.load({"keys": [public]})
+    token = jwt.encode(claims(), private, algorithm="ES256", headers={"kid": "k1"})
+    assert auth_utils.verify_supabase_jwt(token)["sub"] == "user-1"
+
+
+def test_unknown_kid_refreshes_jwks_once(monkeypatch):
+    private, public = es256_key("k2")
+    auth_utils.jwks.load({"keys": []})
+    fetches = []
+
+    def refresh(force=False):
+        fetches.append(force)
+        auth_utils.jwks.load({"keys": [public]})
+        return True
+
+    monkeypatch.setattr(auth_utils.jwks, "refresh", refresh)
+    token = jwt.encode(claims(), private, algorithm="ES256", headers={"kid": "k2"})
+    assert auth_utils.verify_supabase_jwt(token)["sub"] == "user-1"
+    assert len(fetches) == 1
+
+
+def test_hs256_and_verified_token_cache(monkeypatch):
+    token = jwt.encode(claims(), "rahasia-hs256-untuk-test-saja-32b", algorithm="HS256")
+    assert auth_utils.verify_supabase_jwt(token)["sub"] == "user-1"
+    monkeypatch.setattr(auth_utils.jwt, "decode", lambda *a, **k: pytest.fail("tidak di-decode ulang"))
+    assert auth_utils.verify_supabase_jwt(token)["sub"] == "user-1"
+
+
+@pytest.mark.parametrize("bad", [
+    {"aud": "anon"},
+    {"iss": "https://lain.supabase.co/auth/v1"},
+    {"exp": int(time.time()) - 10},
+])
+def test_rejects_wrong_audience_issuer_or_expired(bad):
+    token = jwt.encode(claims(**bad), "rahasia-hs256-untuk-test-saja-32b", algorithm="HS256")
+    with pytest.raises(jwt.InvalidTokenError):
+        auth_utils.verify_supabase_jwt(token)
+    assert auth_utils.verify_or_none(token) is None
+
+
+def test_rejects_unsupported_alg():
+    token = jwt.encode(claims(), "x" * 64, algorithm="HS512")
+    with pytest.raises(jwt.InvalidAlgorithmError):
+        auth_utils.verify_supabase_jwt(token)
+
+
+def test_hs256_without_secret_falls_back_to_auth_user(monkeypatch):
+    monkeypatch.delenv("SUPABASE_JWT_SECRET")
+    monkeypatch.setenv("SUPABASE_SERVICE_KEY", "service-key")
+    seen = []
+
+    def handler(req):
+        seen.append(req)
+        if req.headers["Authorization"] == "Bearer " + good:
+            return httpx.Response(200, json={"id": "user-1", "email": "a@b.c"})
+        return httpx.Response(401, json={"msg": "invalid JWT"})
+
+    auth_utils.jwks._session = httpx.Client(transport=httpx.MockTransport(handler))
+    good = jwt.encode(claims(), "secret-proyek-yang-tidak-diketahui", algorithm="HS256")
+    payload = auth_utils.verify_supabase_jwt(good)
+    assert payload["sub"] == "user-1" and payload["exp"] <= time.time() + auth_utils.REMOTE_VERIFY_TTL
+    assert str(seen[0].url) == f"{SUPABASE_URL}/auth/v1/user" and seen[0].headers["apikey"] == "service-key"
+    assert auth_utils.verify_supabase_jwt(good)["sub"] == "user-1" and len(seen) == 1  # dari cache
+    bad = jwt.encode(claims(sub="user-2"), "kunci-lain-yang-juga-tidak-diketahui", algorithm="HS256")
+    assert auth_utils.verify_or_none(bad) is None
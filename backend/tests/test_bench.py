@@ -0,0 +1,53 @@
+# backend/tests/test_bench.py
+import json
+import os
+import sys
+
+import pytest
+
+BENCH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench")
+sys.path.insert(0, BENCH)
+loadgen = pytest.importorskip("loadgen")
+run = pytest.importorskip("run")
+
+
+def scenario(name="summarize", rps=100.0, p95=50.0, ttft=None, errors=None):
+    return {"scenario": name, "throughput_rps": rps, "latency_ms": {"p95": p95},
+            "ttft_ms": {"p95": ttft} if ttft is not None else None, "errors": errors or {}}
+
+
+def test_recorder_report():
+    rec = loadgen.Recorder()
+    for latency in (0.01, 0.02, 0.03, 0.04):
+        rec.ok(latency, ttft=latency / 2)
+    rec.fail(429, latency=0.5)
+    report = rec.report(wall=2.0)
+    assert report["requests"] == 5 and report["ok"] == 4
+    assert report["errors"] == {"429": 1} and report["status"] == {"200": 4, "429": 1}
+    assert report["throughput_rps"] == 2.0
+    assert report["latency_ms"]["max"] == 500.0
+    assert report["ttft_ms"]["p50"] == 15.0
+
+
+def test_compare_flags_regressions_beyond_tolerance():
+    base = {"scenarios": [scenario(ttft=100.0)]}
+    same = {"scenarios": [scenario(rps=95.0, p95=55.0, ttft=105.0)]}
+    assert run.compare(same, base, tolerance=0.1) == []
+    worse = {"scenarios": [scenario(rps=80.0, p95=70.0, ttft=100.0, errors={"500": 1})]}
+    regressions = run.compare(worse, base, tolerance=0.1)
+    assert [r.split(":")[0] for r in regressions] == [
+        "summarize.throughput_rps", "summarize.latency_ms.p95", "summarize.errors"]
+
+
+def test_compare_ignores_small_absolute_latency_changes_and_new_scenarios():
+    base = {"scenarios": [scenario(p95=2.0)]}
+    cur = {"scenarios": [scenario(p95=4.0), scenario("baru", rps=1.0)]}
+    assert run.compare(cur, base, tolerance=0.1, min_delta_ms=5.0) == []
+    assert run.compare(cur, base, tolerance=0.1) == ["summarize.latency_ms.p95: 2.0 -> 4.0 (+100%)"]
+
+
+@pytest.mark.parametrize("name", ["threading.json", "asgi.json"])
+def test_committed_baselines_compare_clean_against_themselves(name):
+    with open(os.path.join(BENCH, "baselines", name), encoding="utf-8") as f:
+        baseline = json.load(f)
+    assert run.compare(baseline, baseline, tolerance=0.0) == []
@@ -0,0 +1,94 @@
+# backend/tests/test_history_db.py
+import os
+
+import pytest
+
+import datadir
+import history_db
+import jobs
+import user_settings
+
+
+def entry(i, created_at=None, user_id="u1"):
+    return {
+        "id": f"e{i:03d}",
+        "user_id": user_id,
+        "text": f"transkrip {i}",
+        "summary_result": f"ringkasan {i}",
+        "meta": {},
+        "created_at": created_at or f"2026-01-01T00:00:{i:02d}+00:00",
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    return history_db.SqliteHistoryStore(str(tmp_path / "history.db"))
+
+
+def test_store_opens_file_on_first_query(tmp_path):
+    path = tmp_path / "history.db"
+    store = history_db.SqliteHistoryStore(str(path))
+    assert not path.exists()
+    assert store.list() == ([], None)
+    assert path.exists()
+
+
+def test_cursor_pagination_walks_newest_first_without_gaps(store):
+    for i in range(7):
+        store.add(entry(i))
+    # dua entry dengan created_at sama: urutan tetap ditentukan id
+    store.add(entry(7, created_at=entry(6)["created_at"]))
+    seen, cursor = [], None
+    while True:
+        page, cursor = store.list(limit=3, before=cursor)
+        seen += [e["id"] for e in page]
+        if cursor is None:
+            break
+    assert seen == ["e007", "e006", "e005", "e004", "e003", "e002", "e001", "e000"]
+
+
+def test_pagination_is_scoped_to_user(store):
+    store.add(entry(1, user_id="a"))
+    store.add(entry(2, user_id="b"))
+    page, cursor = store.list(user_id="a")
+    assert [e["id"] for e in page] == ["e001"] and cursor is None
+
+
+def test_cursor_roundtrip_and_garbage():
+    cursor = history_db.encode_cursor("2026-01-01T00:00:00+00:00", "abc")
+    assert history_db.decode_cursor(cursor) == ("2026-01-01T00:00:00+00:00", "abc")
+    with pytest.raises(ValueError):
+        history_db.decode_cursor("!!!")
+
+
+def test_backend_defaults_to_supabase_when_configured(monkeypatch):
+    monkeypatch.delenv("HISTORY_BACKEND", raising=False)
+    assert history_db.backend_from_env(None) == "sqlite"
+    assert history_db.backend_from_env(object()) == "supabase"
+    monkeypatch.setenv("HISTORY_BACKEND", "sqlite")
+    assert history_db.backend_from_env(object()) == "sqlite"
+
+
+def test_settings_backend_follows_supabase(monkeypatch):
+    monkeypatch.delenv("SETTINGS_BACKEND", raising=False)
+    monkeypatch.delenv("HISTORY_BACKEND", raising=False)
+    settings = user_settings.from_env({"summary_mode": "x"}, supabase=object())
+    assert isinstance(settings.store, user_settings.SupabaseSettingsStore)
+
+
+def test_default_paths_fall_back_to_tempdir_when_backend_is_read_only(monkeypatch, tmp_path):
+    for var in ("DATA_DIR", "HISTORY_DB_PATH", "JOB_DB_PATH", "HISTORY_BACKEND"):
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setattr(datadir.os, "access", lambda path, mode: False)
+    monkeypatch.setattr(datadir.tempfile, "gettempdir", lambda: str(tmp_path))
+    assert history_db.from_env().path == os.path.join(str(tmp_path), "history.db")
+    assert jobs.from_env().path == os.path.join(str(tmp_path), "jobs.db")
+    # membuat store tidak menyentuh filesystem
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_explicit_path_wins(monkeypatch, tmp_path):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path / "data"))
+    assert datadir.path("HISTORY_DB_PATH", "history.db") == str(tmp_path / "data" / "history.db")
+    monkeypatch.setenv("HISTORY_DB_PATH", "/x/h.db")
+    assert datadir.path("HISTORY_DB_PATH", "history.db") == "/x/h.db"
@@ -0,0 +1,107 @@
+# backend/tests/test_history_export.py
+import csv
+import io
+import json
+import zlib
+
+import pytest
+
+import auth_utils
+import history_db
+import history_export
+
+
+def entry(i, user_id="u1", **extra):
+    return dict({
+        "id": f"e{i:03d}",
+        "user_id": user_id,
+        "text": f"transkrip {i}, \"dikutip\"\nbaris dua",
+        "summary_result": f"ringkasan {i}",
+        "meta": {"mode": "patologi"},
+        "created_at": f"2026-01-01T00:00:{i:02d}+00:00",
+    }, **extra)
+
+
+def test_ndjson_one_object_per_line():
+    lines = list(history_export.ndjson_lines([entry(1), entry(2)]))
+    assert [json.loads(line)["id"] for line in lines] == ["e001", "e002"]
+    assert all(line.endswith("\n") and line.count("\n") == 1 for line in lines)
+
+
+def test_csv_quotes_multiline_text_and_serializes_json_cells():
+    rows = list(csv.reader(io.StringIO("".join(history_export.csv_lines(
+        [entry(1, sections={"diagnosis": "x"}), entry(2, user_id=None)])))))
+    assert rows[0] == list(history_export.CSV_COLUMNS)
+    assert rows[1][3] == 'transkrip 1, "dikutip"\nbaris dua'
+    assert json.loads(rows[1][5]) == {"mode": "patologi"}
+    assert json.loads(rows[1][6]) == {"diagnosis": "x"}
+    assert rows[2][2] == "" and rows[2][6] == ""
+
+
+def test_stream_chunks_and_gzip_roundtrip():
+    entries = [entry(i) for i in range(50)]
+    plain = list(history_export.stream(iter(entries), "ndjson", chunk_bytes=1024))
+    assert len(plain) > 1  # dikirim bertahap, bukan satu blok
+    packed = list(history_export.stream(iter(entries), "ndjson", gzip=True, chunk_bytes=1024))
+    # setiap chunk gzip bisa didekompresi begitu diterima (sync flush)
+    d = zlib.decompressobj(31)
+    assert d.decompress(packed[0])
+    assert d.decompress(b"".join(packed[1:])) and d.eof
+    assert zlib.decompress(b"".join(packed), 31) == b"".join(plain)
+
+
+def test_stream_close_stops_reading_entries():
+    pulled = []
+
+    def entries():
+        for i in range(1000):
+            pulled.append(i)
+            yield entry(i % 60)
+
+    body = history_export.stream(entries(), "csv", chunk_bytes=256)
+    next(body)
+    body.close()
+    assert len(pulled) < 1000
+
+
+def test_iter_range_pages_oldest_first_within_bounds(tmp_path):
+    store = history_db.SqliteHistoryStore(str(tmp_path / "h.db"))
+    # format created_at dari /save (api._now_iso), sebanding dengan parse_bound
+    for i in range(9):
+        store.add(entry(i, created_at=f"2026-01-01T00:00:{i:02d}.000000Z"))
+    store.add(entry(50, user_id="u2", created_at="2026-01-01T00:00:03.000000Z"))
+    got = list(store.iter_range(start=history_db.parse_bound("2026-01-01T00:00:02Z"),
+                                end=history_db.parse_bound("2026-01-01T00:00:08Z"),
+                                user_id="u1", page_size=2))
+    assert [e["id"] for e in got] == ["e002", "e003", "e004", "e005", "e006", "e007"]
+
+
+# =========================
+# Endpoint: history hanya milik user token
+# =========================
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    api = pytest.importorskip("api")
+    store = history_db.SqliteHistoryStore(str(tmp_path / "h.db"))
+    store.add(entry(1, user_id="alice"))
+    store.add(entry(2, user_id="bob"))
+    monkeypatch.setattr(api, "history_store", store)
+    monkeypatch.setattr(auth_utils, "verify_supabase_jwt", lambda token: {"sub": token})
+    return api.app.test_client()
+
+
+@pytest.mark.parametrize("path", ["/api/history", "/api/history/search?q=transkrip",
+                                  "/api/history/export"])
+def test_history_endpoints_require_auth(client, path):
+    assert client.get(path).status_code == 401
+
+
+def test_history_is_scoped_to_token_user(client):
+    auth = {"Authorization": "Bearer alice"}
+    page = client.get("/api/history?user_id=bob", headers=auth).get_json()
+    assert [e["id"] for e in page["history"]] == ["e001"]
+    found = client.get("/api/history/search?q=transkrip&user_id=bob", headers=auth).get_json()
+    assert [e["id"] for e in found["results"]] == ["e001"]
+    body = client.get("/api/history/export?user_id=bob", headers=auth).get_data(as_text=True)
+    assert [json.loads(line)["user_id"] for line in body.splitlines()] == ["alice"]
@@ -0,0 +1,70 @@
+# backend/tests/test_http_clients.py
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import http_clients
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b"x" * 10000
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_timeouts_and_limits_from_env(monkeypatch):
+    monkeypatch.setenv("HTTP_SUPABASE_READ_TIMEOUT", "2.5")
+    monkeypatch.setenv("HTTP_SUPABASE_MAX_CONNECTIONS", "7")
+    t = http_clients.timeout_for("supabase")
+    assert (t.connect, t.read) == (5.0, 2.5)
+    assert http_clients.limits_for("supabase").max_connections == 7
+    assert http_clients.timeout_for("groq").read == 60.0
+
+
+def test_pool_slot_held_until_body_closed(url):
+    client = http_clients.httpx_client("test_pool")
+    stats = http_clients._stats["test_pool"]
+    with client.stream("GET", url) as response:
+        assert stats.snapshot()["in_use"] == 1
+        for _ in response.iter_bytes(1024):
+            break
+    assert stats.snapshot()["in_use"] == 0
+    client.get(url)
+    snap = http_clients.pool_stats()["test_pool"]
+    assert snap["in_use"] == 0 and snap["requests"] == 2 and snap["peak"] == 1
+
+
+def test_connection_error_releases_slot():
+    client = http_clients.httpx_client("test_refused")
+    with pytest.raises(Exception):
+        client.get("http://127.0.0.1:1/")
+    assert http_clients.pool_stats()["test_refused"]["in_use"] == 0
+
+
+def test_streaming_client_outside_scope_behaves_like_plain_client(url):
+    client = http_clients.streaming_httpx_client("test_plain")
+    assert len(client.get(url).content) == 10000
+    assert http_clients.pool_stats()["test_plain_stream"]["in_use"] == 0
+
+
+def test_streaming_client_pool_uses_scoped_backend():
+    # menjaga patokan versi httpx/httpcore: pool harus masih memakai _network_backend
+    client = http_clients.streaming_httpx_client("test_backend")
+    assert isinstance(client._transport._pool._network_backend, http_clients._ScopedBackend)
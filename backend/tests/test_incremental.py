@@ -0,0 +1,55 @@
+# backend/tests/test_incremental.py
+import pytest
+
+COVERED = "Pasien datang dengan keluhan gatal. " * 4
+SUMMARY = "**Diagnosis:**\n- Dermatitis"
+
+
+@pytest.fixture
+def api(monkeypatch, tmp_path):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    api = pytest.importorskip("api")
+    api.session_summaries["sid"] = {"mode": "patologi", "covered": COVERED, "summary": SUMMARY}
+    yield api
+    api.session_summaries.pop("sid")
+
+
+def test_small_delta_updates_prior_summary(api):
+    prompt, cached = api.plan_stream_prompt("sid", COVERED + "Tidak ada demam.", "patologi", True)
+    assert cached is None
+    assert "Ringkasan sebelumnya:\n" + SUMMARY in prompt
+    assert "Lanjutan transkrip:\nTidak ada demam." in prompt
+    assert COVERED.strip() not in prompt  # teks yang sudah tercakup tidak dikirim ulang
+
+
+def test_unchanged_transcript_reuses_summary(api):
+    assert api.plan_stream_prompt("sid", COVERED + "  ", "patologi", True) == (None, SUMMARY)
+
+
+@pytest.mark.parametrize("text, mode, incremental", [
+    ("Transkrip diedit total.", "patologi", True),              # bukan lanjutan
+    (COVERED + "Tambahan panjang. " * 40, "patologi", True),    # delta > INCREMENTAL_FULL_RATIO
+    (COVERED + "Tidak ada demam.", "dokter_hewan", True),       # mode berganti
+    (COVERED + "Tidak ada demam.", "patologi", False),          # incremental dimatikan
+])
+def test_falls_back_to_full_prompt(api, text, mode, incremental):
+    prompt, cached = api.plan_stream_prompt("sid", text, mode, incremental)
+    assert cached is None
+    assert "Ringkasan sebelumnya:" not in prompt
+    assert text.strip()[:30] in prompt
+
+
+def test_replay_pieces_rebuilds_summary(api):
+    assert "".join(api.replay_pieces(SUMMARY * 5, size=7)) == SUMMARY * 5
+
+
+def test_replay_events_match_live_section_events(api):
+    outline = api.sections.SectionParser()
+    live = outline.feed(SUMMARY) + outline.flush()
+    replayed = list(api.replay_events(SUMMARY))
+    assert [ev for name, ev in replayed if name == "summary_section"] == live
+    assert "".join(ev["token"] for name, ev in replayed if "token" in ev) == SUMMARY
+    assert replayed[-1] == ("summary_stream", api.final_event(SUMMARY))
+    reused = list(api.replay_events(SUMMARY, tokens=False))
+    assert not any("token" in ev for _, ev in reused)
+    assert [ev for name, ev in reused if name == "summary_section"] == live
@@ -0,0 +1,121 @@
+# backend/tests/test_jobs.py
+import time
+
+import pytest
+
+import jobs
+
+
+def items(*texts, mode="patologi"):
+    return [{"key": f"h:{t}", "mode": mode, "text": t} for t in texts]
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return jobs.JobQueue(str(tmp_path / "jobs.db"), max_attempts=2)
+
+
+def drain(pool):
+    while pool.queue.pending():
+        pool._step()
+
+
+def test_duplicates_are_summarized_once(queue):
+    calls = []
+    pool = jobs.WorkerPool(queue, lambda text, mode: calls.append(text) or text.upper())
+    job = queue.enqueue(items("a", "b", "a"))
+    assert job["total"] == 3 and job["unique"] == 2
+    drain(pool)
+    assert sorted(calls) == ["a", "b"]
+    got = queue.get(job["job_id"])
+    assert got["status"] == "completed"
+    assert [i["summary"] for i in got["items"]] == ["A", "B", "A"]
+
+
+def test_finished_hash_reused_by_later_batch(queue):
+    pool = jobs.WorkerPool(queue, lambda text, mode: "hasil")
+    queue.enqueue(items("a"))
+    drain(pool)
+    job = queue.enqueue(items("a", "b"))
+    assert job["reused"] == 1
+    assert queue.get(job["job_id"], include_items=False)["done"] == 1
+
+
+def test_retry_then_permanent_error(queue):
+    pool = jobs.WorkerPool(queue, lambda text, mode: 1 / 0, retry_delay=lambda e: 0.0)
+    job = queue.enqueue(items("a"))
+    pool._step()
+    assert queue.get(job["job_id"])["items"][0]["status"] == "queued"
+    pool._step()
+    got = queue.get(job["job_id"])
+    assert got["status"] == "completed_with_errors"
+    assert got["items"][0]["error"].startswith("ZeroDivisionError")
+
+
+def test_retry_waits_for_not_before(queue):
+    pool = jobs.WorkerPool(queue, lambda text, mode: 1 / 0, retry_delay=lambda e: 60.0)
+    queue.enqueue(items("a"))
+    pool._step()
+    assert queue.claim() is None
+    assert queue.next_ready_in() > 50
+
+
+def test_second_process_does_not_steal_running_items(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    first = jobs.JobQueue(path)
+    job = first.enqueue(items("a"))
+    assert first.claim()["key"] == "h:a"
+    second = jobs.JobQueue(path)  # worker proses lain start saat item masih dikerjakan
+    assert second.claim() is None
+    assert second.get(job["job_id"])["items"][0]["status"] == "running"
+
+
+def test_expired_lease_requeued_after_crash(tmp_path, monkeypatch):
+    path = str(tmp_path / "jobs.db")
+    first = jobs.JobQueue(path, lease=60)
+    first.enqueue(items("a"))
+    assert first.claim()["key"] == "h:a"
+    now = time.time()
+    monkeypatch.setattr(jobs.time, "time", lambda: now + 61)  # proses pertama mati
+    again = jobs.JobQueue(path, lease=60)
+    assert again.claim()["key"] == "h:a"
+
+
+def test_worker_pool_runs_in_background(queue):
+    pool = jobs.WorkerPool(queue, lambda text, mode: text[::-1], workers=2)
+    job = queue.enqueue(items("abc", "xyz"))
+    pool.notify()
+    deadline = time.monotonic() + 5
+    while queue.get(job["job_id"], include_items=False)["status"] != "completed":
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+    assert [i["summary"] for i in queue.get(job["job_id"])["items"]] == ["cba", "zyx"]
+
+
+def test_get_scoped_to_owner(queue):
+    job = queue.enqueue(items("a"), user_id="alice")
+    assert queue.get(job["job_id"], user_id="alice")["total"] == 1
+    assert queue.get(job["job_id"], user_id="bob") is None
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path, queue):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    api = pytest.importorskip("api")
+    import auth_utils
+    monkeypatch.setattr(api, "job_queue", queue)
+    monkeypatch.setattr(api.batch_workers, "notify", lambda: None)
+    monkeypatch.setattr(type(api.llm), "configured", property(lambda self: True))
+    monkeypatch.setattr(auth_utils, "verify_supabase_jwt", lambda token: {"sub": token})
+    return api.app.test_client()
+
+
+def test_batch_routes_require_auth_and_hide_other_users_jobs(client):
+    body = {"items": ["teks satu"], "mode": "patologi"}
+    assert client.post("/api/summarize/batch", json=body).status_code == 401
+    res = client.post("/api/summarize/batch", json=body, headers={"Authorization": "Bearer alice"})
+    assert res.status_code == 202
+    url = res.get_json()["status_url"]
+    assert client.get(url).status_code == 401
+    assert client.get(url, headers={"Authorization": "Bearer alice"}).get_json()["total"] == 1
+    assert client.get(url, headers={"Authorization": "Bearer bob"}).status_code == 404
@@ -0,0 +1,67 @@
+# backend/tests/test_lazy.py
+import sys
+import threading
+import time
+
+import pytest
+
+import lazy
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    monkeypatch.setattr(lazy, "_registry", [])
+
+
+def test_factory_runs_once_across_threads():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"ok": True}
+
+    value = lazy.Lazy(factory, name="client")
+    threads = [threading.Thread(target=value.get) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert value.ready and value.get() == {"ok": True}
+
+
+def test_attributes_forwarded_and_failures_retried():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("belum siap")
+        return "Teks"
+
+    value = lazy.Lazy(factory, name="flaky")
+    with pytest.raises(RuntimeError):
+        value.upper()
+    assert not value.ready
+    assert value.upper() == "TEKS"
+    assert repr(value) == "<Lazy flaky ready>"
+
+
+def test_module_imports_on_first_attribute():
+    sys.modules.pop("colorsys", None)
+    mod = lazy.module("colorsys")
+    assert "colorsys" not in sys.modules
+    assert mod.rgb_to_hsv(1, 0, 0)[0] == 0
+    assert "colorsys" in sys.modules
+
+
+def test_warm_up_builds_registered_and_reports_errors():
+    lazy.Lazy(lambda: 1, name="ok")
+    lazy.Lazy(lambda: 1 / 0, name="broken")
+    lazy.Lazy(lambda: pytest.fail("warm=False tidak ikut"), name="cold", warm=False)
+    result = lazy.warm_up()
+    assert set(result) == {"ok", "broken"}
+    assert isinstance(result["ok"], float)
+    assert result["broken"].startswith("error: ZeroDivisionError")
+    assert lazy.stats()["ok"]["ready"] and not lazy.stats()["broken"]["ready"]
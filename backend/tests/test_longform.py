@@ -0,0 +1,91 @@
+# backend/tests/test_longform.py
+import pytest
+
+import longform
+from summary_cache import SummaryCache
+
+
+def transcript(n, start=0):
+    return " ".join(f"Kalimat nomor {i} tentang pemeriksaan pasien." for i in range(start, start + n))
+
+
+def test_chunks_respect_budget_and_keep_all_text():
+    text = transcript(200)
+    chunks = longform.split_chunks(text, budget_tokens=100)
+    assert len(chunks) > 1
+    assert all(longform.estimate_tokens(c) <= 100 for c in chunks)
+    assert " ".join(chunks) == text
+
+
+def test_headings_start_new_chunk():
+    chunks = longform.split_chunks("Pembuka singkat.\n**Diagnosis:**\nDermatitis.", budget_tokens=1000)
+    assert chunks == ["Pembuka singkat.", "**Diagnosis:** Dermatitis."]
+
+
+def test_oversized_sentence_split_at_words():
+    chunks = longform.split_chunks("kata " * 100, budget_tokens=10)
+    assert all(len(c) <= 40 for c in chunks)
+    assert " ".join(chunks).split() == ["kata"] * 100
+
+
+def test_local_edit_only_changes_nearby_chunks():
+    before = longform.split_chunks(transcript(300), budget_tokens=150)
+    edited = transcript(300).replace("Kalimat nomor 150 ", "Kalimat nomor seratus lima puluh ", 1)
+    after = longform.split_chunks(edited, budget_tokens=150)
+    changed = set(before) ^ set(after)
+    assert 0 < len(changed) <= 4  # chunk lain tetap sama -> cache hit
+
+
+def test_map_chunks_uses_cache_and_keeps_order():
+    cache = SummaryCache()
+    cache.put("k:b", "catatan b")
+    calls = []
+
+    def summarize(i, chunk):
+        calls.append(chunk)
+        return f"catatan {chunk}"
+
+    notes, cached = longform.map_chunks(["a", "b", "c"], summarize, cache=cache, key_fn=lambda i, c: f"k:{c}")
+    assert notes == ["catatan a", "catatan b", "catatan c"] and cached == 1
+    assert sorted(calls) == ["a", "c"]
+    assert cache.get("k:c") == "catatan c"
+
+
+def test_map_chunks_caches_successes_before_raising():
+    cache = SummaryCache()
+
+    def summarize(i, chunk):
+        if chunk == "b":
+            raise RuntimeError("upstream")
+        return chunk.upper()
+
+    with pytest.raises(RuntimeError):
+        longform.map_chunks(["a", "b"], summarize, cache=cache, key_fn=lambda i, c: c)
+    assert cache.get("a") == "A"
+
+
+def test_join_notes_labels_parts():
+    assert longform.join_notes([" x ", "y"]) == "[Bagian 1/2]\nx\n\n[Bagian 2/2]\ny"
+
+
+def test_chunk_note_cache_key_tracks_position_and_budget(monkeypatch, tmp_path):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    api = pytest.importorskip("api")
+    calls = []
+
+    class FakeLLM:
+        def call(self, messages, **kwargs):
+            calls.append(kwargs["max_tokens"])
+            message = type("Message", (), {"content": "- catatan"})()
+            return type("Resp", (), {"choices": [type("Choice", (), {"message": message})()]})()
+
+    monkeypatch.setattr(api, "llm", FakeLLM())
+    monkeypatch.setattr(api, "summaries", SummaryCache())
+    api.longform_prompt("", "patologi", "test", chunks=["a", "b"])
+    api.longform_prompt("", "patologi", "test", chunks=["a", "b"])
+    assert len(calls) == 2  # ulang persis -> semua dari cache
+    api.longform_prompt("", "patologi", "test", chunks=["b", "a", "c"])
+    assert len(calls) == 5  # posisi / jumlah bagian berubah -> prompt map berbeda
+    monkeypatch.setattr(api.prompts, "note_budget", lambda mode, total: 64)
+    api.longform_prompt("", "patologi", "test", chunks=["a", "b"])
+    assert calls[-2:] == [64, 64]
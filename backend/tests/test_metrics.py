@@ -0,0 +1,44 @@
+# backend/tests/test_metrics.py
+from metrics import Counter, Gauge, Histogram
+
+
+def test_counter_renders_labels_escaped():
+    c = Counter("app_requests_total", "Jumlah request", ["route", "status"])
+    c.inc(route="/summarize", status="200")
+    c.inc(2, route="/summarize", status="200")
+    c.inc(route='/a"b\\c', status="500")
+    assert c.render() == [
+        "# HELP app_requests_total Jumlah request",
+        "# TYPE app_requests_total counter",
+        'app_requests_total{route="/summarize",status="200"} 3',
+        'app_requests_total{route="/a\\"b\\\\c",status="500"} 1',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    h = Histogram("lat_seconds", "Latensi", buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 0.5, 3.0):
+        h.observe(v)
+    assert h.render()[2:] == [
+        'lat_seconds_bucket{le="0.1"} 1',
+        'lat_seconds_bucket{le="1"} 3',
+        'lat_seconds_bucket{le="+Inf"} 4',
+        "lat_seconds_sum 4.05",
+        "lat_seconds_count 4",
+    ]
+
+
+def test_gauge_callback_read_at_scrape_and_errors_skipped():
+    values = {("a",): 2}
+    g = Gauge("queue_depth", "Antrean", ["name"], fn=lambda: values)
+    assert g.render()[2:] == ['queue_depth{name="a"} 2']
+    g = Gauge("broken", "Rusak", fn=lambda: 1 / 0)
+    assert g.render()[2:] == []
+
+
+def test_gauge_set_inc_dec():
+    g = Gauge("sessions", "Sesi")
+    g.set(5)
+    g.inc()
+    g.dec(3)
+    assert g.render()[2:] == ["sessions 3"]
@@ -0,0 +1,75 @@
+# backend/tests/test_prompt_registry.py
+import pytest
+
+import prompt_registry
+from prompt_registry import PromptRegistry, PromptTooLong, TemplateError
+
+
+def write_prompts(tmp_path, summary_header="", chunk_header="max_output_tokens: 512\n"):
+    (tmp_path / "_incremental.txt").write_text("{role}: {prior_summary} + {delta}", encoding="utf-8")
+    (tmp_path / "_chunk.txt").write_text(
+        f"---\n{chunk_header}---\n{{role}} {{index}}/{{total}}: {{chunk}}", encoding="utf-8")
+    (tmp_path / "patologi.txt").write_text(
+        f"---\nrole: dokter patologi\n{summary_header}---\nAnda {{role}}. Ringkas:\n{{text}}", encoding="utf-8")
+    return str(tmp_path)
+
+
+def registry(tmp_path, **kwargs):
+    return PromptRegistry(write_prompts(tmp_path, **kwargs.pop("files", {})), **kwargs)
+
+
+def test_summary_output_is_bounded_by_model_not_template(tmp_path):
+    reg = registry(tmp_path, context_tokens=131072, max_output_tokens=32768)
+    prompt = reg.summary("patologi", "x" * 4000)
+    assert prompt.max_output_tokens is None
+    assert reg.max_tokens(prompt) == 32768
+
+
+def test_max_tokens_shrinks_to_remaining_context(tmp_path):
+    reg = registry(tmp_path, context_tokens=10000, max_output_tokens=32768)
+    prompt = reg.summary("patologi", "x" * 4 * 6000)
+    assert reg.max_tokens(prompt) == reg.usable_context - prompt.tokens
+
+
+def test_template_cap_applies_when_set(tmp_path):
+    reg = registry(tmp_path, files={"summary_header": "max_output_tokens: 700\n"})
+    assert reg.max_tokens(reg.summary("patologi", "teks")) == 700
+    assert reg.max_tokens(reg.chunk("patologi", "teks", 1, 2)) == 512
+
+
+def test_prompt_too_long(tmp_path):
+    reg = registry(tmp_path, context_tokens=1000, min_output_tokens=256)
+    with pytest.raises(PromptTooLong) as exc:
+        reg.max_tokens(reg.summary("patologi", "x" * 4 * 800))
+    assert exc.value.to_dict()["error"] == "input_too_long"
+
+
+def test_static_tokens_counted_once_and_fields_filled(tmp_path):
+    reg = registry(tmp_path)
+    tpl = reg.template("patologi")
+    prompt = reg.summary("patologi", "abcd" * 10)
+    assert prompt.startswith("Anda dokter patologi.")
+    assert prompt.tokens == tpl.static_tokens + prompt_registry.estimate_tokens("abcd" * 10)
+    assert reg.template("tidak-ada") is tpl  # mode tak dikenal -> default
+
+
+def test_note_budget_fits_reduce_prompt(tmp_path):
+    reg = registry(tmp_path, context_tokens=20000)
+    assert reg.note_budget("patologi", 4) == 512
+    with pytest.raises(PromptTooLong):
+        reg.note_budget("patologi", 1000)
+
+
+@pytest.mark.parametrize("body", ["{text!r}", "{text} {unknown}", "tanpa placeholder"])
+def test_invalid_templates_rejected_at_startup(tmp_path, body):
+    write_prompts(tmp_path)
+    (tmp_path / "patologi.txt").write_text(body, encoding="utf-8")
+    with pytest.raises(TemplateError):
+        PromptRegistry(str(tmp_path))
+
+
+def test_bundled_prompts_load():
+    reg = prompt_registry.from_env()
+    assert reg.default_mode in reg.modes
+    for item in reg.describe():
+        assert item["max_output_tokens"] == reg.max_output_tokens
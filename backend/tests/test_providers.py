@@ -0,0 +1,186 @@
+# backend/tests/test_providers.py
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+import http_clients
+import providers
+import streaming
+import upstream
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+import fake_groq  # noqa: E402
+
+pytest.importorskip("groq")
+
+MESSAGES = [{"role": "user", "content": "ringkas"}]
+
+
+@pytest.fixture
+def fake():
+    servers = []
+
+    def start(**kwargs):
+        server = fake_groq.serve(0, **kwargs)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def provider_for(server, name="t"):
+    port = server.server_address[1]
+    guard = upstream.UpstreamGuard(upstream.TokenBucket(0, 1), upstream.CircuitBreaker(5, 30.0),
+                                   max_retries=0, max_inline_wait=0)
+    return providers.Provider(name, "fake-model", "fake", base_url=f"http://127.0.0.1:{port}", guard=guard)
+
+
+def pool_for(server):
+    return providers.ProviderPool([provider_for(server)])
+
+
+def cancel_later(ticket, delay):
+    t = threading.Timer(delay, ticket.cancel, args=("superseded",))
+    t.start()
+    return t
+
+
+def test_cancel_before_send_never_reaches_upstream(fake):
+    server = fake(ttft=0.0)
+    ticket = streaming.StreamTicket("sid")
+    ticket.cancel("superseded")
+    with pytest.raises(providers.Cancelled):
+        pool_for(server).stream(ticket=ticket, messages=MESSAGES, stream=True)
+    assert server.cfg.stats["requests"] == 0
+
+
+def test_cancel_while_waiting_for_headers_returns_immediately(fake):
+    server = fake(ttft=5.0)  # header baru dikirim setelah 5 detik
+    pool = pool_for(server)
+    ticket = streaming.StreamTicket("sid")
+    cancel_later(ticket, 0.2)
+    t0 = time.monotonic()
+    with pytest.raises(providers.Cancelled):
+        pool.stream(ticket=ticket, messages=MESSAGES, stream=True)
+    assert time.monotonic() - t0 < 1.0
+    # pembatalan bukan kegagalan upstream
+    assert pool.primary.guard.breaker.state == "closed"
+    assert pool.primary.counts["errors"] == 0
+
+
+def test_cancel_while_reading_body_wakes_reader(fake):
+    server = fake(ttft=0.0, tps=2.0)  # token berikutnya tiap 0.5 detik
+    ticket = streaming.StreamTicket("sid")
+    response = pool_for(server).stream(ticket=ticket, messages=MESSAGES, stream=True)
+    cancel_later(ticket, 0.2)
+    t0 = time.monotonic()
+    with pytest.raises(providers.Cancelled):
+        for _ in response:
+            pass
+    assert time.monotonic() - t0 < 1.0
+    response.close()
+
+
+def test_cancel_after_close_leaves_pooled_connection_alone(fake):
+    server = fake(ttft=0.0, tps=1000.0)
+    pool = pool_for(server)
+    ticket = streaming.StreamTicket("sid")
+    response = pool.stream(ticket=ticket, messages=MESSAGES, stream=True)
+    text = "".join(c.choices[0].delta.content or "" for c in response if c.choices)
+    response.close()
+    ticket.cancel("stopped")  # tiket lama; koneksinya sudah dipakai ulang pool
+    again = pool.stream(ticket=streaming.StreamTicket("sid"), messages=MESSAGES, stream=True)
+    assert "".join(c.choices[0].delta.content or "" for c in again if c.choices) == text
+    again.close()
+
+
+def test_scope_release_makes_cancel_a_no_op():
+    scope = http_clients.CancelScope()
+    scope.release()
+    scope.cancel("late")
+    assert not scope.cancelled
+    scope.check()
+
+
+def test_hedge_winner_returns_and_loser_is_abandoned(fake):
+    slow, fast = fake(ttft=5.0), fake(ttft=0.0)
+    pool = providers.ProviderPool([provider_for(slow, "slow"), provider_for(fast, "fast")],
+                                  hedge=True, hedge_default=0.1)
+    t0 = time.monotonic()
+    response = pool.stream(ticket=streaming.StreamTicket("sid"), messages=MESSAGES, stream=True)
+    assert response.provider.name == "fast" and response.hedged
+    assert time.monotonic() - t0 < 1.0
+    response.close()
+    assert pool.providers[0].guard.breaker.state == "closed"
+
+
+def test_stream_falls_back_on_429(fake):
+    limited, ok = fake(ttft=0.0, rate_429=1.0), fake(ttft=0.0, tps=1000.0)
+    pool = providers.ProviderPool([provider_for(limited, "a"), provider_for(ok, "b")])
+    response = pool.stream(ticket=streaming.StreamTicket("sid"), messages=MESSAGES, stream=True)
+    assert response.provider.name == "b"
+    assert "".join(c.choices[0].delta.content or "" for c in response if c.choices)
+    response.close()
+    assert pool.providers[0].counts["fallbacks"] == 1
+    assert limited.cfg.stats["rate_limited"] == 1  # provider non-final tidak di-retry
+
+
+def test_call_falls_back_and_last_provider_error_is_raised(fake):
+    failing = fake(ttft=0.0, rate_5xx=1.0)
+    ok = fake(ttft=0.0, tps=1000.0)
+    pool = providers.ProviderPool([provider_for(failing, "a"), provider_for(ok, "b")])
+    result = pool.call(messages=MESSAGES)
+    assert result.choices[0].message.content
+    only_failing = providers.ProviderPool([provider_for(failing, "a")])
+    with pytest.raises(Exception) as exc:
+        only_failing.call(messages=MESSAGES)
+    assert providers.can_fall_back(exc.value)
+
+
+def test_open_breaker_provider_is_skipped(fake):
+    a, b = provider_for(fake(), "a"), provider_for(fake(), "b")
+    for _ in range(5):
+        a.guard.breaker.record_failure()
+    pool = providers.ProviderPool([a, b])
+    assert pool.candidates() == [b]
+    for _ in range(5):
+        b.guard.breaker.record_failure()
+    assert pool.candidates() == [a, b]  # semua terbuka: tetap dicoba berurutan
+
+
+def test_non_upstream_errors_do_not_fall_back():
+    assert not providers.can_fall_back(ValueError("prompt kosong"))
+    assert providers.can_fall_back(upstream.UpstreamError("x"))
+
+
+def test_hedge_delay_follows_ttft_percentile():
+    pool = providers.ProviderPool([], hedge_default=1.5, hedge_min=0.1, hedge_max=2.0, hedge_min_samples=3)
+    p = providers.Provider("p", "m", "k")
+    assert pool.hedge_delay(p) == 1.5
+    for v in (0.2, 0.3, 0.4):
+        p.ttft.record(v)
+    assert 0.2 <= pool.hedge_delay(p) <= 0.4
+    for _ in range(50):
+        p.ttft.record(10.0)
+    assert pool.hedge_delay(p) == 2.0
+
+
+def test_from_env_builds_providers_in_order(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDERS", "groq, backup-1")
+    monkeypatch.setenv("GROQ_API_KEY", "g")
+    monkeypatch.setenv("LLM_BACKUP_1_API_KEY", "b")
+    monkeypatch.setenv("LLM_BACKUP_1_MODEL", "model-b")
+    pool = providers.from_env()
+    assert [p.name for p in pool.providers] == ["groq", "backup-1"]
+    assert pool.providers[1].model == "model-b"
+    # tanpa API key (juga tanpa GROQ_API_KEY sebagai fallback) provider dilewati
+    monkeypatch.delenv("GROQ_API_KEY")
+    assert [p.name for p in providers.from_env().providers] == ["backup-1"]
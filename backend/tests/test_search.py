@@ -0,0 +1,109 @@
+# backend/tests/test_search.py
+import base64
+
+import pytest
+
+import history_db
+from history_db import SqliteHistoryStore, SupabaseHistoryStore
+
+
+@pytest.mark.parametrize("word, stem", [
+    ("pemeriksaannya", "periksa"),
+    ("menuliskan", "tulis"),
+    ("ditulis", "tulis"),
+    ("Pemeriksaan", "periksa"),
+    ("obat", "obat"),
+])
+def test_stem_id(word, stem):
+    assert history_db.stem_id(word) == stem
+
+
+def test_fold_removes_diacritics():
+    assert history_db.fold("Café DÉMAM") == "cafe demam"
+
+
+def test_fts_query_quotes_every_term():
+    q = history_db.fts_query('demam" OR pemeriksaan*')
+    assert q == '"demam" * AND "or" * AND ("pemeriksaan" * OR stems : "periksa" *)'
+
+
+def test_sqlite_search_matches_stem_and_diacritics(tmp_path):
+    store = SqliteHistoryStore(str(tmp_path / "h.db"))
+    store.add({"id": "a", "text": "Pasien menjalani pemeriksaan darah", "summary_result": "",
+               "meta": {}, "created_at": "2026-01-01T00:00:00+00:00"})
+    store.add({"id": "b", "text": "Tidak ada keluhan", "summary_result": "", "meta": {},
+               "created_at": "2026-01-02T00:00:00+00:00"})
+    assert [e["id"] for e in store.search("periksa")] == ["a"]
+    assert store.search("") == []
+
+
+def raw_cursor(text):
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("payload", [
+    "2026-01-01T00:00:00+00:00|x),id.gt.0",
+    "2026-01-01),user_id.neq.(x|abc",
+    "now|abc",
+    "2026-01-01T00:00:00Z|",
+    "no-separator",
+])
+def test_decode_cursor_rejects_filter_injection(payload):
+    with pytest.raises(ValueError):
+        history_db.decode_cursor(raw_cursor(payload))
+
+
+def test_decode_cursor_accepts_store_values():
+    for ts in ("2026-01-01T00:00:00+00:00", "2026-01-01T00:00:00.12345+00:00", "2026-01-01T00:00:00Z"):
+        cursor = history_db.encode_cursor(ts, "3f2b6c1e-8a4d-4e0b-9a51-0c2d7e6f1a22")
+        assert history_db.decode_cursor(cursor)[0] == ts
+
+
+class FakeQuery:
+    """Builder PostgREST palsu: catat filter or_(), return data kosong."""
+
+    def __init__(self):
+        self.ors = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def or_(self, expr):
+        self.ors.append(expr)
+        return self
+
+    def execute(self):
+        return type("Res", (), {"data": []})()
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.query = FakeQuery()
+
+    def table(self, name):
+        return self.query
+
+
+def test_supabase_filters_quote_values():
+    sb = FakeSupabase()
+    store = SupabaseHistoryStore(sb)
+    store.list(before=history_db.encode_cursor("2026-01-01T00:00:00.5+00:00", "abc"))
+    store.search('demam_tinggi')
+    assert sb.query.ors == [
+        'created_at.lt."2026-01-01T00:00:00.5+00:00",'
+        'and(created_at.eq."2026-01-01T00:00:00.5+00:00",id.lt."abc")',
+        'original_text.ilike."*demam\\\\_tinggi*",summary_result.ilike."*demam\\\\_tinggi*"',
+    ]
+
+
+def test_pg_quote_escapes_quotes_and_backslashes():
+    assert history_db.pg_quote('a"b\\c') == '"a\\"b\\\\c"'
+
+
+def test_sqlite_search_snippets_escape_transcript_html(tmp_path):
+    store = SqliteHistoryStore(str(tmp_path / "h.db"))
+    store.add({"id": "a", "text": "catatan <img src=x onerror=alert(1)> demam tinggi", "summary_result": "",
+               "meta": {}, "created_at": "2026-01-01T00:00:00+00:00"})
+    snippet = store.search("demam")[0]["snippets"]["text"]
+    assert "<img" not in snippet and "&lt;img" in snippet
+    assert "<mark>demam</mark>" in snippet
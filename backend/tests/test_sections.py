@@ -0,0 +1,80 @@
+# backend/tests/test_sections.py
+import pytest
+
+import sections
+from sections import SectionParser
+
+SUMMARY = (
+    "**Ringkasan Patologi Klinis**\n\n"
+    "**Jenis Spesimen:**\n- Biopsi kulit\n\n"
+    "**Diagnosis:** Dermatitis kronik\n- tanpa keganasan\n\n"
+    "**Rekomendasi / Tindak Lanjut:**\n- Kontrol 2 minggu\n"
+)
+
+
+def stream(text, size):
+    parser = SectionParser()
+    events = []
+    for i in range(0, len(text), size):
+        events += parser.feed(text[i:i + size])
+    return events + parser.flush(), parser
+
+
+def test_parse_title_and_sections():
+    assert sections.parse(SUMMARY) == {
+        "title": "Ringkasan Patologi Klinis",
+        "sections": [
+            {"key": "jenis_spesimen", "heading": "Jenis Spesimen", "content": "- Biopsi kulit"},
+            {"key": "diagnosis", "heading": "Diagnosis", "content": "Dermatitis kronik\n- tanpa keganasan"},
+            {"key": "rekomendasi_tindak_lanjut", "heading": "Rekomendasi / Tindak Lanjut",
+             "content": "- Kontrol 2 minggu"},
+        ],
+    }
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+def test_streamed_events_match_one_shot_parse(size):
+    events, parser = stream(SUMMARY, size)
+    assert parser.structured() == sections.parse(SUMMARY)
+    for section in parser.structured()["sections"]:
+        key = section["key"]
+        appended = "".join(e["text"] for e in events if e["event"] == "appended" and e["key"] == key)
+        assert appended.rstrip() == section["content"]
+        kinds = [e["event"] for e in events if e["key"] == key]
+        assert kinds[0] == "started" and kinds[-1] == "completed"
+    # heading tidak pernah bocor sebagai teks
+    assert not any("**" in e.get("text", "") for e in events)
+
+
+def test_plain_text_is_not_held_until_newline():
+    parser = SectionParser()
+    parser.feed("**Diagnosis:**\n")
+    events = parser.feed("Dermatitis")
+    assert events == [{"event": "appended", "index": 0, "key": "diagnosis", "text": "Dermatitis"}]
+    assert parser.feed(" **x**") != []  # baris yang sudah diteruskan tetap isi
+    assert parser.feed("\n**Rek") == []  # awal baris baru mungkin heading: ditahan
+    assert [e["event"] for e in parser.feed("omendasi:**\n")] == ["completed", "started"]
+
+
+def test_bold_text_inside_line_is_content():
+    parsed = sections.parse("**Diagnosis:**\n**Catatan** tidak ada keganasan\n")
+    assert parsed["sections"][0]["content"] == "**Catatan** tidak ada keganasan"
+
+
+def test_duplicate_headings_get_unique_keys_and_markdown_headings():
+    parsed = sections.parse("## Diagnosis:\na\n**Diagnosis:**\nb\n")
+    assert [s["key"] for s in parsed["sections"]] == ["diagnosis", "diagnosis_2"]
+
+
+@pytest.mark.parametrize("heading, key", [
+    ("Rekomendasi / Tindak Lanjut", "rekomendasi_tindak_lanjut"),
+    ("Pemeriksaan Penunjang (Lab)", "pemeriksaan_penunjang_lab"),
+    ("Diagnósis", "diagnosis"),
+    ("***", "section"),
+])
+def test_section_key(heading, key):
+    assert sections.section_key(heading) == key
+
+
+def test_text_without_headings_has_no_sections():
+    assert sections.parse("Ringkasan bebas tanpa heading.") == {"title": None, "sections": []}
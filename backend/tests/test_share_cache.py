@@ -0,0 +1,138 @@
+# backend/tests/test_share_cache.py
+import threading
+import time
+
+import pytest
+
+import share_cache
+from share_cache import ShareCache, ViewCounter
+
+
+def test_share_cache_expires_with_token():
+    cache = ShareCache(ttl=60)
+    cache.put("t", {"expires_at": "2000-01-01T00:00:00Z"}, {"id": 1})
+    assert cache.get("t") is None
+    cache.put("u", {}, {"id": 2})
+    assert cache.get("u") == ({}, {"id": 2})
+    cache.invalidate("u")
+    assert cache.get("u") is None
+
+
+def test_flush_sends_one_batch_for_all_tokens():
+    batches = []
+    views = ViewCounter(batches.append, background=False, interval=60)
+    views.hit("a")  # flush pertama langsung di jalur request
+    views.hit("a")
+    views.hit("b")
+    views.flush()
+    assert batches == [{"a": 1}, {"a": 1, "b": 1}]
+    views.flush()
+    assert len(batches) == 2  # tidak ada RPC untuk batch kosong
+
+
+def test_failed_flush_requeues_views():
+    calls = []
+
+    def persist(counts):
+        calls.append(dict(counts))
+        if len(calls) == 1:
+            raise RuntimeError("rpc down")
+
+    views = ViewCounter(persist, background=False, interval=60)
+    views.hit("a")
+    views.hit("a")
+    views.flush()
+    assert calls == [{"a": 1}, {"a": 2}]
+
+
+def test_request_mode_flushes_every_hit_without_threads():
+    batches = []
+    views = ViewCounter(batches.append, background=False, interval=0)
+    for _ in range(3):
+        views.hit("a")
+    assert batches == [{"a": 1}] * 3
+    assert views._thread is None
+
+
+def test_forget_waits_for_inflight_flush():
+    db = {"a": 0}
+    entered, release = threading.Event(), threading.Event()
+
+    def slow_persist(counts):
+        entered.set()
+        release.wait(2)
+        for token, count in counts.items():
+            db[token] += count
+
+    views = ViewCounter(slow_persist, background=False, interval=60)
+    views._last_flush = time.monotonic()  # hit() tidak flush sendiri
+    for _ in range(3):
+        views.hit("a")
+    flusher = threading.Thread(target=views.flush)
+    flusher.start()
+    entered.wait(2)
+
+    def reload():
+        # sama seperti api._load_share: baca DB lalu forget di dalam settled()
+        with views.settled():
+            snapshot["db"] = db["a"]
+            views.forget("a")
+
+    snapshot = {}
+    reader = threading.Thread(target=reload)
+    reader.start()
+    time.sleep(0.05)
+    assert "db" not in snapshot  # menunggu flush selesai
+    release.set()
+    flusher.join(2)
+    reader.join(2)
+    # view dari DB + view lokal tidak hilang dan tidak dihitung ganda
+    assert snapshot["db"] + views.local_views("a") == 3
+
+
+def test_serverless_defaults(monkeypatch):
+    monkeypatch.delenv("SHARE_VIEW_FLUSH", raising=False)
+    monkeypatch.delenv("SHARE_VIEW_FLUSH_INTERVAL", raising=False)
+    monkeypatch.delenv("AWS_LAMBDA_FUNCTION_NAME", raising=False)
+    monkeypatch.delenv("VERCEL", raising=False)
+    assert share_cache.flush_background_from_env() is True
+    monkeypatch.setenv("VERCEL", "1")
+    assert share_cache.flush_background_from_env() is False
+    assert share_cache.flush_interval_from_env() == 0.0
+
+
+class FakeShareTable:
+    """Cukup untuk supabase.table('share_tokens').update(...).eq(...).eq(...).execute()."""
+
+    def __init__(self, rows):
+        self.rows, self.filters = rows, {}
+
+    def update(self, values):
+        self.values, self.filters = values, {}
+        return self
+
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+
+    def execute(self):
+        hits = [r for r in self.rows if all(r[k] == v for k, v in self.filters.items())]
+        for r in hits:
+            r.update(self.values)
+        return type("Response", (), {"data": hits})()
+
+
+def test_revoke_route_deactivates_and_invalidates(monkeypatch, tmp_path):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    api = pytest.importorskip("api")
+    import auth_utils
+    table = FakeShareTable([{"token": "t1", "created_by": "alice", "is_active": True}])
+    monkeypatch.setattr(api, "supabase", type("Supabase", (), {"table": lambda self, name: table})())
+    monkeypatch.setattr(api, "shared_cache", ShareCache(ttl=60))
+    monkeypatch.setattr(auth_utils, "verify_supabase_jwt", lambda token: {"sub": token})
+    api.shared_cache.put("t1", {}, {"id": 1})
+    client = api.app.test_client()
+    assert client.delete("/api/share/t1", headers={"Authorization": "Bearer bob"}).status_code == 404
+    assert api.shared_cache.get("t1") is not None and table.rows[0]["is_active"]
+    assert client.delete("/api/share/t1", headers={"Authorization": "Bearer alice"}).status_code == 200
+    assert api.shared_cache.get("t1") is None and not table.rows[0]["is_active"]
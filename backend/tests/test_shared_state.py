@@ -0,0 +1,52 @@
+# backend/tests/test_shared_state.py
+import pytest
+
+import shared_state
+import streaming
+from shared_state import MemoryStore, StoreMapping
+
+
+def test_memory_store_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(shared_state.time, "time", lambda: now[0])
+    store = MemoryStore()
+    store.set("a", {"x": 1}, ttl=5)
+    store.set("b", 2)
+    now[0] += 6
+    assert store.get("a") is None
+    assert store.get("b") == 2
+
+
+def test_store_mapping_namespaces_keys():
+    store = MemoryStore()
+    summaries = StoreMapping(store, "session_summary", ttl=60)
+    summaries["sid1"] = {"summary": "s"}
+    assert store.get("session_summary:sid1") == {"summary": "s"}
+    assert summaries.pop("sid1") == {"summary": "s"}
+    assert summaries.get("sid1") is None
+
+
+def test_supersede_reaches_other_worker():
+    # dua SessionScheduler (= dua worker) berbagi satu bus
+    bus = MemoryStore()
+    worker_a, worker_b = streaming.SessionScheduler(bus=bus), streaming.SessionScheduler(bus=bus)
+    old = worker_a.begin("sid")
+    new = worker_b.begin("sid")
+    assert old.cancelled and old.reason == "superseded"
+    assert not new.cancelled  # pesan "keep" melindungi tiket baru di worker pengirim
+    worker_a.cancel("sid", "stopped")
+    assert new.cancelled and new.reason == "stopped"
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.delenv("STATE_STORE_URL", raising=False)
+    monkeypatch.delenv("SOCKETIO_MESSAGE_QUEUE", raising=False)
+    assert isinstance(shared_state.from_env(), MemoryStore)
+    assert shared_state.message_queue_from_env() is None
+    pytest.importorskip("redis")
+    monkeypatch.setenv("STATE_STORE_URL", "redis://127.0.0.1:1/0")
+    store = shared_state.from_env()  # koneksi baru dibuka saat dipakai
+    assert store.shared and isinstance(store, shared_state.RedisStore)
+    assert shared_state.message_queue_from_env() == "redis://127.0.0.1:1/0"
+    monkeypatch.setenv("SOCKETIO_MESSAGE_QUEUE", "")
+    assert shared_state.message_queue_from_env() is None
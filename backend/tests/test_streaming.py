@@ -0,0 +1,164 @@
+# backend/tests/test_streaming.py
+import asyncio
+import time
+
+import streaming
+from streaming import FLUSH_DUE, TokenCoalescer
+
+
+def test_coalescer_sends_first_token_then_holds_until_window():
+    c = TokenCoalescer(window=10.0, max_chars=100)
+    assert c.push("Hai") == "Hai"
+    assert c.push(" dunia") is None
+    assert c.due() > 9
+    assert c.flush() == " dunia"
+    assert c.due() is None
+
+
+def test_coalescer_flushes_on_max_chars():
+    c = TokenCoalescer(window=10.0, max_chars=5)
+    c.push("a")
+    assert c.push("bcd") is None
+    assert c.push("ef") == "bcdef"
+
+
+def test_coalescer_due_reaches_zero_after_window():
+    c = TokenCoalescer(window=0.01, max_chars=100)
+    c.push("a")
+    c.push("b")
+    time.sleep(0.02)
+    assert c.due() == 0.0
+
+
+def stalled_chunks():
+    yield "a"
+    yield "b"
+    time.sleep(0.2)  # upstream diam lebih lama dari window
+    yield "c"
+
+
+def test_paced_yields_flush_due_while_upstream_stalls():
+    c = TokenCoalescer(window=0.02, max_chars=100)
+    frames = []
+    for chunk in streaming.paced(stalled_chunks(), c):
+        if chunk is FLUSH_DUE:
+            frames.append(("due", c.flush()))
+            continue
+        frame = c.push(chunk)
+        if frame:
+            frames.append(("push", frame))
+    # "b" dikirim saat window habis, bukan menunggu "c" 200ms kemudian
+    assert frames == [("push", "a"), ("due", "b"), ("push", "c")]
+
+
+def test_paced_reraises_stream_error():
+    def broken():
+        yield "a"
+        raise IOError("closed")
+
+    c = TokenCoalescer(window=0.02)
+    seen = []
+    try:
+        for chunk in streaming.paced(broken(), c):
+            seen.append(chunk)
+    except IOError as e:
+        seen.append(str(e))
+    assert seen == ["a", "closed"]
+
+
+def test_paced_without_window_is_passthrough():
+    c = TokenCoalescer(window=0.0)
+    assert list(streaming.paced(iter("abc"), c)) == ["a", "b", "c"]
+
+
+async def astalled():
+    yield "a"
+    yield "b"
+    await asyncio.sleep(0.2)
+    yield "c"
+
+
+def test_apaced_flushes_during_stall_and_keeps_pending_read():
+    async def main():
+        c = TokenCoalescer(window=0.02, max_chars=100)
+        chunks = streaming.apaced(astalled(), c)
+        out = []
+        async for chunk in chunks:
+            if chunk is FLUSH_DUE:
+                out.append(("due", c.flush()))
+            else:
+                out.append(("chunk", chunk))
+                c.push(chunk)
+        await chunks.aclose()
+        return out
+
+    out = asyncio.run(main())
+    assert out[:3] == [("chunk", "a"), ("chunk", "b"), ("due", "b")]
+    assert out[-1] == ("chunk", "c")  # baca yang tertunda tidak dibatalkan oleh timeout
+
+
+def test_apaced_aclose_cancels_pending_read():
+    async def main():
+        started = asyncio.Event()
+
+        async def forever():
+            yield "a"
+            started.set()
+            await asyncio.sleep(60)
+            yield "b"
+
+        c = TokenCoalescer(window=0.01)
+        chunks = streaming.apaced(forever(), c)
+        assert await chunks.__anext__() == "a"
+        c.push("a")
+        c.push("x")
+        assert await chunks.__anext__() is FLUSH_DUE
+        await started.wait()
+        t0 = time.monotonic()
+        await chunks.aclose()
+        return time.monotonic() - t0
+
+    assert asyncio.run(main()) < 1.0
+
+
+def run_filter(pieces):
+    f = streaming.ThinkFilter()
+    return "".join(f.feed(p) for p in pieces) + f.flush(), f
+
+
+def test_think_filter_drops_reasoning_split_across_chunks():
+    text, f = run_filter(["<th", "ink>rencana ", "jawab</th", "ink>\n\nHasil", " akhir"])
+    assert text == "Hasil akhir"
+    assert f.suppressed == len("rencana jawab")
+
+
+def test_think_filter_every_split_point():
+    raw = "<think>abc</think>\n Ringkasan <b>tebal</b> selesai"
+    for i in range(len(raw) + 1):
+        assert run_filter([raw[:i], raw[i:]])[0] == "Ringkasan <b>tebal</b> selesai"
+
+
+def test_think_filter_tags_case_insensitive_and_unclosed_block_dropped():
+    assert run_filter(["<THINK>x</Think>ok"])[0] == "ok"
+    assert run_filter(["ok <think>tidak pernah ditutup"])[0] == "ok "
+
+
+def test_think_filter_holds_only_possible_tag_prefix():
+    f = streaming.ThinkFilter()
+    assert f.feed("a < b <t") == "a < b "
+    assert f.feed("abel>") == "<tabel>"
+
+
+def test_strip_think():
+    assert streaming.strip_think("<think>x</think>\n\nJawaban\n") == "Jawaban"
+    assert streaming.strip_think("Tanpa reasoning") == "Tanpa reasoning"
+
+
+def test_scheduler_marks_only_replacing_tickets():
+    sched = streaming.SessionScheduler()
+    first = sched.begin("sid", "a")
+    assert not first.replaces  # request pertama tidak perlu debounce
+    second = sched.begin("sid", "b")
+    assert second.replaces and first.reason == "superseded"
+    sched.end(second)
+    assert not sched.begin("sid", "c").replaces
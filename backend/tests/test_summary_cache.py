@@ -0,0 +1,42 @@
+# backend/tests/test_summary_cache.py
+import summary_cache
+from summary_cache import SummaryCache
+
+
+def test_key_ignores_whitespace_and_mode_case():
+    a = summary_cache.make_key("Patologi", "m", "Pasien  demam\n\ttinggi ")
+    assert a == summary_cache.make_key("patologi", "m", "Pasien demam tinggi")
+    assert a != summary_cache.make_key("patologi", "m2", "Pasien demam tinggi")
+    assert a != summary_cache.make_key("dokter_hewan", "m", "Pasien demam tinggi")
+
+
+def test_lru_evicts_least_recently_used():
+    cache = SummaryCache(maxsize=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"  # a jadi terbaru
+    cache.put("c", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+
+
+def test_ttl_expiry_and_empty_summary_not_cached(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(summary_cache.time, "time", lambda: now[0])
+    cache = SummaryCache(ttl=10)
+    cache.put("a", "A")
+    cache.put("b", "")
+    now[0] += 11
+    assert cache.get("a") is None
+    assert cache.get("b") is None
+    assert cache.stats()["misses"] == 2
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    SummaryCache(db_path=path).put("a", "A")
+    cache = SummaryCache(db_path=path)
+    assert cache.get("a") == "A"
+    assert cache.get("a") == "A"
+    stats = cache.stats()
+    assert stats["disk_hits"] == 1 and stats["hits"] == 2 and stats["hit_ratio"] == 1.0
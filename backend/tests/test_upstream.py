@@ -0,0 +1,127 @@
+# backend/tests/test_upstream.py
+import asyncio
+import time
+
+import pytest
+
+import upstream
+from upstream import CircuitBreaker, CircuitOpen, RateLimited, TokenBucket, UpstreamGuard
+
+
+class ServerError(Exception):
+    status_code = 500
+
+
+def guard(breaker, rate=0, burst=1):
+    return UpstreamGuard(TokenBucket(rate, burst), breaker, max_retries=0, max_inline_wait=0)
+
+
+def trip(g, n=2):
+    for _ in range(n):
+        with pytest.raises(upstream.UpstreamServerError):
+            g.call(lambda: (_ for _ in ()).throw(ServerError("boom")))
+
+
+def test_breaker_opens_after_threshold_and_recovers():
+    b = CircuitBreaker(2, 0.05)
+    g = guard(b)
+    trip(g)
+    assert b.state == "open"
+    with pytest.raises(CircuitOpen):
+        g.call(lambda: "ok")
+    time.sleep(0.06)
+    assert b.state == "half_open"
+    assert g.call(lambda: "ok") == "ok"
+    assert b.state == "closed"
+
+
+def test_half_open_allows_single_trial():
+    b = CircuitBreaker(1, 0.0)
+    b.record_failure()
+    trial = b.before_call()
+    assert trial is not None
+    with pytest.raises(CircuitOpen):
+        b.before_call()
+    b.release(trial)
+    assert b.before_call() is not None
+
+
+def test_non_upstream_error_during_trial_releases_breaker():
+    b = CircuitBreaker(2, 0.05)
+    g = guard(b)
+    trip(g)
+    time.sleep(0.06)
+    with pytest.raises(ValueError):
+        g.call(lambda: (_ for _ in ()).throw(ValueError("bad request")))
+    # sebelum perbaikan: CircuitOpen selamanya
+    assert g.call(lambda: "ok") == "ok"
+    assert b.state == "closed"
+
+
+def test_local_rate_limit_during_trial_releases_breaker():
+    b = CircuitBreaker(1, 0.0)
+    b.record_failure()
+    g = UpstreamGuard(TokenBucket(0.001, 1), b, max_retries=0, max_inline_wait=0)
+    g.limiter.reserve(0)  # habiskan kuota
+    with pytest.raises(RateLimited):
+        g.call(lambda: "ok")
+    assert b.before_call() is not None
+
+
+def test_cancelled_trial_releases_breaker():
+    b = CircuitBreaker(1, 0.0)
+    b.record_failure()
+    g = guard(b)
+
+    async def main():
+        task = asyncio.ensure_future(g.acall(lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return await g.acall(lambda: asyncio.sleep(0, result="ok"))
+
+    assert asyncio.run(main()) == "ok"
+
+
+def test_stale_release_does_not_clear_new_trial():
+    b = CircuitBreaker(1, 0.0)
+    b.record_failure()
+    first = b.before_call()
+    b.record_failure()  # hasil percobaan pertama tercatat
+    second = b.before_call()
+    b.release(first)
+    with pytest.raises(CircuitOpen):
+        b.before_call()
+    b.release(second)
+
+
+def test_retry_reports_error_to_on_retry():
+    b = CircuitBreaker(10, 1.0)
+    g = UpstreamGuard(TokenBucket(0, 1), b, max_retries=2, base_delay=0.0, max_inline_wait=1.0)
+    calls, seen = [], []
+
+    def fn():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ServerError("upstream 500")
+        return "ok"
+
+    assert g.call(fn, on_retry=lambda attempt, delay, e: seen.append((attempt, str(e)))) == "ok"
+    assert seen == [(1, "upstream 500"), (2, "upstream 500")]
+
+
+def test_token_bucket_reserve_and_refuse():
+    bucket = TokenBucket(10.0, 1)
+    assert bucket.reserve(0) == 0.0
+    assert bucket.reserve(0) is None
+    wait = bucket.reserve(1.0)
+    assert 0 < wait <= 0.1 + 1e-6
+
+
+def test_classify_and_retry_after_hint():
+    assert upstream.classify_error(Exception("Rate limit reached, try again in 1m2.5s")) == "rate"
+    assert upstream.classify_error(ServerError("x")) == "server"
+    assert upstream.classify_error(Exception("Connection reset")) == "conn"
+    assert upstream.classify_error(ValueError("bad")) is None
+    assert upstream._parse_retry_after_seconds("try again in 1m2.5s") == 62.5
@@ -0,0 +1,75 @@
+# backend/tests/test_user_settings.py
+import pytest
+
+from shared_state import MemoryStore
+from user_settings import SqliteSettingsStore, UserSettings
+
+DEFAULTS = {"summary_mode": "patologi"}
+
+
+class CountingStore(SqliteSettingsStore):
+    def __init__(self, path):
+        super().__init__(path)
+        self.loads = 0
+
+    def load(self, user_id):
+        self.loads += 1
+        return super().load(user_id)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CountingStore(str(tmp_path / "settings.db"))
+
+
+def test_hot_path_reads_store_once(store):
+    settings = UserSettings(store, DEFAULTS)
+    for _ in range(5):
+        assert settings.get("u1") == DEFAULTS
+    assert store.loads == 1
+    assert settings.get(None) == DEFAULTS and store.loads == 1  # anonim: tanpa store
+
+
+def test_update_persists_and_refreshes_cache(store):
+    settings = UserSettings(store, DEFAULTS)
+    settings.get("u1")
+    assert settings.update("u1", {"summary_mode": "dokter_hewan"})["summary_mode"] == "dokter_hewan"
+    assert settings.get("u1")["summary_mode"] == "dokter_hewan"
+    assert UserSettings(store, DEFAULTS).get("u1")["summary_mode"] == "dokter_hewan"
+
+
+def test_socket_user_resolved_at_connect(store):
+    settings = UserSettings(store, DEFAULTS)
+    settings.attach("sid1", "u1")
+    loads = store.loads
+    assert settings.for_sid("sid1") == DEFAULTS
+    assert store.loads == loads
+    settings.detach("sid1")
+    assert settings.for_sid("sid1") == DEFAULTS
+
+
+def test_update_invalidates_other_workers(store):
+    bus = MemoryStore()
+    a, b = UserSettings(store, DEFAULTS, bus=bus), UserSettings(store, DEFAULTS, bus=bus)
+    b.get("u1")
+    a.update("u1", {"summary_mode": "dokter_hewan"})
+    assert b.get("u1")["summary_mode"] == "dokter_hewan"
+
+
+def test_ttl_and_size_bound_cache(store):
+    settings = UserSettings(store, DEFAULTS, ttl=0, size=1)
+    settings.get("u1")
+    settings.get("u1")
+    assert store.loads == 2  # ttl 0: selalu kedaluwarsa
+    settings = UserSettings(store, DEFAULTS, ttl=60, size=1)
+    settings.get("u1")
+    settings.get("u2")
+    assert settings.stats()["entries"] == 1
+
+
+def test_store_failure_falls_back_to_defaults():
+    class Broken:
+        def load(self, user_id):
+            raise RuntimeError("db down")
+
+    assert UserSettings(Broken(), DEFAULTS).get("u1") == DEFAULTS
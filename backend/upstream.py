@@ -0,0 +1,326 @@
+# backend/upstream.py
+"""
+Lapisan pemanggilan upstream (Groq) bersama untuk /summarize dan summarize_stream.
+
+- TokenBucket: rate limiter global sesuai kuota Groq (GROQ_RPM).
+- CircuitBreaker: gagal cepat (503 + retry_after) setelah error beruntun,
+  dan menghormati petunjuk "try again in Xs" dari Groq untuk semua request.
+- UpstreamGuard.call: retry dengan exponential backoff + jitter, tapi total
+  waktu tunggu di dalam thread request dibatasi (GROQ_MAX_INLINE_WAIT).
+  Kalau butuh menunggu lebih lama, request langsung dikembalikan ke client
+  sebagai 429/502 dengan retry_after, bukan menahan worker dengan time.sleep.
+
+Satu UpstreamGuard per provider LLM (providers.py); from_env(prefix) membaca
+<prefix>_RPM dst. dengan fallback ke GROQ_*.
+"""
+import asyncio
+import os
+import random
+import re
+import time
+from threading import Lock
+
+
+def _parse_retry_after_seconds(message: str):
+    try:
+        m = re.search(r"in\s+(?:(\d+)m)?(\d+(?:\.\d+)?)s", message)
+        if not m:
+            return None
+        minutes = float(m.group(1)) if m.group(1) else 0.0
+        seconds = float(m.group(2))
+        return minutes * 60.0 + seconds
+    except Exception:
+        return None
+
+
+def classify_error(e: Exception):
+    """Return "rate", "server", "conn", atau None (error lain, tidak di-retry)."""
+    low = str(e).lower()
+    status = getattr(e, "status_code", None)
+    if "rate limit" in low or "rate_limit" in low or status == 429:
+        return "rate"
+    if isinstance(status, int) and status >= 500:
+        return "server"
+    if any(k in low for k in ["connection", "timeout", "timed out", "temporarily"]):
+        return "conn"
+    return None
+
+
+class UpstreamError(Exception):
+    status = 502
+    error = "upstream_error"
+
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+    def to_dict(self) -> dict:
+        body = {"error": self.error, "message": str(self)}
+        if self.retry_after is not None:
+            body["retry_after"] = max(1, int(round(self.retry_after)))
+        return body
+
+
+class RateLimited(UpstreamError):
+    status = 429
+    error = "rate_limit"
+
+
+class UpstreamConnectionError(UpstreamError):
+    status = 502
+    error = "upstream_connection"
+
+
+class UpstreamServerError(UpstreamError):
+    status = 502
+    error = "upstream_server_error"
+
+
+class CircuitOpen(UpstreamError):
+    status = 503
+    error = "upstream_unavailable"
+
+
+class TokenBucket:
+    def __init__(self, rate_per_sec: float, burst: int):
+        self.rate = float(rate_per_sec)
+        self.capacity = max(1.0, float(burst))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, max_wait: float):
+        """
+        Ambil satu token. Return berapa detik harus menunggu (0 = langsung jalan),
+        atau None jika waktu tunggunya melebihi max_wait (token tidak diambil).
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1.0
+            if self._tokens >= 0:
+                return 0.0
+            wait = -self._tokens / self.rate
+            if wait > max_wait:
+                self._tokens += 1.0
+                return None
+            return wait
+
+    def available(self) -> float:
+        """Jumlah token yang tersedia sekarang (tanpa mengambil)."""
+        if self.rate <= 0:
+            return self.capacity
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+    def wait_time(self) -> float:
+        """Perkiraan detik sampai token berikutnya tersedia."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            return max(0.0, (1.0 - self._tokens) / self.rate)
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._open_until = 0.0
+        self._half_open_trial = None  # token percobaan half-open yang sedang berjalan
+        self._trial_seq = 0
+        self._lock = Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if time.monotonic() < self._open_until:
+                return "open"
+            return "half_open" if self._failures >= self.failure_threshold else "closed"
+
+    def before_call(self):
+        """
+        Raise CircuitOpen bila terbuka. Di half-open hanya satu request percobaan
+        yang diizinkan; return token-nya (None bila bukan percobaan) yang harus
+        dilepas dengan release() di setiap jalur keluar.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self._open_until:
+                raise CircuitOpen("Groq sedang tidak tersedia, coba lagi nanti",
+                                  retry_after=self._open_until - now)
+            if self._failures >= self.failure_threshold:
+                if self._half_open_trial is not None:
+                    raise CircuitOpen("Groq sedang tidak tersedia, coba lagi nanti",
+                                      retry_after=1.0)
+                self._trial_seq += 1
+                self._half_open_trial = self._trial_seq
+                return self._trial_seq
+            return None
+
+    def release(self, trial):
+        """
+        Akhiri percobaan half-open yang selesai tanpa hasil upstream (error
+        non-upstream, kuota lokal habis, dibatalkan) supaya request berikutnya
+        boleh mencoba. No-op bila hasilnya sudah dicatat.
+        """
+        if trial is None:
+            return
+        with self._lock:
+            if self._half_open_trial == trial:
+                self._half_open_trial = None
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._half_open_trial = None
+            self._open_until = 0.0
+
+    def record_failure(self, pause: float = None):
+        """Catat kegagalan; `pause` = petunjuk retry-after dari server."""
+        with self._lock:
+            now = time.monotonic()
+            self._failures += 1
+            self._half_open_trial = None
+            until = 0.0
+            if self._failures >= self.failure_threshold:
+                until = now + self.reset_timeout
+            if pause:
+                until = max(until, now + pause)
+            self._open_until = max(self._open_until, until)
+
+
+_ERROR_CLASSES = {"rate": RateLimited, "server": UpstreamServerError, "conn": UpstreamConnectionError}
+
+
+class UpstreamGuard:
+    def __init__(self, limiter: TokenBucket, breaker: CircuitBreaker,
+                 max_retries: int = 3, base_delay: float = 0.5,
+                 max_delay: float = 8.0, max_inline_wait: float = 2.0):
+        self.limiter = limiter
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_inline_wait = max_inline_wait
+
+    def backoff(self, attempt: int, hint: float = None) -> float:
+        """Full-jitter exponential backoff, tidak lebih cepat dari petunjuk server."""
+        cap = min(self.max_delay, self.base_delay * (2 ** attempt))
+        delay = random.uniform(0, cap)
+        return max(delay, hint or 0.0)
+
+    def available(self, reserve: int = 0) -> bool:
+        """Bisa dipanggil sekarang tanpa menunggu? (breaker tidak terbuka, kuota cukup)"""
+        return self.breaker.state != "open" and self.limiter.available() >= 1 + reserve
+
+    def _reserve(self, budget: float):
+        """Return (jeda kuota, token percobaan half-open)."""
+        trial = self.breaker.before_call()
+        wait = self.limiter.reserve(max_wait=budget)
+        if wait is None:
+            self.breaker.release(trial)
+            raise RateLimited("Kuota Groq lokal habis, coba lagi nanti",
+                              retry_after=self.limiter.wait_time())
+        return wait, trial
+
+    def _after_failure(self, e: Exception, attempt: int, budget: float, max_retries: int) -> float:
+        """
+        Catat kegagalan dan return jeda sebelum retry berikutnya.
+        Raise jika error tidak bisa/tidak boleh di-retry lagi.
+        """
+        kind = classify_error(e)
+        if kind is None:
+            raise e
+        hint = _parse_retry_after_seconds(str(e))
+        self.breaker.record_failure(hint if kind == "rate" else None)
+        delay = self.backoff(attempt, hint)
+        if attempt >= max_retries or delay > budget:
+            exc_cls = _ERROR_CLASSES[kind]
+            raise exc_cls(str(e), retry_after=max(delay, hint or 0.0)) from e
+        return delay
+
+    def call(self, fn, on_retry=None, max_retries: int = None, max_wait: float = None):
+        """
+        Jalankan fn() dengan rate limit, circuit breaker, dan retry.
+        Error rate-limit/5xx/koneksi yang tidak bisa di-retry dalam budget
+        diubah menjadi RateLimited / UpstreamServerError / UpstreamConnectionError.
+        `max_retries`/`max_wait` menimpa setelan guard (mis. 0 untuk percobaan
+        yang punya fallback ke provider lain).
+        """
+        budget = self.max_inline_wait if max_wait is None else max_wait
+        max_retries = self.max_retries if max_retries is None else max_retries
+        attempt = 0
+        while True:
+            wait, trial = self._reserve(budget)
+            try:
+                if wait:
+                    time.sleep(wait)
+                    budget -= wait
+                try:
+                    result = fn()
+                except Exception as e:
+                    delay = self._after_failure(e, attempt, budget, max_retries)
+                    error = e
+                else:
+                    self.breaker.record_success()
+                    return result
+            finally:
+                self.breaker.release(trial)
+            attempt += 1
+            if on_retry:
+                on_retry(attempt, delay, error)
+            time.sleep(delay)
+            budget -= delay
+
+    async def acall(self, coro_fn, on_retry=None, max_retries: int = None, max_wait: float = None):
+        """Versi asyncio dari call(): menunggu dengan asyncio.sleep."""
+        budget = self.max_inline_wait if max_wait is None else max_wait
+        max_retries = self.max_retries if max_retries is None else max_retries
+        attempt = 0
+        while True:
+            wait, trial = self._reserve(budget)
+            try:
+                if wait:
+                    await asyncio.sleep(wait)
+                    budget -= wait
+                try:
+                    result = await coro_fn()
+                except Exception as e:
+                    delay = self._after_failure(e, attempt, budget, max_retries)
+                    error = e
+                else:
+                    self.breaker.record_success()
+                    return result
+            finally:
+                # CancelledError (BaseException) juga lewat sini
+                self.breaker.release(trial)
+            attempt += 1
+            if on_retry:
+                on_retry(attempt, delay, error)
+            await asyncio.sleep(delay)
+            budget -= delay
+
+
+def from_env(prefix: str = "GROQ") -> UpstreamGuard:
+    def env(name, default):
+        return os.environ.get(f"{prefix}_{name}", os.environ.get(f"GROQ_{name}", default))
+
+    rpm = float(env("RPM", "30"))
+    return UpstreamGuard(
+        limiter=TokenBucket(rpm / 60.0, int(env("BURST", "5"))),
+        breaker=CircuitBreaker(
+            failure_threshold=int(env("BREAKER_THRESHOLD", "5")),
+            reset_timeout=float(env("BREAKER_RESET", "30")),
+        ),
+        max_retries=int(env("MAX_RETRIES", "3")),
+        max_inline_wait=float(env("MAX_INLINE_WAIT", "2.0")),
+    )
@@ -0,0 +1,228 @@
+# backend/user_settings.py
+"""
+Setelan per user (mode ringkasan, nanti setelan prompt lain) dengan cache
+in-process di depan store persisten.
+
+- SqliteSettingsStore: default lokal, satu baris JSON per user.
+- SupabaseSettingsStore: interface yang sama di atas tabel `user_settings`.
+- UserSettings: cache LRU + TTL. Jalur panas (/summarize, summarize_stream)
+  membaca dari cache; store hanya disentuh saat miss / kedaluwarsa.
+  Socket memuat setelan sekali saat connect, lalu event memakai sid -> user.
+- Bila state bersama (Redis) dipakai, perubahan di satu worker membuang
+  entry cache di worker lain lewat channel "settings_invalidate".
+
+Env:
+    SETTINGS_BACKEND=sqlite | supabase   # default ikut HISTORY_BACKEND, lalu supabase bila dikonfigurasi
+    SETTINGS_DB_PATH=backend/settings.db # default lihat datadir.py
+    SETTINGS_CACHE_TTL=300
+    SETTINGS_CACHE_SIZE=4096
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import applog
+import datadir
+
+CHANNEL = "settings_invalidate"
+
+log = applog.get_logger("settings")
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class SettingsStore:
+    """Interface store setelan: load(user_id) -> dict | None, save(user_id, settings)."""
+
+    def load(self, user_id: str):
+        raise NotImplementedError
+
+    def save(self, user_id: str, settings: dict):
+        raise NotImplementedError
+
+
+class SqliteSettingsStore(SettingsStore):
+    def __init__(self, path: str):
+        # file DB baru dibuka saat dipakai pertama, bukan saat import api.py
+        self.path = path
+        self._local = threading.local()
+        self._setup_lock = threading.Lock()
+        self._ready = False
+
+    def _setup(self, conn):
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS user_settings (
+                user_id TEXT PRIMARY KEY,
+                settings TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+            """
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        if not self._ready:
+            with self._setup_lock:
+                if not self._ready:
+                    self._setup(conn)
+                    self._ready = True
+        return conn
+
+    def load(self, user_id: str):
+        row = self._conn().execute(
+            "SELECT settings FROM user_settings WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, user_id: str, settings: dict):
+        self._conn().execute(
+            "INSERT INTO user_settings (user_id, settings, updated_at) VALUES (?, ?, ?)"
+            " ON CONFLICT(user_id) DO UPDATE SET settings = excluded.settings,"
+            " updated_at = excluded.updated_at",
+            (user_id, json.dumps(settings, ensure_ascii=False), _now_iso()),
+        )
+
+
+class SupabaseSettingsStore(SettingsStore):
+    """Tabel `user_settings` (user_id uuid PK, settings jsonb, updated_at timestamptz)."""
+
+    def __init__(self, supabase):
+        self.supabase = supabase
+
+    def load(self, user_id: str):
+        res = (self.supabase.table("user_settings").select("settings")
+               .eq("user_id", user_id).limit(1).execute())
+        return (res.data[0].get("settings") or {}) if res.data else None
+
+    def save(self, user_id: str, settings: dict):
+        self.supabase.table("user_settings").upsert({
+            "user_id": user_id,
+            "settings": settings,
+            "updated_at": _now_iso(),
+        }).execute()
+
+
+class UserSettings:
+    """
+    Cache setelan per user di depan SettingsStore.
+
+    get(user_id) selalu mengembalikan dict lengkap (default + simpanan user);
+    user_id None (anonim) langsung mendapat default tanpa menyentuh store.
+    """
+
+    def __init__(self, store: SettingsStore, defaults: dict, bus=None,
+                 ttl: float = 300.0, size: int = 4096):
+        self.store = store
+        self.defaults = dict(defaults)
+        self.bus = bus
+        self.ttl = ttl
+        self.size = size
+        self._cache = OrderedDict()  # {user_id: (expires_at, settings)}
+        self._sockets = {}           # {sid: user_id}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._origin = uuid.uuid4().hex  # pesan invalidasi dari diri sendiri diabaikan
+        if bus is not None:
+            bus.subscribe(CHANNEL, self._on_remote)
+
+    def _cached(self, user_id: str):
+        with self._lock:
+            item = self._cache.get(user_id)
+            if item is None or item[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._cache.move_to_end(user_id)
+            self.hits += 1
+            return item[1]
+
+    def _remember(self, user_id: str, settings: dict):
+        with self._lock:
+            self._cache[user_id] = (time.monotonic() + self.ttl, settings)
+            self._cache.move_to_end(user_id)
+            while len(self._cache) > self.size:
+                self._cache.popitem(last=False)
+
+    def get(self, user_id: str = None) -> dict:
+        if not user_id:
+            return dict(self.defaults)
+        settings = self._cached(user_id)
+        if settings is None:
+            try:
+                stored = self.store.load(user_id) or {}
+            except Exception as e:
+                # store bermasalah: pakai default, jangan gagalkan ringkasan
+                log.warning("settings load failed", user_id=user_id, error=f"{type(e).__name__}: {e}")
+                return dict(self.defaults)
+            settings = {**self.defaults, **stored}
+            self._remember(user_id, settings)
+        return dict(settings)
+
+    def update(self, user_id: str, changes: dict) -> dict:
+        """Simpan perubahan (key yang sudah divalidasi pemanggil) dan return setelan baru."""
+        stored = self.store.load(user_id) or {}
+        stored.update(changes)
+        self.store.save(user_id, stored)
+        settings = {**self.defaults, **stored}
+        self._remember(user_id, settings)
+        if self.bus is not None:
+            self.bus.publish(CHANNEL, {"user_id": user_id, "origin": self._origin})
+        return dict(settings)
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._cache.pop(user_id, None)
+
+    def _on_remote(self, message: dict):
+        user_id = message.get("user_id")
+        if user_id and message.get("origin") != self._origin:
+            self.invalidate(user_id)
+
+    # --- socket: user ditentukan sekali saat connect ---
+    def attach(self, sid: str, user_id: str = None):
+        """Ikat sid ke user dan hangatkan cache, supaya event berikutnya tanpa round trip."""
+        if user_id:
+            with self._lock:
+                self._sockets[sid] = user_id
+            self.get(user_id)
+
+    def detach(self, sid: str):
+        with self._lock:
+            self._sockets.pop(sid, None)
+
+    def for_sid(self, sid: str) -> dict:
+        return self.get(self._sockets.get(sid))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._cache), "sockets": len(self._sockets),
+                    "hits": self.hits, "misses": self.misses, "ttl": self.ttl}
+
+
+def from_env(defaults: dict, supabase=None, bus=None) -> UserSettings:
+    backend = os.environ.get("SETTINGS_BACKEND") or os.environ.get("HISTORY_BACKEND")
+    if (backend or ("supabase" if supabase is not None else "sqlite")).lower() == "supabase":
+        if supabase is None:
+            raise RuntimeError("SETTINGS_BACKEND=supabase but Supabase is not configured")
+        store = SupabaseSettingsStore(supabase)
+    else:
+        store = SqliteSettingsStore(datadir.path("SETTINGS_DB_PATH", "settings.db"))
+    return UserSettings(
+        store,
+        defaults,
+        bus=bus,
+        ttl=float(os.environ.get("SETTINGS_CACHE_TTL", "300")),
+        size=int(os.environ.get("SETTINGS_CACHE_SIZE", "4096")),
+    )
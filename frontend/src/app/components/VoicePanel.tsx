@@ -73,6 +73,9 @@ export default function VoicePanel() {
   const summaryEditorRef = useRef<HTMLDivElement>(null);
   const fullTranscriptRef = useRef<string>("");
   const lastFinalSummaryRef = useRef<string>("");
+  // bentuk terstruktur dari event final (per section) + teks editor saat itu
+  const lastSectionsRef = useRef<any>(null);
+  const sectionsTextRef = useRef<string>("");
   const lastTranscriptLengthRef = useRef<number>(0); // DIGUNAKAN UNTUK MENGECEK PERUBAHAN
   const clearHlTimerRef = useRef<any>(null);
   const autoSummarizeTimerRef = useRef<any>(null);
@@ -146,7 +149,11 @@ export default function VoicePanel() {
         })();
         if (hasLocal) return; // respect local choice
 
-        const r = await fetch(`${BACKEND_ORIGIN}/get_summary_mode`);
+        const { data: { session } } = await supabase.auth.getSession();
+        const token = session?.access_token;
+        const r = await fetch(`${BACKEND_ORIGIN}/get_summary_mode`, {
+          headers: token ? { Authorization: `Bearer ${token}` } : {},
+        });
         const data = await r.json();
         if (data.mode) currentModeRef.current = data.mode;
       } catch (err) {
@@ -154,7 +161,15 @@ export default function VoicePanel() {
       }
     })();
 
-    const socket = io(BACKEND_ORIGIN, { transports: ["websocket"] });
+    const socket = io(BACKEND_ORIGIN, {
+      transports: ["websocket"],
+      // token dikirim sekali saat connect; backend memuat setelan user per sesi
+      auth: (cb: (data: object) => void) => {
+        supabase.auth.getSession()
+          .then(({ data }) => cb({ token: data.session?.access_token }))
+          .catch(() => cb({}));
+      },
+    });
     socketRef.current = socket;
 
     socket.on("connect", () => setConnectionStatus("🟢 Terhubung"));
@@ -177,6 +192,12 @@ export default function VoicePanel() {
       
       renderDiff(lastFinalSummaryRef.current, nextSummary, editor, clearHlTimerRef);
       lastFinalSummaryRef.current = nextSummary;
+      if (data.final) {
+        lastSectionsRef.current = data.sections || null;
+        sectionsTextRef.current = (editor.textContent || "").trim();
+      } else if (data.token) {
+        lastSectionsRef.current = null;
+      }
       
       if (data.end) {
         summarizeInFlightRef.current = false;
@@ -265,7 +286,8 @@ export default function VoicePanel() {
         summaryEditorRef.current.innerHTML = "<i>Memproses ringkasan...</i>";
     }
     
-    socketRef.current.emit("summarize_stream", { text, mode: currentModeRef.current });
+    // auto-summarize (showUI=false) cukup kirim ulang transkrip; backend hanya meringkas bagian barunya
+    socketRef.current.emit("summarize_stream", { text, mode: currentModeRef.current, incremental: !showUI });
   };
 
   return (
@@ -442,6 +464,10 @@ export default function VoicePanel() {
                       saved_at: new Date().toISOString(),
                       transcript_length: (original || "").length,
                       summary_length: summaryText.length,
+                      // section hanya disimpan bila ringkasan belum diedit sejak diterima
+                      ...(lastSectionsRef.current && summaryText === sectionsTextRef.current
+                        ? { sections: lastSectionsRef.current }
+                        : {}),
                     },
                   } as any;
 
@@ -89,7 +89,10 @@ export default function SettingsPage() {
   useEffect(() => {
     const fetchMode = async () => {
       try {
-        const res = await fetch(`${API_BASE}/get_summary_mode`);
+        const { data: { session } } = await supabase.auth.getSession();
+        const res = await fetch(`${API_BASE}/get_summary_mode`, {
+          headers: session ? { Authorization: `Bearer ${session.access_token}` } : {},
+        });
         if (res.ok) {
           const data = await res.json();
           if (data?.mode) {
@@ -242,9 +245,13 @@ export default function SettingsPage() {
     setModeStatus("Menyimpan...");
 
     try {
+      const { data: { session } } = await supabase.auth.getSession();
       const res = await fetch(`${API_BASE}/set_summary_mode`, {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        headers: {
+          "Content-Type": "application/json",
+          ...(session ? { Authorization: `Bearer ${session.access_token}` } : {}),
+        },
         body: JSON.stringify({ mode }),
       });
 
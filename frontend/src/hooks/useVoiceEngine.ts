@@ -85,6 +85,9 @@ export function useVoiceEngine() {
 
   const lastFinalSummaryRef = useRef<string>("");
   const clearHlTimerRef = useRef<any>(null);
+  // bentuk terstruktur dari event final (per section) + teks editor saat itu
+  const lastSectionsRef = useRef<any>(null);
+  const sectionsTextRef = useRef<string>("");
 
   const manualStopRef = useRef<boolean>(false);
   const fullTranscriptRef = useRef<string>("");
@@ -199,6 +202,12 @@ export function useVoiceEngine() {
     const socket = io(SOCKET_URL, {
       transports: ["websocket", "polling"],
       timeout: 8000,
+      // token dikirim sekali saat connect; backend memuat setelan user per sesi
+      auth: (cb: (data: object) => void) => {
+        supabase.auth.getSession()
+          .then(({ data }) => cb({ token: data.session?.access_token }))
+          .catch(() => cb({}));
+      },
     });
     socketRef.current = socket;
 
@@ -241,6 +250,7 @@ export function useVoiceEngine() {
           el.innerHTML = mdToHtml(next);
         }
         lastFinalSummaryRef.current = next;
+        lastSectionsRef.current = null;
         updateCountDisplay(next);
         if (!gotFirstTokenRef.current) {
           gotFirstTokenRef.current = true;
@@ -268,6 +278,8 @@ export function useVoiceEngine() {
           el.innerHTML = mdToHtml(next);
         }
         lastFinalSummaryRef.current = next;
+        lastSectionsRef.current = data.sections || null;
+        sectionsTextRef.current = (el.textContent || "").trim();
         updateCountDisplay(next);
         setTimeout(() => {
           el.classList.remove("hl-anim");
@@ -304,7 +316,11 @@ export function useVoiceEngine() {
         })();
         if (hasLocal) return;
 
-        const r = await fetch(`${BACKEND_ORIGIN}/get_summary_mode`);
+        const { data } = await supabase.auth.getSession();
+        const token = data.session?.access_token;
+        const r = await fetch(`${BACKEND_ORIGIN}/get_summary_mode`, {
+          headers: token ? { Authorization: `Bearer ${token}` } : {},
+        });
         const j = await r.json();
         if (j && j.mode) currentModeRef.current = j.mode;
       } catch (e) {
@@ -456,6 +472,8 @@ export function useVoiceEngine() {
       socketRef.current?.emit("summarize_stream", {
         text,
         mode: currentModeRef.current,
+        // auto-summarize: backend hanya meringkas bagian transkrip yang baru
+        incremental: !showUI,
       });
     } catch (e) {
       console.error("socket emit error:", e);
@@ -605,6 +623,10 @@ export function useVoiceEngine() {
           saved_at: new Date().toISOString(),
           transcript_length: (fullTranscriptRef.current || "").length,
           summary_length: text.length,
+          // section hanya disimpan bila ringkasan belum diedit sejak diterima
+          ...(lastSectionsRef.current && text === sectionsTextRef.current
+            ? { sections: lastSectionsRef.current }
+            : {}),
         },
       } as any;
 